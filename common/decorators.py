@@ -1,21 +1,121 @@
 """ Custom decorators module. """
 from functools import wraps
-from django.views.decorators.cache import cache_page
+import hashlib
+from django.utils.cache import (
+    get_conditional_response,
+    patch_response_headers,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+from common.pagecache import (
+    IDENTITY,
+    get_key,
+    get_page,
+    is_cacheable,
+    negotiate,
+    set_page,
+)
+from common.versions import SITE, get_versions
 
 
-def cache_public(timeout):
-    """ Decorator to return cached pages for normal requests,
-    but bypass cache for staff. """
+PAGE_TIMEOUT = 60 * 60 * 24 * 7
+BROWSER_TIMEOUT = 60 * 15
+
+
+def _patch_headers(response, timeout, validators, public):
+    """ Add validators to successful responses, and browser caching
+    headers to public ones. """
+    if response.status_code not in (200, 304):
+        return
+    if validators:
+        response['ETag'] = validators[0]
+        response['Last-Modified'] = http_date(validators[1])
+    if public:
+        patch_response_headers(response, min(timeout, BROWSER_TIMEOUT))
+        patch_vary_headers(response, ['Accept-Encoding'])
+
+
+def _get_validators(request, versions, last_modified, kwargs, encoding):
+    """ Return an (etag, last_modified) tuple for a page, or None if
+    its versions are unknown, as with a dummy cache, or the page's
+    last_modified function returns None. The ETag is strong,
+    a hash of the page's path, content versions and user class, with a
+    suffix for compressed encodings. Last modified is the latest version
+    or page timestamp. """
+    if None in versions:
+        return None
+    timestamps = list(versions)
+    if last_modified:
+        timestamp = last_modified(request, **kwargs)
+        if timestamp is None:
+            return None
+        timestamps.append(timestamp)
+    etag = '"%s"' % hashlib.sha1(repr((
+        request.get_full_path(),
+        versions,
+        request.user.is_authenticated,
+        request.user.is_staff,
+    )).encode()).hexdigest()
+    if encoding != IDENTITY:
+        etag = f'{etag[:-1]}-{encoding}"'
+    return etag, int(max(timestamps))
+
+
+def cache_public(timeout=PAGE_TIMEOUT, versions=(), last_modified=None):
+    """ Decorator to return cached pages for anonymous requests, with
+    precompressed variants picked by Accept-Encoding, and bypass the
+    cache for authenticated users. Versions are content version names,
+    formatted with the view's kwargs, such as 'entry:{slug}'. Cached
+    pages are keyed by their site and content versions, so they live
+    until the content changes, and browsers cache them for
+    BROWSER_TIMEOUT.
+
+    Conditional requests are answered from the versions and an optional
+    last_modified function, called with the request and view kwargs,
+    before the cache or view is reached. It returns a timestamp, or None
+    to skip validation, for example when the page doesn't exist. """
 
     def decorator(function):
         """ Inner decorator. """
 
         @wraps(function)
         def wrap(request, *args, **kwargs):
-            """ Return the function, possibly wrapped in cache_page. """
-            if request.user.is_staff:
-                return function(request, *args, **kwargs)
-            return cache_page(timeout)(function)(request, *args, **kwargs)
+            """ Return a 304, a cached page or the function's rendered
+            response. """
+            page_versions = get_versions(
+                [SITE] + [name.format(**kwargs) for name in versions]
+            )
+            public = not request.user.is_authenticated
+            encoding = IDENTITY
+            if public:
+                encoding = negotiate(
+                    request.META.get('HTTP_ACCEPT_ENCODING', '')
+                )
+            validators = _get_validators(
+                request, page_versions, last_modified, kwargs, encoding
+            )
+            if validators:
+                response = get_conditional_response(request, *validators)
+                if response:
+                    _patch_headers(response, timeout, validators, public)
+                    return response
+
+            key = response = None
+            if public and request.method in ('GET', 'HEAD'):
+                key = get_key(
+                    request, 'v%s' % '.'.join(map(str, page_versions))
+                )
+                response = get_page(key, encoding)
+            cached = response is not None
+            if not cached:
+                response = function(request, *args, **kwargs)
+                if not getattr(response, 'is_rendered', True):
+                    response.render()
+                if key and is_cacheable(response):
+                    response = set_page(key, response, encoding, timeout)
+                    cached = True
+            _patch_headers(response, timeout, validators, cached)
+            return response
         return wrap
 
     return decorator
@@ -0,0 +1,229 @@
+""" Management utility to export public pages to a static file tree.
+
+Pages are written as files nginx can serve directly, with gzip and
+brotli siblings for gzip_static and brotli_static. For example:
+
+    location / {
+        root /path/to/var/site;
+        try_files $uri $uri.html $uri.xml $uri/index.html @django;
+    }
+"""
+from concurrent.futures import ProcessPoolExecutor
+import gzip
+import io
+from itertools import repeat
+import json
+import os
+import sys
+import tempfile
+import time
+import brotli
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.urls import reverse
+from common.urls import SITEMAPS
+from entry.models import Entry
+
+
+EXTENSIONS = {
+    'application/rss+xml': '.xml',
+    'text/html': '.html',
+}
+MANIFEST = '.exportsite.json'
+SKIP_SITEMAPS = ('unihan',)  # The lookup form posts back to Django.
+
+_HANDLER = None
+
+
+def _gzip(data):
+    """ Return reproducible gzip data. """
+    return gzip.compress(data, 9, mtime=0)
+
+
+def _brotli(data):
+    """ Return brotli data. """
+    return brotli.compress(data)
+
+
+COMPRESSORS = (('.gz', _gzip), ('.br', _brotli))
+
+
+def _init_worker():
+    """ Set up a worker's request handler, with the project's
+    middleware. """
+    global _HANDLER  # pylint: disable=global-statement
+    if not apps.ready:
+        django.setup()
+    _HANDLER = BaseHandler()
+    _HANDLER.load_middleware()
+
+
+def _get(path):
+    """ Return the response to an anonymous HTTPS GET request for a
+    path, as sent by the proxy. Pages come from the page cache like any
+    other request's, since cached pages are as current as their
+    versions. """
+    host = settings.ALLOWED_HOSTS[0]
+    request = WSGIRequest({
+        'HTTP_HOST': host,
+        'HTTP_X_FORWARDED_HOST': host,
+        'HTTP_X_FORWARDED_PROTO': 'https',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '443',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.errors': sys.stderr,
+        'wsgi.input': io.BytesIO(),
+        'wsgi.url_scheme': 'https',
+    })
+    response = _HANDLER.get_response(request)
+    response.close()
+    return response
+
+
+def _file_name(path, content_type):
+    """ Return the output file name for a URL path. """
+    name = path.lstrip('/')
+    if not name or name.endswith('/'):
+        return name + 'index.html'
+    if '.' not in name.rsplit('/', 1)[-1]:
+        name += EXTENSIONS.get(content_type.split(';')[0], '')
+    return name
+
+
+def _write(path, data):
+    """ Atomically write data to a file unless it already holds the
+    data, and return True if it was written. """
+    try:
+        with open(path, 'rb') as old_fd:
+            if old_fd.read() == data:
+                return False
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), delete=False) as new_fd:
+        try:
+            new_fd.write(data)
+        except BaseException:
+            os.remove(new_fd.name)
+            raise
+    os.chmod(new_fd.name, 0o644)
+    os.replace(new_fd.name, path)
+    return True
+
+
+def _export(output_dir, path):
+    """ Render a page in a worker and write any changed files. Return
+    the status code, the page's file names and whether it changed. """
+    response = _get(path)
+    if response.status_code != 200:
+        return response.status_code, [], False
+    content = response.getvalue()
+    name = _file_name(path, response['Content-Type'])
+    file_path = os.path.join(output_dir, name)
+    changed = _write(file_path, content)
+    names = [name]
+    for suffix, compress in COMPRESSORS:
+        if changed or not os.path.exists(file_path + suffix):
+            _write(file_path + suffix, compress(content))
+        names.append(name + suffix)
+    return response.status_code, names, changed
+
+
+def _get_paths():
+    """ Return the URL paths of the public pages, the sitemap's
+    locations and the study variants of published entries. """
+    paths = [
+        reverse('archive-index'),
+        reverse('blog-index'),
+        reverse('blog-rss'),
+        reverse('django.contrib.sitemaps.views.sitemap'),
+    ]
+    for name, sitemap_class in SITEMAPS.items():
+        if name not in SKIP_SITEMAPS:
+            sitemap = sitemap_class()
+            paths.extend(sitemap.location(item) for item in sitemap.items())
+    for slug in Entry.objects.filter(
+            published=True, entry_type='study').values_list('slug', flat=True):
+        paths.append(reverse('entry-study', args=[slug]))
+    return list(dict.fromkeys(paths))
+
+
+class Command(BaseCommand):
+    """ A command to export public pages to static files. """
+
+    help = 'Used to export public pages to a static file tree.'
+    requires_migrations_checks = True
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=settings.BASE_DIR / 'var' / 'site',
+            help='Output directory, var/site by default.',
+        )
+        parser.add_argument(
+            '--jobs',
+            default=os.cpu_count(),
+            type=int,
+            help='Number of rendering processes, or 1 to render in this '
+            'process.',
+        )
+
+    def handle(self, *args, **options):
+        """ Render pages in parallel, write changed files and remove
+        files for pages that are no longer public. """
+        start = time.perf_counter()
+        output_dir = os.fspath(options['output'])
+        paths = _get_paths()
+
+        if options['jobs'] > 1:
+            # Workers open their own db and cache connections.
+            connections.close_all()
+            caches.close_all()
+            with ProcessPoolExecutor(
+                    options['jobs'], initializer=_init_worker) as executor:
+                results = list(
+                    executor.map(_export, repeat(output_dir), paths)
+                )
+        else:
+            _init_worker()
+            results = [_export(output_dir, path) for path in paths]
+
+        names = []
+        changed = 0
+        for path, (status, page_names, page_changed) in zip(paths, results):
+            if status != 200:
+                print('Skipped', path, status)
+            names.extend(page_names)
+            changed += page_changed
+
+        # Remove files exported last time and not this time.
+        manifest = os.path.join(output_dir, MANIFEST)
+        try:
+            with open(manifest, encoding='utf-8') as manifest_fd:
+                old_names = json.load(manifest_fd)
+        except FileNotFoundError:
+            old_names = []
+        removed = set(old_names) - set(names)
+        for name in sorted(removed):
+            try:
+                os.remove(os.path.join(output_dir, name))
+                print('Removed', name)
+            except FileNotFoundError:
+                pass
+        _write(manifest, json.dumps(sorted(names), indent=1).encode())
+
+        print(
+            f'Exported {len(paths)} pages to {output_dir}, {changed} '
+            f'changed, {len(removed)} files removed, '
+            f'in {time.perf_counter() - start:.2f}s'
+        )
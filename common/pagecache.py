@@ -0,0 +1,131 @@
+""" Page cache module. Public pages are cached with precompressed
+variants, each under its own key, so that a cache hit fetches and sends
+one body without compressing it. Streamed pages are sent as they are
+generated and cached once the whole body has been sent. """
+import gzip
+import hashlib
+from asgiref.sync import sync_to_async
+import brotli
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+
+IDENTITY = 'identity'
+ENCODINGS = ('br', 'gzip')  # By preference.
+BROTLI_QUALITY = 9  # 11 takes several times as long for a page.
+
+
+def _compress(encoding, data):
+    """ Return data compressed with an encoding. """
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, 9, mtime=0)
+
+
+def negotiate(accept_encoding):
+    """ Return the preferred cached encoding accepted by an
+    Accept-Encoding header value, or identity. """
+    qualities = {}
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip()] = quality
+    best, best_quality = IDENTITY, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def get_key(request, key_prefix):
+    """ Return the page's cache key, without the encoding. """
+    url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    return f'page:{key_prefix}:{url}'
+
+
+def _variant_response(headers, body, encoding):
+    """ Return a response for a cached variant. """
+    response = HttpResponse(body)
+    for header, value in headers:
+        response[header] = value
+    if encoding != IDENTITY:
+        response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(body))
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def get_page(key, encoding):
+    """ Return a cached response for a page in an encoding, or None. """
+    variant = cache.get(f'{key}:{encoding}')
+    if variant is None:
+        return None
+    return _variant_response(*variant, encoding)
+
+
+def is_cacheable(response):
+    """ Return True if a response can be stored in the page cache. """
+    return (
+        response.status_code == 200
+        and not response.cookies
+        and not response.has_header('Content-Encoding')
+        and 'private' not in response.get('Cache-Control', '')
+    )
+
+
+def _store(key, headers, body, timeout):
+    """ Store a page body's variants and return them in a dict. """
+    variants = {IDENTITY: body}
+    for variant_encoding in ENCODINGS:
+        variants[variant_encoding] = _compress(variant_encoding, body)
+    cache.set_many({
+        f'{key}:{variant_encoding}': (headers, variant)
+        for variant_encoding, variant in variants.items()
+    }, timeout)
+    return variants
+
+
+def _tee(key, headers, timeout, chunks):
+    """ Yield a streamed page's chunks, then store the page if it was
+    sent completely. """
+    body = []
+    for chunk in chunks:
+        body.append(chunk)
+        yield chunk
+    _store(key, headers, b''.join(body), timeout)
+
+
+async def _atee(key, headers, timeout, chunks):
+    """ Yield an async streamed page's chunks, then store the page if it
+    was sent completely. """
+    body = []
+    async for chunk in chunks:
+        body.append(chunk)
+        yield chunk
+    await sync_to_async(_store)(key, headers, b''.join(body), timeout)
+
+
+def set_page(key, response, encoding, timeout):
+    """ Store a rendered response's variants and return a response for
+    the requested encoding. Streaming responses are returned
+    uncompressed, storing their variants as they finish. """
+    headers = [
+        (header, value) for header, value in response.items()
+        if header.lower() != 'content-length'
+    ]
+    if response.streaming:
+        tee = _atee if response.is_async else _tee
+        response.streaming_content = tee(
+            key, headers, timeout, response.streaming_content
+        )
+        return response
+    variants = _store(key, headers, response.content, timeout)
+    return _variant_response(headers, variants[encoding], encoding)
@@ -1,16 +1,24 @@
 """ Test case base module. """
 import logging
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
 
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+})
 class BaseTestCase(TestCase):
     """ Parent class with nice things. """
 
     def setUp(self):
-        """ Log everything to the console. """
+        """ Log everything to the console and start with an empty
+        cache. """
         logging.disable(logging.NOTSET)
         logger = logging.getLogger(__name__)
         logger.setLevel(logging.DEBUG)
+        cache.clear()
 
     @staticmethod
     def _log(data):
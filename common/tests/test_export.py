@@ -0,0 +1,103 @@
+""" Site export test module. """
+from contextlib import redirect_stdout
+import io
+import json
+import os
+import tempfile
+from django.core.management import call_command
+from common.tests.base import BaseTestCase
+from entry.models import Archive, Entry, EntryContent
+
+
+class ExportTestCase(BaseTestCase):
+    """ Verify exportsite writes public pages and only rewrites changed
+    ones. """
+
+    @classmethod
+    def setUpTestData(cls):
+        """ Create a published and an unpublished entry. """
+        archive = Archive.objects.create(
+            slug='tong', title='Tong', subtitle='Various'
+        )
+        for slug, published in (('test', True), ('draft', False)):
+            entry = Entry.objects.create(
+                archive=archive,
+                lede='Lede.',
+                published=published,
+                slug=slug,
+                title=slug.title(),
+            )
+            EntryContent.objects.create(
+                entry=entry,
+                plain_html=f'<p>{slug} plain</p>',
+                study_html=f'<p>{slug} study</p>',
+            )
+
+    def setUp(self):
+        """ Export to a temp dir. """
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.output_dir = temp_dir.name
+
+    def export(self):
+        """ Run exportsite in this process and return its output. """
+        with redirect_stdout(io.StringIO()) as output:
+            call_command(
+                'exportsite', '--output', self.output_dir, '--jobs', '1'
+            )
+        self._log(output.getvalue())
+        return output.getvalue()
+
+    def read(self, name):
+        """ Return an exported file's text. """
+        with open(
+                os.path.join(self.output_dir, name),
+                encoding='utf-8') as file_fd:
+            return file_fd.read()
+
+    def test_export(self):
+        """ Assert public pages are exported with compressed siblings,
+        unchanged pages are skipped, and unpublished pages removed. """
+        output = self.export()
+        self.assertIn(' 0 files removed', output)
+        self.assertNotIn('Skipped', output)
+        self.assertIn('test plain', self.read('entry/test.html'))
+        self.assertIn('test study', self.read('entry/test/study.html'))
+        for suffix in ('.br', '.gz'):
+            self.assertTrue(os.path.exists(
+                os.path.join(self.output_dir, 'entry/test.html' + suffix)
+            ))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.output_dir, 'entry/draft.html')
+        ))
+        names = json.loads(self.read('.exportsite.json'))
+        self.assertIn('tag/tong.html', names)
+        self.assertIn('index.html', names)
+        pages = len([
+            name for name in names if not name.endswith(('.br', '.gz'))
+        ])
+        mtime = os.stat(
+            os.path.join(self.output_dir, 'entry/test.html')
+        ).st_mtime_ns
+
+        self.assertIn(f'{pages} pages', self.export())
+        self.assertIn(' 0 changed', self.export())
+        self.assertEqual(os.stat(
+            os.path.join(self.output_dir, 'entry/test.html')
+        ).st_mtime_ns, mtime)
+
+        content = EntryContent.objects.get(entry__slug='test')
+        content.study_html = '<p>new study</p>'
+        content.save()
+        output = self.export()
+        self.assertIn(' 1 changed', output)
+        self.assertIn('new study', self.read('entry/test/study.html'))
+
+        Entry.objects.filter(slug='test').update(published=False)
+        Entry.objects.get(slug='test').save()
+        output = self.export()
+        self.assertIn('Removed entry/test.html\n', output)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.output_dir, 'entry/test/study.html.gz')
+        ))
@@ -4,21 +4,22 @@ from django.urls import path
 from entry.sitemaps import EntrySitemap
 from unihan.sitemaps import UnihanSitemap
 from common import views
+from common.decorators import cache_public
 from common.sitemaps import CommonSitemap
 
 
+SITEMAPS = {
+    'common': CommonSitemap,
+    'unihan': UnihanSitemap,
+    'entry': EntrySitemap
+}
+
 urlpatterns = [
     path('about', views.AboutView.as_view(), name='common-about'),
     path(
         'sitemap.xml',
-        sitemap,
-        {
-            'sitemaps': {
-                'common': CommonSitemap,
-                'unihan': UnihanSitemap,
-                'entry': EntrySitemap
-            }
-        },
+        cache_public(versions=('archives', 'entries'))(sitemap),
+        {'sitemaps': SITEMAPS},
         name='django.contrib.sitemaps.views.sitemap'
     )
 ]
@@ -0,0 +1,47 @@
+""" Content version module. Versions are timestamps in the default
+cache, shared by all processes, stored without expiry, bumped when
+content changes and folded into cache keys so that cached data is
+invalidated exactly when its inputs change. Names are 'site' for
+everything, or narrower names such as 'entry:<slug>'. A cache that
+stores nothing, such as the dummy cache, gives None versions. """
+import time
+from django.core.cache import cache
+
+
+SITE = 'site'
+
+
+def _key(name):
+    """ Return the cache key for a version name. """
+    return f'version:{name}'
+
+
+def get_versions(names):
+    """ Return a list of versions for the names. Names that have never
+    been bumped, such as the slugs of missing pages, have the site
+    version, so requests only create the site version's key. """
+    keys = [_key(name) for name in names]
+    site_key = _key(SITE)
+    versions = cache.get_many(keys + [site_key])
+    if site_key not in versions:
+        cache.add(site_key, int(time.time()), None)
+        versions[site_key] = cache.get(site_key)
+    return [versions.get(key, versions[site_key]) for key in keys]
+
+
+def bump_versions(names):
+    """ Set new versions for the names, newer than their current ones,
+    and return them in a dict. """
+    now = int(time.time())
+    keys = {_key(name): name for name in dict.fromkeys(names)}
+    site_key = _key(SITE)
+    old_versions = cache.get_many(list(keys) + [site_key])
+    versions = {}
+    for key in keys:
+        old_version = old_versions.get(key, old_versions.get(site_key))
+        if old_version is not None and old_version >= now:
+            versions[key] = old_version + 1
+        else:
+            versions[key] = now
+    cache.set_many(versions, None)
+    return {keys[key]: version for key, version in versions.items()}
@@ -51,7 +51,7 @@ def custom404(request, exception):
     ))
 
 
-@method_decorator(cache_public(60 * 15), name='dispatch')
+@method_decorator(cache_public(versions=('about',)), name='dispatch')
 class AboutView(TemplateView):
     """ About Daoistic view. """
     template_name = 'common/about.html'
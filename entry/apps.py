@@ -5,3 +5,8 @@ from django.apps import AppConfig
 class EntryConfig(AppConfig):
     """ Entry app config. """
     name = 'entry'
+
+    def ready(self):
+        """ Connect signal receivers. """
+        # pylint: disable=import-outside-toplevel,unused-import
+        from entry import signals  # noqa: F401
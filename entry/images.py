@@ -0,0 +1,124 @@
+""" Entry image module. importentries publishes entry images to the
+static image dir under content-hashed names, such as
+<slug>-120.<hash>.jpg, with a manifest mapping the plain names to them.
+Views link the hashed names, so the images can be cached indefinitely,
+for example by nginx:
+
+    location ~ ^/static/entry/img/.+\\.[0-9a-f]{12}\\.jpg$ {
+        root /path/to;
+        expires 1y;
+        add_header Cache-Control "public, immutable";
+    }
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+from django.conf import settings
+
+
+HASH_LENGTH = 12
+MANIFEST = 'manifest.json'
+HASHED_RE = re.compile(r'^.+\.[0-9a-f]{%d}\.jpg$' % HASH_LENGTH)
+
+
+def image_name(slug, resolution=None):
+    """ Return the plain name of an entry image. """
+    if resolution:
+        return f'{slug}-{resolution}.jpg'
+    return f'{slug}.jpg'
+
+
+def hashed_name(name, digest):
+    """ Return an image's name with a hex digest of its content. """
+    root, ext = os.path.splitext(name)
+    return f'{root}.{digest[:HASH_LENGTH]}{ext}'
+
+
+def publish_image(src, name, digest):
+    """ Copy an image to the image dir under its hashed name, unless it
+    is there already. Return the hashed name and True if it was
+    copied. """
+    file_name = hashed_name(name, digest)
+    dst = os.path.join(settings.ENTRY_IMG_DIR, file_name)
+    if os.path.exists(dst):
+        return file_name, False
+    with tempfile.NamedTemporaryFile(
+            dir=settings.ENTRY_IMG_DIR, delete=False) as dst_fd:
+        try:
+            with open(src, 'rb') as src_fd:
+                shutil.copyfileobj(src_fd, dst_fd)
+        except BaseException:
+            os.remove(dst_fd.name)
+            raise
+    os.chmod(dst_fd.name, 0o644)
+    os.replace(dst_fd.name, dst)
+    return file_name, True
+
+
+def write_manifest(manifest):
+    """ Replace the manifest, a dict mapping plain names to hashed
+    names, if it changed, and remove hashed images in neither it nor the
+    last manifest, so that pages cached before an import keep their
+    images until the next one. Return the removed file names. """
+    path = settings.ENTRY_IMG_DIR
+    old = _read_manifest() or {}
+    keep = set(manifest.values()) | set(old.values())
+    if manifest != old:
+        with tempfile.NamedTemporaryFile(
+                'w', dir=path, delete=False, encoding='utf-8') as man_fd:
+            try:
+                json.dump(manifest, man_fd, indent=1, sort_keys=True)
+            except BaseException:
+                os.remove(man_fd.name)
+                raise
+        os.chmod(man_fd.name, 0o644)
+        os.replace(man_fd.name, os.path.join(path, MANIFEST))
+    removed = []
+    for file_name in sorted(os.listdir(path)):
+        if HASHED_RE.match(file_name) and file_name not in keep:
+            os.remove(os.path.join(path, file_name))
+            removed.append(file_name)
+    return removed
+
+
+def _read_manifest():
+    """ Return the manifest in the image dir, or None. """
+    try:
+        with open(
+                os.path.join(settings.ENTRY_IMG_DIR, MANIFEST),
+                encoding='utf-8') as man_fd:
+            return json.load(man_fd)
+    except FileNotFoundError:
+        return None
+
+
+_MANIFEST = None
+
+
+def get_manifest():
+    """ Return the current image manifest, or an empty dict if there is
+    none. Reloads when importentries replaces the manifest. """
+    global _MANIFEST  # pylint: disable=global-statement
+    path = os.path.join(settings.ENTRY_IMG_DIR, MANIFEST)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        _MANIFEST = None
+        return {}
+    if (
+            _MANIFEST is None
+            or _MANIFEST[0] != path
+            or _MANIFEST[1].st_ino != stat.st_ino
+            or _MANIFEST[1].st_mtime_ns != stat.st_mtime_ns):
+        with open(path, encoding='utf-8') as man_fd:
+            _MANIFEST = (path, stat, json.load(man_fd))
+    return _MANIFEST[2]
+
+
+def get_image(slug, resolution=None):
+    """ Return the static file name of an entry image, hashed if it has
+    been published, or the plain name. """
+    name = image_name(slug, resolution)
+    return get_manifest().get(name, name)
@@ -1,195 +1,473 @@
 """ Management utility to import entries from markdown. """
 import ast
-import filecmp
-import shutil
+import hashlib
+import json
 import os
-from pathlib import Path
+import tempfile
+import time
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.db import transaction
 from django.utils.dateparse import parse_date
-from entry.models import Archive, Entry
+from common.versions import bump_versions
+from entry.images import (
+    get_manifest,
+    image_name,
+    publish_image,
+    write_manifest,
+)
+from entry.models import Archive, Entry, EntryContent
+from entry.render import (
+    CONTENT_FIELDS,
+    get_char_map,
+    read_sources,
+    render_content,
+    source_hash,
+    source_mtime,
+)
+from unihan.models import UnihanDataset
+
+
+ARCHIVE_FIELDS = ('title', 'subtitle', 'image')
+IMAGES = (('header', None), ('card', 120))
+WATCH_INTERVAL = 1.0
+WATCH_DEBOUNCE = 1.0
+
+
+def _file_hash(path):
+    """ Return the sha256 hex digest of a file. """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file_fd:
+        for chunk in iter(lambda: file_fd.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stat_file(path, old):
+    """ Return a [mtime_ns, size, hash] list for a file, hashing it only
+    if its mtime or size differ from its old list, or None if there is
+    no such file. """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if old and old[:2] == [stat.st_mtime_ns, stat.st_size]:
+        return old
+    return [stat.st_mtime_ns, stat.st_size, _file_hash(path)]
+
+
+def _stat_dir(path, old):
+    """ Return a dict mapping the names of a directory's files to their
+    _stat_file lists, given a dict of old lists. """
+    files = {}
+    for dir_entry in os.scandir(path):
+        if dir_entry.is_file():
+            files[dir_entry.name] = _stat_file(
+                dir_entry.path, old.get(dir_entry.name)
+            )
+    return files
+
+
+def _hash(files, name):
+    """ Return the hash of a file in a _stat_dir dict, or None. """
+    return files[name][2] if files.get(name) else None
+
+
+def _hashes(files):
+    """ Return a dict mapping file names to their hashes. """
+    return {name: _hash(files, name) for name in files}
+
+
+def _scan(path):
+    """ Return a dict mapping the paths of the files in a directory and
+    its subdirectories to their (mtime_ns, size), without reading
+    them. """
+    files = {}
+    for dir_entry in os.scandir(path):
+        if dir_entry.is_dir():
+            files.update(_scan(dir_entry.path))
+        elif dir_entry.is_file():
+            stat = dir_entry.stat()
+            files[dir_entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def _read_config(path):
+    """ Return the dict literal in a meta.py file. """
+    with open(path, encoding='utf-8') as cfg_fd:
+        return ast.literal_eval(cfg_fd.read())
+
+
+def _changed_dataset():
+    """ Return the pk of the last Unihan dataset that changed any
+    characters, which entry content is rendered from, or None. """
+    return UnihanDataset.objects.exclude(
+        inserted=0, updated=0, deleted=0
+    ).order_by('-pk').values_list('pk', flat=True).first()
 
 
 class Command(BaseCommand):
-    """ A command to import archive and entry data to the project db. """
+    """ A command to import archive and entry data to the project db.
+    A manifest of the source files' mtimes, sizes and hashes is kept
+    between runs, so that only changed entry directories are read. In
+    watch mode the data dir is polled, and each burst of edits is
+    imported once it settles. """
 
     help = 'Used to import and update archive and entry data.'
     requires_migrations_checks = True
-    data_dir = settings.BASE_DIR / 'var' / 'data'
-    entries_dir = data_dir / 'entries'
-    img_dir = settings.BASE_DIR / 'entry' / 'static' / 'entry' / 'img'
-
-    def _cp_static(self, entry_slug, src_type, resolution=None):
-        """ Copy image to the entry app's static dir. """
-        src = self.entries_dir / entry_slug / f'{src_type}.jpg'
-        if resolution:
-            dst = self.img_dir / f'{entry_slug}-{resolution}.jpg'
-        else:
-            dst = self.img_dir / f'{entry_slug}.jpg'
-        changed = False
-        try:
-            if not filecmp.cmp(src, dst):
-                changed = True
-        except FileNotFoundError:
-            changed = True
-        if changed:
-            try:
-                shutil.copyfile(src, dst)
-                print('Copied', dst)
-            except FileNotFoundError:
-                print('No', src_type, entry_slug)
-        return changed
+    data_dir = None
+    entries_dir = None
+    force = False
 
-    def _rm_static(self, entry_slug, resolution=None):
-        """ Remove image from the app's static dir. """
-        if resolution:
-            path = self.img_dir / f'{entry_slug}-{resolution}'
-        else:
-            path = self.img_dir / f'{entry_slug}.jpg'
-        try:
-            os.remove(path)
-            print('Removed', path)
-        except OSError:
-            print('Error removing', path)
+    def _publish_images(self, entry_files):
+        """ Publish the entries' images under their hashed names, given
+        the manifest's entry files. Return the image manifest and the
+        slugs of the entries with copied images. """
+        images, copied = {}, []
+        for slug, files in sorted(entry_files.items()):
+            for src_type, resolution in IMAGES:
+                digest = _hash(files, f'{src_type}.jpg')
+                if digest is None:
+                    continue
+                name = image_name(slug, resolution)
+                images[name], is_copied = publish_image(
+                    self.entries_dir / slug / f'{src_type}.jpg', name, digest
+                )
+                if is_copied and slug not in copied:
+                    copied.append(slug)
+        return images, copied
 
     def _get_title(self, entry_slug):
         """ Return a string for the title field. """
         path = self.entries_dir / entry_slug / 'entry.md'
         if os.path.isfile(path):
-            with open(path) as path_fd:
+            with open(path, encoding='utf-8') as path_fd:
                 return path_fd.readline()[2:].strip()
         return None
 
-    def _update_archive(self, archive_obj, title, subtitle, image):
-        changed = False
-        data = {
-            'title': title,
-            'subtitle': subtitle,
-            'image': image
-        }
-        for key, new_value in data.items():
+    def _render_entry(self, entry_obj):
+        """ Return the entry's unsaved content if its sources have
+        changed, or None. """
+        sources = read_sources(entry_obj.slug)
+        if sources['entry.md'] is None:
+            print('No entry.md', entry_obj.slug)
+            return None
+        char_map = get_char_map(entry_obj.entry_type, sources)
+        if not self.force and entry_obj.pk:
             try:
-                old_value = getattr(archive_obj, key)
-            except AttributeError:
-                continue
-            if old_value != new_value:
-                setattr(archive_obj, key, new_value)
-                changed = True
-        if changed:
-            archive_obj.save()
-            print('Updated archive', archive_obj.slug)
-
-    def _create_entry(self, entry_slug, entry_data):
-        """ Create a new entry. """
-        title = self._get_title(entry_slug)
-        last_update = parse_date(entry_data['last_update'])
-        Entry.objects.create(
-            archive=entry_data['archive'],
-            copyright_year=entry_data['copyright'],
-            last_update=last_update,
-            entry_type=entry_data.get('entry_type', 'study'),
-            lede=entry_data['lede'],
-            published=entry_data.get('published', False),
-            slug=entry_slug,
-            title=title,
-            weight=entry_data['weight']
-        )
-        self._cp_static(entry_slug, 'header')
-        self._cp_static(entry_slug, 'card', 120)
-        print('Created entry', entry_slug)
-
-    def _update_entry(self, entry_data):
-        """ Update an existing entry. """
-        entry_obj = entry_data['object']
-        entry_data['title'] = self._get_title(entry_obj.slug)
-        entry_data['last_update'] = parse_date(entry_data['last_update'])
-        changed = False
-        for key, new_value in entry_data.items():
+                old_hash = entry_obj.content.source_hash
+            except EntryContent.DoesNotExist:
+                old_hash = None
+            if old_hash == source_hash(
+                    entry_obj.entry_type, sources, char_map):
+                return None
+        content = render_content(entry_obj.entry_type, sources, char_map)
+        content.source_mtime = source_mtime(entry_obj.slug)
+        return content
+
+    def _read_manifest(self):
+        """ Return the last run's manifest, or an empty one if forced or
+        there is none. """
+        manifest = {'archives': [], 'entries': {}, 'files': {}}
+        if not self.force:
             try:
-                old_value = getattr(entry_obj, key)
-            except AttributeError:
+                with open(
+                        settings.ENTRY_MANIFEST, encoding='utf-8') as man_fd:
+                    manifest.update(json.load(man_fd))
+            except (FileNotFoundError, ValueError):
+                pass
+        return manifest
+
+    @staticmethod
+    def _write_manifest(manifest):
+        """ Atomically replace the manifest. """
+        path = os.fspath(settings.ENTRY_MANIFEST)
+        with tempfile.NamedTemporaryFile(
+                'w', dir=os.path.dirname(path), delete=False,
+                encoding='utf-8') as man_fd:
+            try:
+                json.dump(manifest, man_fd, indent=1, sort_keys=True)
+            except BaseException:
+                os.remove(man_fd.name)
+                raise
+        os.replace(man_fd.name, path)
+
+    @staticmethod
+    def _plan_archives(archive_map):
+        """ Return a dict mapping slugs to archives, with their fields set
+        from the archive config, and lists of the created and updated
+        archives and deleted slugs. """
+        archives = {obj.slug: obj for obj in Archive.objects.all()}
+        created, updated = [], []
+        for slug, data in archive_map.items():
+            obj = archives.get(slug)
+            if obj is None:
+                obj = Archive(slug=slug)
+                created.append(obj)
+            elif all(
+                    getattr(obj, field) == data[field]
+                    for field in ARCHIVE_FIELDS):
                 continue
-            if old_value != new_value:
-                setattr(entry_obj, key, new_value)
-                changed = True
-        if changed:
-            entry_obj.save()
-            print('Updated entry', entry_obj.slug)
-        self._cp_static(entry_obj.slug, 'header')
-        self._cp_static(entry_obj.slug, 'card', 120)
+            else:
+                updated.append(obj)
+            for field in ARCHIVE_FIELDS:
+                setattr(obj, field, data[field])
+            archives[slug] = obj
+        deleted = sorted(slug for slug in archives if slug not in archive_map)
+        for slug in deleted:
+            del archives[slug]
+        return archives, created, updated, deleted
+
+    def _read_entry(self, entry_obj, archives):
+        """ Set an entry's fields from its meta.py and title, and return
+        the names of the fields that changed. """
+        entry_data = _read_config(
+            self.entries_dir / entry_obj.slug / 'meta.py'
+        )
+        archive_slug = entry_data.get('archive')
+        values = {
+            'archive': archives.get(archive_slug),
+            'copyright_year': entry_data['copyright'],
+            'entry_type': entry_data.get('entry_type', 'study'),
+            'last_update': parse_date(entry_data['last_update']),
+            'lede': entry_data['lede'],
+            'published': entry_data.get('published', False),
+            'title': self._get_title(entry_obj.slug),
+            'weight': entry_data['weight'],
+        }
+        changed = []
+        for field, value in values.items():
+            if field == 'archive':
+                old_value = entry_obj.archive if entry_obj.archive_id else None
+            else:
+                old_value = getattr(entry_obj, field)
+            if entry_obj.pk is None or old_value != value:
+                setattr(entry_obj, field, value)
+                changed.append(field)
+        return changed
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Read and render all entries, changed or not.',
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Keep polling the data dir and import changes.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=WATCH_INTERVAL,
+            help='Seconds between polls in watch mode.',
+        )
+        parser.add_argument(
+            '--debounce',
+            type=float,
+            default=WATCH_DEBOUNCE,
+            help='Seconds without changes before importing in watch mode.',
+        )
 
     def handle(self, *args, **options):
-        """ Import entry data. """
+        """ Import entry data, then watch for changes if asked to. """
+        self.force = options['force']
+        self.data_dir = settings.BASE_DIR / 'var' / 'data'
+        self.entries_dir = self.data_dir / 'entries'
+        self.import_entries()
+        if options['watch']:
+            self.force = False
+            self.watch(options['interval'], options['debounce'])
 
-        # Read archive config.
-        with open(self.entries_dir / 'meta.py', encoding='utf-8') as cfg_fd:
-            archive_map = ast.literal_eval(cfg_fd.read())['archives']
+    def watch(self, interval, debounce):
+        """ Poll the data dir's file mtimes and sizes, and import once
+        they have been unchanged for debounce seconds after a change.
+        Imports only touch the changed entries and bump the versions of
+        the pages they show on. Failed imports, such as of a half-edited
+        meta.py, are reported and retried after the next change. """
+        print('Watching', self.data_dir)
+        files = _scan(self.data_dir)
+        changed_at = None
+        try:
+            while True:
+                time.sleep(interval)
+                new_files = _scan(self.data_dir)
+                if new_files != files:
+                    files = new_files
+                    changed_at = time.monotonic()
+                elif (changed_at is not None
+                        and time.monotonic() - changed_at >= debounce):
+                    changed_at = None
+                    try:
+                        self.import_entries()
+                    except Exception as error:  # pylint: disable=broad-except
+                        print('Import failed:', repr(error))
+        except KeyboardInterrupt:
+            print('Stopped watching')
 
-        # Process archive map/objects.
-        for obj in Archive.objects.all():
-            if obj.slug in archive_map:
-                archive_map[obj.slug]['object'] = obj
-                archive_map[obj.slug]['action'] = 'update'
-            else:
-                archive_map[obj.slug] = {'object': obj, 'action': 'delete'}
-
-        # Archive CRUD.
-        for archive_slug, archive_data in archive_map.items():
-            if archive_data.get('action') == 'update':
-                self._update_archive(
-                    archive_map[archive_slug]['object'],
-                    archive_data['title'],
-                    archive_data['subtitle'],
-                    archive_data['image']
+    def import_entries(self):
+        """ Import the changed archives and entries. """
+        old = self._read_manifest()
+        manifest = {
+            'entries': {},
+            'files': {
+                name: _stat_file(path, old['files'].get(name))
+                for name, path in (
+                    ('about.md', self.data_dir / 'about.md'),
+                    ('meta.py', self.entries_dir / 'meta.py'),
                 )
-            elif archive_data.get('action') == 'delete':
-                archive_data['object'].delete()
-                archive_data['object'] = None
-                print('Deleted archive', archive_slug)
+            },
+            'unihan': _changed_dataset(),
+        }
+
+        # Find the entry directories whose files changed, or whose entry
+        # isn't in the db, comparing mtimes and sizes before hashes.
+        entry_slugs = set(Entry.objects.values_list('slug', flat=True))
+        changed_slugs = []
+        for dir_entry in sorted(
+                os.scandir(self.entries_dir), key=lambda item: item.name):
+            if dir_entry.is_dir():
+                old_files = old['entries'].get(dir_entry.name, {})
+                files = _stat_dir(dir_entry.path, old_files)
+                if 'meta.py' not in files:
+                    continue
+                manifest['entries'][dir_entry.name] = files
+                if (dir_entry.name not in entry_slugs
+                        or _hashes(files) != _hashes(old_files)):
+                    changed_slugs.append(dir_entry.name)
+        deleted_slugs = sorted(entry_slugs - manifest['entries'].keys())
+
+        # Entry content links unihan data, so a new dataset may change
+        # any entry's content.
+        render_slugs = set(changed_slugs)
+        if manifest['unihan'] != old.get('unihan'):
+            render_slugs.update(manifest['entries'])
+
+        # Read the archive config if it changed, and the changed entries,
+        # and render their content before the transaction, so that it
+        # only writes.
+        archives = {obj.slug: obj for obj in Archive.objects.all()}
+        created_archives, updated_archives, deleted_archives = [], [], []
+        if (_hash(manifest['files'], 'meta.py')
+                != _hash(old['files'], 'meta.py')
+                or set(archives) != set(old['archives'])):
+            archive_map = _read_config(self.entries_dir / 'meta.py')[
+                'archives'
+            ]
+            archives, created_archives, updated_archives, deleted_archives = (
+                self._plan_archives(archive_map)
+            )
+        entries = {
+            obj.slug: obj for obj in Entry.objects.select_related(
+                'archive', 'content'
+            ).filter(slug__in=render_slugs)
+        }
+        created, updated, update_fields = [], [], set()
+        for slug in changed_slugs:
+            entry_obj = entries.setdefault(slug, Entry(slug=slug))
+            fields = self._read_entry(entry_obj, archives)
+            if entry_obj.pk is None:
+                created.append(entry_obj)
+            elif fields:
+                updated.append(entry_obj)
+                update_fields.update(fields)
+        new_contents, changed_contents = [], []
+        for slug in sorted(render_slugs):
+            entry_obj = entries[slug]
+            content = self._render_entry(entry_obj)
+            if content is None:
+                continue
+            if entry_obj.pk and hasattr(entry_obj, 'content'):
+                changed_contents.append(content)
             else:
-                obj = Archive.objects.create(
-                    slug=archive_slug,
-                    title=archive_data['title'],
-                    subtitle=archive_data['subtitle'],
-                    image=archive_data['image']
+                new_contents.append(content)
+            content.entry = entry_obj  # Linked once the entry is saved.
+
+        with transaction.atomic():
+            if deleted_archives:
+                # Deletion sends signals, which bump the entries' pages.
+                Archive.objects.filter(slug__in=deleted_archives).delete()
+            Archive.objects.bulk_create(created_archives)
+            if updated_archives:
+                Archive.objects.bulk_update(updated_archives, ARCHIVE_FIELDS)
+            if deleted_slugs:
+                Entry.objects.filter(slug__in=deleted_slugs).delete()
+            Entry.objects.bulk_create(created)
+            if updated:
+                Entry.objects.bulk_update(updated, sorted(update_fields))
+            EntryContent.objects.bulk_create(new_contents)
+            if changed_contents:
+                EntryContent.objects.bulk_update(
+                    changed_contents, CONTENT_FIELDS
                 )
-                archive_data['object'] = obj
-                print('Created archive', archive_slug)
-
-        # Map entry slug to entry data dict.
-        entry_map = {}
-        for dir_entry in os.scandir(self.entries_dir):
-            if os.path.isdir(dir_entry):
-                entry_file = Path(dir_entry) / 'meta.py'
-                if os.path.isfile(entry_file):
-                    with open(entry_file) as entry_fd:
-                        entry_config = ast.literal_eval(entry_fd.read())
-                    entry_map[dir_entry.name] = entry_config
-
-        # Process entry map/objects.
-        for entry_obj in Entry.objects.all():
-            if entry_obj.slug in entry_map:
-                entry_map[entry_obj.slug]['object'] = entry_obj
-                entry_map[entry_obj.slug]['action'] = 'update'
-            else:
-                entry_map[entry_obj.slug] = {
-                    'object': entry_obj, 'action': 'delete'
-                }
-
-        # Entry CRUD.
-        for entry_slug, entry_data in entry_map.items():
-            archive_slug = entry_map[entry_slug].get('archive')
-            if archive_slug:
-                archive_obj = archive_map[archive_slug]['object']
-                entry_map[entry_slug]['archive'] = archive_obj
-            else:
-                entry_map[entry_slug]['archive'] = None
-            if entry_data.get('action') == 'update':
-                self._update_entry(entry_data)
-            elif entry_data.get('action') == 'delete':
-                entry_data['object'].delete()
-                print('Deleted entry', entry_slug)
-                self._rm_static(entry_slug)
-                self._rm_static(entry_slug, 120)
-            else:
-                self._create_entry(entry_slug, entry_data)
+
+        # Publish images under content-hashed names, so they can be
+        # cached indefinitely, and find the entries whose names changed.
+        # Replaced images stay until the next import, for pages cached
+        # before this one.
+        images, copied = self._publish_images(manifest['entries'])
+        old_images = get_manifest()
+        image_slugs = [
+            slug for slug in sorted(manifest['entries'].keys() | entry_slugs)
+            if any(
+                images.get(name) != old_images.get(name)
+                for name in (image_name(slug, res) for _, res in IMAGES)
+            )
+        ]
+        removed = write_manifest(images)
+
+        # Bulk writes send no signals, so bump the changed pages'
+        # versions here. The about page is rendered from var/data.
+        names = [f'entry:{obj.slug}' for obj in created + updated]
+        names.extend(
+            f'entry:{content.entry.slug}'
+            for content in new_contents + changed_contents
+        )
+        names.extend(f'entry:{slug}' for slug in image_slugs)
+        if (created or updated or deleted_slugs or updated_archives
+                or image_slugs):
+            names.append('entries')
+        if (created_archives or updated_archives
+                or {obj.image for obj in archives.values()}
+                & set(image_slugs)):
+            names.append('archives')
+        for archive_obj in updated_archives:
+            names.append(f'archive:{archive_obj.slug}')
+            names.extend(
+                f'entry:{entry_slug}'
+                for entry_slug in archive_obj.entry_set.values_list(
+                    'slug', flat=True
+                )
+            )
+        if (_hash(manifest['files'], 'about.md')
+                != _hash(old['files'], 'about.md')):
+            names.append('about')
+        if names:
+            bump_versions(names)
+
+        manifest['archives'] = sorted(archives)
+        self._write_manifest(manifest)
+
+        # Summarize exactly what changed.
+        changes = {
+            'Created archives': [obj.slug for obj in created_archives],
+            'Updated archives': [obj.slug for obj in updated_archives],
+            'Deleted archives': deleted_archives,
+            'Created entries': [obj.slug for obj in created],
+            'Updated entries': [obj.slug for obj in updated],
+            'Rendered entries': [
+                content.entry.slug
+                for content in new_contents + changed_contents
+            ],
+            'Deleted entries': deleted_slugs,
+            'Copied images': copied,
+            'Removed images': removed,
+        }
+        for label, slugs in changes.items():
+            if slugs:
+                print('%s: %s' % (label, ', '.join(slugs)))
+        print('%d of %d entries changed' % (
+            len(changed_slugs) + len(deleted_slugs),
+            len(manifest['entries']) + len(deleted_slugs),
+        ))
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntryContent',
+            fields=[
+                ('entry', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='content', serialize=False, to='entry.entry')),
+                ('notes_html', models.TextField(default='')),
+                ('plain_html', models.TextField(default='')),
+                ('ref_links', models.JSONField(default=list)),
+                ('source_hash', models.CharField(default='', max_length=64)),
+                ('study_html', models.TextField(default='')),
+                ('vocabulary', models.JSONField(default=list)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0002_entry_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entrycontent',
+            name='source_mtime',
+            field=models.FloatField(default=0),
+        ),
+    ]
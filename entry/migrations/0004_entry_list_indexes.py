@@ -0,0 +1,25 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0003_entry_content_mtime'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(condition=models.Q(('published', True)), fields=['last_update'], name='entry_published_update_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['last_update'], name='entry_entry_last_up_e28af1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['archive', 'weight'], name='entry_entry_archive_fa0355_idx'),
+        ),
+    ]
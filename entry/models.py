@@ -25,12 +25,41 @@ class Archive(models.Model):
         return self.title
 
 
+class EntryQuerySet(models.QuerySet):
+    """ Entry queries. """
+
+    def type_startswith(self, prefix):
+        """ Filter entries with a type starting with prefix, as a range
+        that can use an index, unlike LIKE. """
+        return self.filter(
+            entry_type__gte=prefix,
+            entry_type__lt=prefix[:-1] + chr(ord(prefix[-1]) + 1),
+        )
+
+
 class Entry(models.Model):
     """ An entry. """
 
     class Meta:
-        """ Model meta tweaks. """
+        """ Model meta tweaks. Indexes match the list views' filters
+        and orders, so that rows are read in order up to the limit. They
+        end with the order column, since SQLite only uses the implicit
+        rowid after it to break ties by pk. Published entries have a
+        partial index because Django filters on a bare "published"
+        column, which SQLite can't search a (published, ...) index
+        with. """
         verbose_name_plural = 'Entries'
+        indexes = [
+            models.Index(
+                fields=['last_update'],
+                condition=models.Q(published=True),
+                name='entry_published_update_idx',
+            ),
+            models.Index(fields=['last_update']),
+            models.Index(fields=['archive', 'weight']),
+        ]
+
+    objects = EntryQuerySet.as_manager()
 
     entry_type = models.CharField(
         default='study',
@@ -67,3 +96,39 @@ class Entry(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class EntryContent(models.Model):
+    """ An entry's pre-rendered content. Rendered from the entry's
+    source files by importentries. """
+    entry = models.OneToOneField(
+        'Entry',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='content',
+    )
+    notes_html = models.TextField(
+        default='',
+    )
+    plain_html = models.TextField(
+        default='',
+    )
+    ref_links = models.JSONField(
+        default=list,
+    )
+    source_hash = models.CharField(
+        default='',
+        max_length=64,
+    )
+    source_mtime = models.FloatField(
+        default=0,
+    )
+    study_html = models.TextField(
+        default='',
+    )
+    vocabulary = models.JSONField(
+        default=list,
+    )
+
+    def __str__(self):
+        return self.entry.slug
@@ -0,0 +1,125 @@
+""" Entry rendering module. Entries are rendered from their source files
+once per change by importentries, and served from EntryContent. """
+import hashlib
+import os
+import markdown
+from django.conf import settings
+from unihan.annotate import UnihanExtension
+from unihan.blocks import is_unihan
+from unihan.views import unihan_map
+from entry.models import EntryContent
+
+
+SOURCE_FILES = ('entry.md', 'notes.md', 'refs.html')
+CONTENT_FIELDS = (
+    'notes_html',
+    'plain_html',
+    'ref_links',
+    'source_hash',
+    'source_mtime',
+    'study_html',
+    'vocabulary',
+)
+
+
+def get_entry_dir(slug):
+    """ Return the entry's source dir. """
+    return settings.BASE_DIR / 'var' / 'data' / 'entries' / slug
+
+
+def read_sources(slug):
+    """ Return a dict mapping source file names to their text, or None
+    for missing files. """
+    sources = {}
+    entry_dir = get_entry_dir(slug)
+    for name in SOURCE_FILES:
+        try:
+            with open(entry_dir / name, encoding='utf8') as source_fd:
+                sources[name] = source_fd.read()
+        except FileNotFoundError:
+            sources[name] = None
+    return sources
+
+
+def _split_entry(sources):
+    """ Return the entry.md lines and the entry text without its title
+    lines. """
+    lines = sources['entry.md'].splitlines(keepends=True)
+    return lines, ''.join(lines[2:])
+
+
+def get_char_map(entry_type, sources):
+    """ Return the unihan map of the characters an entry's content links,
+    from its entry text and, for study entries, its notes. """
+    _, entry = _split_entry(sources)
+    if entry_type == 'study':
+        return unihan_map(entry + (sources['notes.md'] or ''), False)
+    return unihan_map(entry, False)
+
+
+def source_hash(entry_type, sources, char_map=None):
+    """ Return a hash of everything an entry's content is rendered
+    from, including the unihan data its links are made from. Pass the
+    entry's char map if it has been made already. """
+    digest = hashlib.sha256(entry_type.encode())
+    for name in SOURCE_FILES:
+        digest.update(f'\0{name}\0'.encode())
+        if sources[name] is not None:
+            digest.update(sources[name].encode('utf8'))
+    if char_map is None:
+        char_map = get_char_map(entry_type, sources)
+    for obj in char_map.values():
+        digest.update(f'\0{obj.utf8}{obj.pinyin}\0{obj.definition}'.encode())
+    return digest.hexdigest()
+
+
+def _markdown(text, char_map=None):
+    """ Return HTML for markdown text, linking mapped characters. """
+    return markdown.markdown(
+        text, extensions=[UnihanExtension(unihan_map=char_map)]
+    )
+
+
+def render_content(entry_type, sources, char_map=None):
+    """ Return an unsaved EntryContent rendered from source texts. Study
+    entries have a plain page without unihan lines and a study page with
+    notes and vocabulary. Other entries have one page with
+    vocabulary. Pass the entry's char map if it has been made
+    already. """
+    lines, entry = _split_entry(sources)
+    notes = sources['notes.md']
+    if char_map is None:
+        char_map = get_char_map(entry_type, sources)
+    content = EntryContent(
+        source_hash=source_hash(entry_type, sources, char_map)
+    )
+    if entry_type == 'study':
+        plain = ''.join([
+            line for line in lines if not is_unihan(line[0])
+        ][2:])
+        content.plain_html = _markdown(plain)
+        content.study_html = _markdown(entry, char_map)
+        if notes is not None:
+            content.notes_html = _markdown(notes, char_map)
+    else:
+        content.plain_html = _markdown(entry, char_map)
+    content.vocabulary = [ord(char) for char in char_map]
+
+    # Refs file to list of links, one per line.
+    if sources['refs.html'] is not None:
+        content.ref_links = [
+            ref.strip() for ref in sources['refs.html'].splitlines()
+        ]
+    return content
+
+
+def source_mtime(slug):
+    """ Return the latest source file mtime, or 0. """
+    entry_dir = get_entry_dir(slug)
+    mtimes = [0]
+    for name in SOURCE_FILES:
+        try:
+            mtimes.append(os.stat(entry_dir / name).st_mtime)
+        except FileNotFoundError:
+            pass
+    return max(mtimes)
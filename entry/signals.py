@@ -0,0 +1,77 @@
+""" Entry signals module. Model changes bump the content versions of
+the cached pages that show them. """
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from common.versions import bump_versions
+from entry.models import Archive, Entry, EntryContent
+from entry.render import (
+    CONTENT_FIELDS,
+    read_sources,
+    render_content,
+    source_mtime,
+)
+from unihan.shards import shard_name
+from unihan.signals import characters_changed
+
+
+@receiver([post_save, pre_delete], sender=Archive)
+def archive_changed(sender, instance, **kwargs):
+    """ Bump the archive's versions and its entries' versions, before
+    deletion unlinks the entries. """
+    # pylint: disable=unused-argument
+    names = ['archives', 'entries', f'archive:{instance.slug}']
+    names.extend(
+        f'entry:{slug}'
+        for slug in instance.entry_set.values_list('slug', flat=True)
+    )
+    bump_versions(names)
+
+
+@receiver([post_save, post_delete], sender=Entry)
+def entry_changed(sender, instance, **kwargs):
+    """ Bump the entry's version and the entry lists' version. """
+    # pylint: disable=unused-argument
+    bump_versions(['entries', f'entry:{instance.slug}'])
+
+
+@receiver(post_save, sender=EntryContent)
+def content_changed(sender, instance, **kwargs):
+    """ Bump the entry's version. Content is only deleted with its
+    entry. """
+    # pylint: disable=unused-argument
+    bump_versions([f'entry:{instance.entry.slug}'])
+
+
+@receiver(characters_changed)
+def vocabulary_changed(sender, codepoints, inserted=(), **kwargs):
+    """ Re-render the content of entries with the changed characters in
+    their vocabulary, or the inserted characters in their text, since
+    their links hold the characters' readings and definitions, and bump
+    the versions of entries with vocabulary in the changed characters'
+    shards, since their pages link the replaced shard files. """
+    # pylint: disable=unused-argument
+    codepoints = set(codepoints)
+    inserted = set(inserted)
+    shards = set(map(shard_name, codepoints))
+    names, contents = [], []
+    for pk, slug, entry_type, vocabulary in EntryContent.objects.values_list(
+            'pk', 'entry__slug', 'entry__entry_type', 'vocabulary'):
+        if shards.intersection(map(shard_name, vocabulary)):
+            names.append(f'entry:{slug}')
+        if codepoints.isdisjoint(vocabulary) and not inserted:
+            continue
+        sources = read_sources(slug)
+        if sources['entry.md'] is None:
+            continue
+        if codepoints.isdisjoint(vocabulary) and inserted.isdisjoint(map(
+                ord, sources['entry.md'] + (sources['notes.md'] or ''))):
+            continue
+        content = render_content(entry_type, sources)
+        content.pk = pk
+        content.source_mtime = source_mtime(slug)
+        contents.append(content)
+        names.append(f'entry:{slug}')
+    if contents:
+        EntryContent.objects.bulk_update(contents, CONTENT_FIELDS)
+    if names:
+        bump_versions(names)
@@ -0,0 +1,33 @@
+""" Entry test case base module. """
+from entry.models import Archive, Entry
+from entry.render import render_content
+from unihan.tests.base import UnihanTestCase
+
+
+class LargeEntryTestCase(UnihanTestCase):
+    """ Parent class with a large study entry, /entry/large, linking
+    every test character. """
+    char_count = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        """ Create a study entry with every test character. """
+        super().setUpTestData()
+        chars = cls.chars(cls.char_count)
+        lines = [chars[i:i + 50] for i in range(0, len(chars), 50)]
+        entry = Entry.objects.create(
+            archive=Archive.objects.create(
+                slug='tong', title='Tong', subtitle='Various'
+            ),
+            lede='Lede.',
+            published=True,
+            slug='large',
+            title='Large',
+        )
+        content = render_content('study', {
+            'entry.md': '# Large\n\n' + '\n\n'.join(lines[::2]),
+            'notes.md': '\n\n'.join(lines[1::2]),
+            'refs.html': None,
+        })
+        content.entry = entry
+        content.save()
@@ -0,0 +1,95 @@
+""" Entry page cache compression test module. """
+import gzip
+import time
+import brotli
+from django.conf import settings
+from django.test import Client
+from common.pagecache import ENCODINGS, negotiate
+from entry.tests.base import LargeEntryTestCase
+
+
+class CompressionTestCase(LargeEntryTestCase):
+    """ Verify precompressed page variants on a large study entry. """
+
+    def setUp(self):
+        """ Use an anonymous client and a snapshot. """
+        super().setUp()
+        self.use_snapshot()
+        self.client = Client(HTTP_X_FORWARDED_HOST=settings.ALLOWED_HOSTS[0])
+
+    def test_negotiate(self):
+        """ Assert Accept-Encoding parsing and preference. """
+        self.assertEqual(negotiate(''), 'identity')
+        self.assertEqual(negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate('gzip;q=0, deflate'), 'identity')
+        self.assertEqual(negotiate('*'), ENCODINGS[0])
+        self.assertEqual(negotiate('GZIP; q=0.5, br'), 'br')
+        self.assertEqual(negotiate('gzip, br;q=0'), 'gzip')
+
+    def test_variants(self):
+        """ Assert compressed hits match the identity body and have
+        their own validators. """
+        identity = self.client.get('/entry/large/study')
+        self.assertFalse(identity.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', identity['Vary'])
+        decompress = {'br': brotli.decompress, 'gzip': gzip.decompress}
+        for accept, encoding in (
+                ('gzip', 'gzip'),  # Stored, then a cache hit.
+                ('gzip', 'gzip'),
+                ('gzip, deflate, br', 'br'),
+                ('br', 'br')):
+            response = self.client.get(
+                '/entry/large/study', HTTP_ACCEPT_ENCODING=accept
+            )
+            self.assertEqual(response['Content-Encoding'], encoding)
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertEqual(
+                decompress[encoding](response.content), identity.content
+            )
+            self.assertEqual(
+                response['ETag'], identity['ETag'][:-1] + f'-{encoding}"'
+            )
+        response = self.client.get(
+            '/entry/large/study',
+            HTTP_ACCEPT_ENCODING='br',
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_benchmark(self):
+        """ Log bytes saved and CPU per hit, cached variants against
+        compressing each hit. """
+        hits = 50
+        sizes = {}
+        timings = {}
+        for encoding in ('identity',) + ENCODINGS:
+            response = self.client.get(
+                '/entry/large/study', HTTP_ACCEPT_ENCODING=encoding
+            )
+            sizes[encoding] = len(response.content)
+            start = time.process_time()
+            for _ in range(hits):
+                self.client.get(
+                    '/entry/large/study', HTTP_ACCEPT_ENCODING=encoding
+                )
+            timings[encoding] = (time.process_time() - start) / hits
+        start = time.process_time()
+        for _ in range(hits):
+            response = self.client.get('/entry/large/study')
+            gzip.compress(response.content)
+        timings['identity + gzip'] = (time.process_time() - start) / hits
+        self._log(
+            'Compression benchmark, study entry with '
+            f'{self.char_count} characters: '
+            + ', '.join(
+                f'{encoding} {size} bytes '
+                f'({1 - size / sizes["identity"]:.0%} saved)'
+                for encoding, size in sizes.items()
+            )
+            + '; CPU per hit: '
+            + ', '.join(
+                f'{name} {seconds * 1000:.2f}ms'
+                for name, seconds in timings.items()
+            )
+        )
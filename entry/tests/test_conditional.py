@@ -0,0 +1,115 @@
+""" Entry conditional GET test module. """
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import Client
+from common.tests.base import BaseTestCase
+from entry.models import Archive, Entry, EntryContent
+
+
+class ConditionalTestCase(BaseTestCase):
+    """ Verify validators and 304 responses. """
+
+    @classmethod
+    def setUpTestData(cls):
+        """ Create a published entry with content. """
+        archive = Archive.objects.create(
+            slug='tong', title='Tong', subtitle='Various'
+        )
+        cls.entry = Entry.objects.create(
+            archive=archive,
+            lede='Lede.',
+            published=True,
+            slug='test',
+            title='Title',
+        )
+        EntryContent.objects.create(
+            entry=cls.entry, plain_html='<p>Old</p>', source_mtime=1e10
+        )
+
+    def setUp(self):
+        """ Use an anonymous client. """
+        super().setUp()
+        self.client = Client(HTTP_X_FORWARDED_HOST=settings.ALLOWED_HOSTS[0])
+
+    def test_entry(self):
+        """ Assert an entry 304 costs one query, and content changes
+        change the validators. """
+        response = self.client.get('/entry/test')
+        etag = response['ETag']
+        self.assertEqual(
+            response['Last-Modified'], 'Sat, 20 Nov 2286 17:46:40 GMT'
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/entry/test', HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('max-age=900', response['Cache-Control'])
+        response = self.client.get(
+            '/entry/test',
+            HTTP_IF_MODIFIED_SINCE='Sat, 20 Nov 2286 17:46:40 GMT',
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(
+            self.client.get('/entry/test/study').status_code, 200
+        )
+        EntryContent.objects.get().save()
+        response = self.client.get('/entry/test', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get('/entry/none').status_code, 404)
+
+    def test_lists(self):
+        """ Assert lists, the feed and the sitemap are validated. """
+        for path in ('/', '/blog/', '/tag/tong', '/rss', '/sitemap.xml'):
+            etag = self.client.get(path)['ETag']
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, path)
+
+    def test_staff(self):
+        """ Assert staff get their own validators. """
+        etag = self.client.get('/entry/test')['ETag']
+        user = User.objects.create(username='staff', is_staff=True)
+        self.client.force_login(user)
+        response = self.client.get('/entry/test', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        response = self.client.get(
+            '/entry/test', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing(self):
+        """ Assert conditional requests for drafts and missing pages get
+        404s, not 304s. """
+        self.entry.published = False
+        self.entry.save()
+        since = 'Fri, 01 Jan 2099 00:00:00 GMT'
+        for path in ('/entry/test', '/tag/none'):
+            for header in (
+                    {'HTTP_IF_MODIFIED_SINCE': since},
+                    {'HTTP_IF_NONE_MATCH': '*'}):
+                response = self.client.get(path, **header)
+                self.assertEqual(response.status_code, 404, path)
+        user = User.objects.create(username='staff', is_staff=True)
+        self.client.force_login(user)
+        response = self.client.get(
+            '/entry/test', HTTP_IF_NONE_MATCH='*'
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_not_study(self):
+        """ Assert conditional requests for the study page of an entry
+        that isn't a study get 404s. """
+        Entry.objects.filter(pk=self.entry.pk).update(entry_type='poem')
+        response = self.client.get(
+            '/entry/test/study',
+            HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2300 00:00:00 GMT',
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            '/entry/test',
+            HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2300 00:00:00 GMT',
+        )
+        self.assertEqual(response.status_code, 304)
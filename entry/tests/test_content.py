@@ -0,0 +1,100 @@
+""" Entry pre-rendered content test module. """
+from unittest import mock
+from django.conf import settings
+from django.test import Client
+from entry.models import Archive, Entry
+from entry.render import render_content, source_hash
+from unihan.views import unihan_map
+from unihan.tests.base import UnihanTestCase
+
+
+SOURCES = {
+    'entry.md': '# Title\n\n一丁\n\nPlain line.\n',
+    'notes.md': '丂 is a note.\n',
+    'refs.html': '<a href="#a">A</a>\n<a href="#b">B</a>\n',
+}
+
+
+class ContentTestCase(UnihanTestCase):
+    """ Verify entries are served from pre-rendered content. """
+
+    @classmethod
+    def setUpTestData(cls):
+        """ Create a published study entry with rendered content. """
+        super().setUpTestData()
+        archive = Archive.objects.create(
+            slug='tong', title='Tong', subtitle='Various'
+        )
+        cls.entry = Entry.objects.create(
+            archive=archive,
+            lede='Lede.',
+            published=True,
+            slug='test',
+            title='Title',
+        )
+        content = render_content('study', SOURCES)
+        content.entry = cls.entry
+        content.save()
+
+    def test_render(self):
+        """ Assert plain and study content and the vocabulary. """
+        content = self.entry.content
+        self.assertNotIn('一', content.plain_html)
+        self.assertIn('Plain line.', content.plain_html)
+        self.assertIn('href="#一"', content.study_html)
+        self.assertIn('href="#丂"', content.notes_html)
+        self.assertEqual(content.vocabulary, [0x4E00, 0x4E01, 0x4E02])
+        self.assertEqual(content.ref_links[1], '<a href="#b">B</a>')
+        self.assertEqual(
+            content.source_hash, source_hash('study', SOURCES)
+        )
+        self.assertNotEqual(content.source_hash, source_hash(
+            'study', dict(SOURCES, **{'notes.md': None})
+        ))
+        with mock.patch(
+                'entry.render.unihan_map', side_effect=unihan_map
+        ) as mapper:
+            render_content('study', SOURCES)
+        self.assertEqual(mapper.call_count, 1)
+
+    def test_missing_sources(self):
+        """ Assert entries with no content or entry.md are not found. """
+        Entry.objects.create(
+            archive=self.entry.archive,
+            published=True,
+            slug='no-sources',
+            title='None',
+        )
+        client = Client(HTTP_X_FORWARDED_HOST=settings.ALLOWED_HOSTS[0])
+        response = client.get('/entry/no-sources')
+        self.assertEqual(response.status_code, 404)
+
+    @mock.patch('entry.views.read_sources', side_effect=AssertionError)
+    def test_one_query(self, _):
+        """ Assert cold study and plain requests make one query and read
+        no source files. """
+        self.use_snapshot()
+        client = Client(HTTP_X_FORWARDED_HOST=settings.ALLOWED_HOSTS[0])
+        with self.assertNumQueries(1):
+            response = client.get('/entry/test/study')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'href="#丂"')
+        self.assertContains(response, '<a href="#b">B</a>')
+        with self.assertNumQueries(1):
+            response = client.get('/entry/test')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'href="#一"')
+
+    @mock.patch('entry.views.get_characters', side_effect=AssertionError)
+    def test_shards(self, _):
+        """ Assert pages link the vocabulary's shards instead of
+        embedding its characters when there are shards. """
+        self.use_shards()
+        client = Client(HTTP_X_FORWARDED_HOST=settings.ALLOWED_HOSTS[0])
+        with self.assertNumQueries(1):
+            response = client.get('/entry/test/study')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'href="#丂"')
+        self.assertContains(response, '<script id="unihan-dict"')
+        self.assertContains(response, '/static/unihan/dict/04e00.')
+        self.assertNotContains(response, 'class="character"')
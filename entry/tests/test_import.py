@@ -0,0 +1,233 @@
+""" Entry import test module. """
+from contextlib import redirect_stdout
+import io
+import os
+from pathlib import Path
+import shutil
+import tempfile
+from unittest import mock
+from django.core.management import call_command
+from django.test import override_settings
+from common.versions import get_versions
+from entry.images import get_image, get_manifest
+from entry.models import Entry, EntryContent
+from unihan.cache import bump_version
+from unihan.models import UnihanCharacter
+from unihan.signals import characters_changed
+from unihan.tests.base import UnihanTestCase
+
+
+COMMAND = 'entry.management.commands.importentries'
+
+
+class ImportTestCase(UnihanTestCase):
+    """ Verify importentries only reads and writes changed entries. """
+
+    def setUp(self):
+        """ Write an archive config and three entries to a temp dir. """
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.base_dir = Path(temp_dir.name)
+        self.entries_dir = self.base_dir / 'var' / 'data' / 'entries'
+        self.img_dir = self.base_dir / 'entry' / 'static' / 'entry' / 'img'
+        os.makedirs(self.img_dir)
+        self.write('about.md', '# About\n', self.entries_dir.parent)
+        self.write('meta.py', repr({'archives': {
+            'tong': {'title': 'Tong', 'subtitle': 'Various', 'image': 'a'},
+        }}))
+        for weight, slug in enumerate('abc'):
+            self.write_entry(slug, weight, f'# {slug.upper()}\n\n一丁\n')
+        settings_override = override_settings(
+            BASE_DIR=self.base_dir,
+            ENTRY_IMG_DIR=self.img_dir,
+            ENTRY_MANIFEST=self.base_dir / 'var' / 'entries.manifest.json',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write(self, name, text, path=None):
+        """ Write a file in the entries dir or another dir. """
+        path = path or self.entries_dir
+        os.makedirs(path, exist_ok=True)
+        with open(path / name, 'w', encoding='utf-8') as file_fd:
+            file_fd.write(text)
+
+    def write_entry(self, slug, weight, text):
+        """ Write an entry's meta.py, entry.md and images. """
+        self.write('meta.py', repr({
+            'archive': 'tong',
+            'copyright': '2024',
+            'last_update': '2024-03-01',
+            'lede': 'Lede.',
+            'published': True,
+            'weight': weight,
+        }), self.entries_dir / slug)
+        self.write('entry.md', text, self.entries_dir / slug)
+        for name in ('header.jpg', 'card.jpg'):
+            self.write(name, f'{slug} {name}', self.entries_dir / slug)
+
+    def run_import(self):
+        """ Run importentries and return its output. """
+        with redirect_stdout(io.StringIO()) as output:
+            call_command('importentries')
+        return output.getvalue()
+
+    def test_import(self):
+        """ Assert the first run creates everything, and later runs read
+        and write only changed entries. """
+        output = self.run_import()
+        self.assertIn('Created entries: a, b, c', output)
+        self.assertIn('Copied images: a, b, c', output)
+        self.assertEqual(EntryContent.objects.count(), 3)
+        self.assertEqual(len(get_manifest()), 6)
+        self.assertRegex(get_image('b', 120), r'^b-120\.[0-9a-f]{12}\.jpg$')
+        self.assertTrue(os.path.exists(self.img_dir / get_image('b', 120)))
+        old_card = get_image('c', 120)
+        versions = get_versions(['entries', 'entry:a', 'about'])
+
+        # Unchanged runs open no entry files and write nothing.
+        with mock.patch(f'{COMMAND}.read_sources') as read_sources, \
+                mock.patch(f'{COMMAND}._file_hash') as file_hash, \
+                self.assertNumQueries(7):
+            output = self.run_import()
+        read_sources.assert_not_called()
+        file_hash.assert_not_called()
+        self.assertEqual(output, '0 of 3 entries changed\n')
+
+        # Touched files are hashed, and unchanged.
+        os.utime(self.entries_dir / 'a' / 'entry.md', (0, 0))
+        self.assertEqual(self.run_import(), '0 of 3 entries changed\n')
+        self.assertEqual(
+            get_versions(['entries', 'entry:a', 'about']), versions
+        )
+
+        # Edits update and render only their entries.
+        self.write('entry.md', '# Bee\n\n丂\n', self.entries_dir / 'b')
+        self.write('card.jpg', 'new card', self.entries_dir / 'c')
+        output = self.run_import()
+        self._log(output)
+        self.assertIn('Updated entries: b\n', output)
+        self.assertIn('Rendered entries: b\n', output)
+        self.assertIn('Copied images: c\n', output)
+        self.assertIn('2 of 3 entries changed', output)
+        entry = Entry.objects.select_related('content').get(slug='b')
+        self.assertEqual(entry.title, 'Bee')
+        self.assertEqual(entry.content.vocabulary, [0x4E02])
+        new_card = get_image('c', 120)
+        self.assertNotEqual(new_card, old_card)
+        with open(self.img_dir / new_card, encoding='utf-8') as img_fd:
+            self.assertEqual(img_fd.read(), 'new card')
+        new_versions = get_versions(['entries', 'entry:a', 'about'])
+        self.assertNotEqual(new_versions[0], versions[0])
+        self.assertEqual(new_versions[1:], versions[1:])
+
+        # Replaced images are kept for cached pages until the next
+        # import, and removed directories delete their entries.
+        self.assertTrue(os.path.exists(self.img_dir / old_card))
+        shutil.rmtree(self.entries_dir / 'c')
+        output = self.run_import()
+        self.assertIn('Deleted entries: c\n', output)
+        self.assertIn(f'Removed images: {old_card}\n', output)
+        self.assertFalse(Entry.objects.filter(slug='c').exists())
+        self.assertEqual(get_image('c', 120), 'c-120.jpg')
+        self.assertTrue(os.path.exists(self.img_dir / new_card))
+
+        # Archive config changes update the archive.
+        self.write('meta.py', repr({'archives': {
+            'tong': {'title': 'Tong', 'subtitle': 'Other', 'image': 'a'},
+        }}))
+        output = self.run_import()
+        self.assertIn('Updated archives: tong\n', output)
+        self.assertIn(f'Removed images: {new_card}, c.', output)
+        self.assertFalse(os.path.exists(self.img_dir / new_card))
+        self.assertEqual(
+            Entry.objects.get(slug='a').archive.subtitle, 'Other'
+        )
+
+    def test_characters_changed(self):
+        """ Assert changed characters re-render the content of entries
+        with them in their vocabulary only, and inserted characters the
+        content of entries with them in their text. """
+        self.write_entry('b', 1, '# B\n\n丂\n')
+        self.write_entry('c', 2, '# C\n\n一\u5400\n')
+        self.run_import()
+        self.assertEqual(
+            EntryContent.objects.get(entry__slug='c').vocabulary, [0x4E00]
+        )
+        UnihanCharacter.objects.filter(codepoint=0x4E01).update(
+            definition='amended'
+        )
+        bump_version()
+        versions = get_versions(['entry:a', 'entry:b'])
+        characters_changed.send(sender=None, codepoints={0x4E01})
+        contents = {
+            content.entry.slug: content
+            for content in EntryContent.objects.select_related('entry')
+        }
+        self.assertIn('amended', contents['a'].study_html)
+        self.assertNotIn('amended', contents['b'].study_html)
+        self.assertNotEqual(get_versions(['entry:a']), versions[:1])
+        self.assertContains(self.client.get('/entry/a/study'), 'amended')
+
+        UnihanCharacter.objects.create(
+            codepoint=0x5400,
+            definition='inserted',
+            pinyin='kǒu',
+            residual_strokes=0,
+            sort_order=0x5400,
+            utf8='\u5400',
+        )
+        bump_version()
+        versions = get_versions(['entry:b', 'entry:c'])
+        characters_changed.send(
+            sender=None, codepoints={0x5400}, inserted={0x5400}
+        )
+        content = EntryContent.objects.get(entry__slug='c')
+        self.assertEqual(content.vocabulary, [0x4E00, 0x5400])
+        self.assertIn('inserted', content.study_html)
+        self.assertEqual(get_versions(['entry:b']), versions[:1])
+        self.assertNotEqual(get_versions(['entry:c']), versions[1:])
+
+    def test_views(self):
+        """ Assert pages link the published images' hashed names. """
+        self.run_import()
+        response = self.client.get('/entry/b')
+        self.assertContains(response, get_image('b'))
+        self.assertContains(response, get_image('b', 120))
+        self.assertContains(self.client.get('/'), get_image('a', 120))
+        self.assertContains(
+            self.client.get('/tag/tong'), get_image('c', 120)
+        )
+
+    def test_watch(self):
+        """ Assert watch mode imports each settled burst of edits, and
+        keeps watching after failed imports. """
+        edits = [
+            lambda: self.write(
+                'entry.md', '# B\n\n丂\n', self.entries_dir / 'b'
+            ),
+            None,
+            lambda: self.write('meta.py', '{', self.entries_dir / 'c'),
+            None,
+        ]
+
+        def sleep(_):
+            """ Make the next edit, then stop. """
+            if not edits:
+                raise KeyboardInterrupt
+            edit = edits.pop(0)
+            if edit:
+                edit()
+
+        with mock.patch(f'{COMMAND}.time.sleep', side_effect=sleep), \
+                redirect_stdout(io.StringIO()) as output:
+            call_command('importentries', '--watch', '--debounce', '0')
+        output = output.getvalue()
+        self._log(output)
+        self.assertIn('Rendered entries: b\n1 of 3 entries changed', output)
+        self.assertIn('Import failed: SyntaxError', output)
+        self.assertTrue(output.endswith('Stopped watching\n'))
+        self.assertEqual(
+            Entry.objects.get(slug='b').content.vocabulary, [0x4E02]
+        )
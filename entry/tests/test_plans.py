@@ -0,0 +1,92 @@
+""" Entry list query plan test module. """
+from datetime import date, timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from common.tests.base import BaseTestCase
+from entry.models import Archive, Entry
+
+
+class PlanTestCase(BaseTestCase):
+    """ Verify list views read entries through indexes. """
+
+    @classmethod
+    def setUpTestData(cls):
+        """ Create archives of published and draft entries of each
+        type. """
+        Entry.objects.bulk_create([
+            Entry(
+                archive=archive,
+                entry_type=('study', 'notes', 'study-x')[index % 3],
+                last_update=date(2024, 1, 1) + timedelta(days=index),
+                lede='Lede.',
+                published=bool(index % 4),
+                slug=f'{archive.slug}-{index}',
+                title=f'Title {index}',
+                weight=index,
+            )
+            for archive in Archive.objects.bulk_create([
+                Archive(slug=slug, title=slug, subtitle=slug)
+                for slug in ('tong', 'dao', 'de')
+            ])
+            for index in range(40)
+        ])
+        cls.user = User.objects.create_user('user')
+
+    def get_plans(self, client, path):
+        """ Return the query plan details of a page's entry queries. """
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+            self.assertEqual(response.status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                if 'FROM "entry_' in query['sql']:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                    plans.append([row[-1] for row in cursor.fetchall()])
+        self.assertTrue(plans)
+        return plans
+
+    def assert_indexed(self, client, path):
+        """ Assert a page's entry queries neither scan a table nor sort
+        in a temp b-tree. """
+        for plan in self.get_plans(client, path):
+            for detail in plan:
+                self._log(f'{path} {detail}')
+                self.assertNotIn('TEMP B-TREE', detail, path)
+                if detail.startswith('SCAN'):
+                    self.assertIn('INDEX', detail, path)
+
+    def test_plans(self):
+        """ Assert the anonymous and authenticated list views' plans. """
+        client = Client(HTTP_X_FORWARDED_HOST=settings.ALLOWED_HOSTS[0])
+        paths = [
+            reverse('blog-index'),
+            reverse('blog-rss'),
+            reverse('archive-list', args=['tong']),
+            reverse('archive-index'),
+            reverse('django.contrib.sitemaps.views.sitemap'),
+        ]
+        for path in paths:
+            self.assert_indexed(client, path)
+        self.assertIn(
+            'USING INDEX entry_published_update_idx',
+            self.get_plans(client, paths[0])[0][0],
+        )
+        client.force_login(self.user)
+        for path in paths[:4]:
+            self.assert_indexed(client, path)
+
+    def test_type_startswith(self):
+        """ Assert the type range matches startswith. """
+        self.assertEqual(
+            list(Entry.objects.type_startswith('study').order_by('pk')),
+            list(Entry.objects.filter(
+                entry_type__startswith='study'
+            ).order_by('pk')),
+        )
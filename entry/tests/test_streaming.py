@@ -0,0 +1,65 @@
+""" Entry page streaming test module. """
+import gzip
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.test import AsyncClient, Client
+from entry.tests.base import LargeEntryTestCase
+from entry.views import get_characters
+
+
+class StreamingTestCase(LargeEntryTestCase):
+    """ Verify entry pages stream under ASGI. """
+
+    def setUp(self):
+        """ Use anonymous ASGI and WSGI clients. """
+        super().setUp()
+        self.async_client = AsyncClient(
+            headers={'X-Forwarded-Host': settings.ALLOWED_HOSTS[0]}
+        )
+        self.client = Client(HTTP_X_FORWARDED_HOST=settings.ALLOWED_HOSTS[0])
+
+    async def test_lazy_sections(self):
+        """ Assert the article is sent before the vocabulary is looked
+        up, and the streamed page matches the buffered page. """
+        path = '/entry/large/study'
+        with mock.patch(
+                'entry.views.get_characters', wraps=get_characters) as found:
+            response = await self.async_client.get(path)
+            self.assertTrue(response.streaming)
+            chunks = aiter(response.streaming_content)
+            head = await anext(chunks)
+            self.assertIn(b'<h1>Large</h1>', head)
+            self.assertNotIn(b'id="notes"', head)
+            found.assert_not_called()
+            body = head + b''.join([chunk async for chunk in chunks])
+            found.assert_called_once()
+        self.assertIn(b'class="character"', body)
+        await cache.aclear()
+        with self.settings(ENTRY_STREAMING=False):
+            buffered = await self.async_client.get(path)
+        self.assertFalse(buffered.streaming)
+        self.assertEqual(body, buffered.content)
+
+    async def test_cache(self):
+        """ Assert a streamed page is cached once sent, and served
+        precompressed from the cache. """
+        path = '/entry/large/study'
+        response = await self.async_client.get(
+            path, headers={'Accept-Encoding': 'gzip'}
+        )
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        response = await self.async_client.get(
+            path, headers={'Accept-Encoding': 'gzip'}
+        )
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), body)
+
+    def test_wsgi(self):
+        """ Assert WSGI requests are not streamed. """
+        response = self.client.get('/entry/large/study')
+        self.assertFalse(response.streaming)
+        self.assertContains(response, 'class="character"')
@@ -0,0 +1,102 @@
+""" Entry content version test module. """
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, override_settings
+from common.tests.base import BaseTestCase
+from common.versions import SITE, bump_versions, get_versions
+from entry.models import Archive, Entry, EntryContent
+from unihan.signals import characters_changed
+
+
+class VersionTestCase(BaseTestCase):
+    """ Verify cached pages are invalidated by model changes. """
+
+    @classmethod
+    def setUpTestData(cls):
+        """ Create a published entry with content. """
+        cls.archive = Archive.objects.create(
+            slug='tong', title='Tong', subtitle='Various'
+        )
+        cls.entry = Entry.objects.create(
+            archive=cls.archive,
+            lede='Lede.',
+            published=True,
+            slug='test',
+            title='Title',
+        )
+        EntryContent.objects.create(
+            entry=cls.entry, plain_html='<p>Old</p>', vocabulary=[0x4E00]
+        )
+
+    def setUp(self):
+        """ Use an anonymous client. """
+        super().setUp()
+        self.client = Client(HTTP_X_FORWARDED_HOST=settings.ALLOWED_HOSTS[0])
+
+    def test_entry_versions(self):
+        """ Assert pages are cached until their content changes. """
+        response = self.client.get('/entry/test')
+        self.assertContains(response, 'Old')
+        self.assertIn('max-age=900', response['Cache-Control'])
+        EntryContent.objects.update(plain_html='<p>New</p>')
+        self.assertContains(self.client.get('/entry/test'), 'Old')
+        self.assertContains(self.client.get('/tag/tong'), 'Title')
+
+        # Content saves bump the entry's version only.
+        EntryContent.objects.get().save()
+        self.assertContains(self.client.get('/entry/test'), 'New')
+        Entry.objects.update(title='Renamed')
+        self.assertContains(self.client.get('/tag/tong'), 'Title')
+
+        # Entry saves bump the entry lists' version.
+        self.entry.refresh_from_db()
+        self.entry.save()
+        self.assertContains(self.client.get('/tag/tong'), 'Renamed')
+
+    def test_missing_pages(self):
+        """ Assert requests for missing pages create no version keys, and
+        new versions are newer than the site version. """
+        for path in ('/entry/none', '/tag/none', '/entry/none/study'):
+            self.assertEqual(self.client.get(path).status_code, 404)
+        self.assertEqual(
+            cache.get_many(['version:entry:none', 'version:archive:none']),
+            {},
+        )
+        site, = get_versions([SITE])
+        self.assertEqual(get_versions(['entry:none']), [site])
+        cache.set('version:site', int(time.time()) + 60, None)
+        site, = get_versions([SITE])
+        self.assertGreater(bump_versions(['entry:none'])['entry:none'], site)
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    })
+    def test_dummy_cache(self):
+        """ Assert a dummy cache gives no versions, so pages get no
+        validators. """
+        self.assertEqual(get_versions([SITE, 'entry:test']), [None, None])
+        response = self.client.get('/entry/test')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_archive_versions(self):
+        """ Assert archive saves invalidate their entries' pages. """
+        self.assertContains(self.client.get('/entry/test'), 'Tong')
+        self.archive.title = 'Various'
+        self.archive.save()
+        self.assertContains(self.client.get('/entry/test'), 'Various')
+        self.assertContains(self.client.get('/'), 'Various')
+
+    def test_characters_changed(self):
+        """ Assert changed characters invalidate the entries with
+        vocabulary in their shards only. """
+        version = get_versions(['entry:test'])
+        characters_changed.send(sender=None, codepoints={0x20000})
+        self.assertEqual(get_versions(['entry:test']), version)
+        self.assertContains(self.client.get('/entry/test'), 'Old')
+        EntryContent.objects.update(plain_html='<p>New</p>')
+        characters_changed.send(sender=None, codepoints={0x4E01})
+        self.assertContains(self.client.get('/entry/test'), 'New')
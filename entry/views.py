@@ -1,21 +1,30 @@
 """ Entry app views module. """
+import calendar
 from datetime import datetime
-import os
-import markdown
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.syndication.views import Feed
-from django.http import Http404, HttpResponseRedirect
-from django.shortcuts import get_object_or_404
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils.decorators import method_decorator
 from django.utils.formats import date_format
 from django.views.generic import DetailView, ListView
 from common.decorators import cache_public
-from unihan.views import is_unihan, unihan_map
-from entry.models import Archive, Entry
+from unihan.cards import get_cards
+from unihan.shards import SHARD_BITS, get_shard_urls
+from unihan.views import get_characters
+from entry.images import get_image
+from entry.models import Archive, Entry, EntryContent
+from entry.render import read_sources, render_content
 
 
-@method_decorator(cache_public(60 * 15), name='dispatch')
+STREAM_SLOT = '<!-- stream -->'
+STREAM_SECTIONS = ('entry/entry-notes.html', 'entry/entry-vocabulary.html')
+
+
+@method_decorator(cache_public(versions=('entries',)), name='dispatch')
 class BlogIndex(ListView):
     """ Reverse-chronological view of the last nine entries. """
     # pylint: disable=too-many-ancestors
@@ -31,21 +40,20 @@ class BlogIndex(ListView):
     def get_queryset(self):
         """ Return entries for the grid. """
         if self.request.user.is_authenticated:
-            entries = Entry.objects.filter(
-                entry_type__startswith='study'
+            entries = Entry.objects.type_startswith(
+                'study'
             ).order_by('-last_update', '-pk')[:9]
         else:
-            entries = Entry.objects.filter(
-                entry_type__startswith='study',
+            entries = Entry.objects.type_startswith('study').filter(
                 published=True
             ).order_by('-last_update', '-pk')[:9]
         for entry in entries:
             entry.card_date = f'Last update {date_format(entry.last_update)}'
-            entry.card_img = f'{entry.slug}-120.jpg'
+            entry.card_img = get_image(entry.slug, 120)
         return entries
 
 
-@method_decorator(cache_public(60 * 15), name='__call__')
+@method_decorator(cache_public(versions=('entries',)), name='__call__')
 class BlogFeed(Feed):
     """ Blog RSS feed. """
     title = "Daoistic"
@@ -54,9 +62,8 @@ class BlogFeed(Feed):
 
     def items(self):
         """ Return published items ordered by last update. """
-        return Entry.objects.filter(
-            published=True,
-            entry_type__startswith='study'
+        return Entry.objects.type_startswith('study').filter(
+            published=True
         ).order_by('-last_update', '-pk')[:9]
 
     def item_title(self, item):
@@ -76,7 +83,7 @@ class BlogFeed(Feed):
         return datetime.combine(item.last_update, datetime.min.time())
 
 
-@method_decorator(cache_public(60 * 15), name='dispatch')
+@method_decorator(cache_public(versions=('archives',)), name='dispatch')
 class ArchiveIndex(ListView):
     """ List of archive cards. """
     # pylint: disable=too-many-ancestors
@@ -93,11 +100,30 @@ class ArchiveIndex(ListView):
         """ Return objects for the grid. """
         archives = Archive.objects.all().order_by('slug')
         for archive in archives:
-            archive.card_img = f'{archive.image}-120.jpg'
+            archive.card_img = get_image(archive.image, 120)
         return archives
 
 
-@method_decorator(cache_public(60 * 15), name='dispatch')
+def get_archive(request, slug):
+    """ Return the archive, or None, memoized on the request for the
+    validators and the view. """
+    if not hasattr(request, 'archive'):
+        request.archive = Archive.objects.filter(slug=slug).first()
+    return request.archive
+
+
+def archive_modified(request, slug):
+    """ Return 0, leaving the archive's versions to date it, or None if
+    there is no such archive. """
+    if get_archive(request, slug) is None:
+        return None
+    return 0
+
+
+@method_decorator(cache_public(
+    versions=('archive:{slug}', 'entries'),
+    last_modified=archive_modified,
+), name='dispatch')
 class ArchiveList(ListView):
     """ List of entry cards. """
     # pylint: disable=too-many-ancestors
@@ -112,7 +138,9 @@ class ArchiveList(ListView):
                 route = request.resolver_match.route.split('/')[:-1] + ['tong']
                 redirect_url = '/' + '/'.join(route)
                 return HttpResponseRedirect(redirect_url)
-            self.archive = get_object_or_404(Archive, slug=slug)
+            self.archive = get_archive(request, slug)
+            if self.archive is None:
+                raise Http404()
             return super().get(request, *args, **kwargs)
         raise Http404()
 
@@ -134,92 +162,167 @@ class ArchiveList(ListView):
                 published=True
             ).order_by('weight')
         for entry in entries:
-            entry.card_img = f'{entry.slug}-120.jpg'
+            entry.card_img = get_image(entry.slug, 120)
         return entries
 
 
-@method_decorator(cache_public(60 * 15), name='dispatch')
+def get_entry(request, slug):
+    """ Return the entry with its archive and content, or None,
+    memoized on the request for the validators and the view. """
+    if not hasattr(request, 'entry'):
+        request.entry = Entry.objects.select_related(
+            'archive', 'content'
+        ).filter(slug=slug).first()
+    return request.entry
+
+
+def entry_modified(request, slug):
+    """ Return the entry's last update or source file timestamp, or None
+    if the view would 404: there is no such entry, it is unpublished and
+    the user anonymous, or its study page is asked for and it is not a
+    study entry. """
+    obj = get_entry(request, slug)
+    if obj is None:
+        return None
+    if not obj.published and not request.user.is_authenticated:
+        return None
+    if (request.resolver_match.url_name == 'entry-study'
+            and obj.entry_type != 'study'):
+        return None
+    mtime = 0
+    try:
+        mtime = obj.content.source_mtime
+    except EntryContent.DoesNotExist:
+        pass
+    return max(calendar.timegm(obj.last_update.timetuple()), mtime)
+
+
+@method_decorator(cache_public(
+    versions=('entry:{slug}',),
+    last_modified=entry_modified,
+), name='dispatch')
 class EntryDetails(DetailView):
-    """ Entry details view. """
+    """ Entry details view, served from pre-rendered content. """
     model = Entry
     template_name = 'entry/entry.html'
 
     def get_object(self, queryset=None):
-        """ Raise 404 for unpublished entries. """
-        obj = super().get_object()
+        """ Raise 404 for missing or unpublished entries. """
+        obj = get_entry(self.request, self.kwargs['slug'])
+        if obj is None:
+            raise Http404()
         if not obj.published and not self.request.user.is_authenticated:
             raise Http404()
         return obj
 
     def get_context_data(self, **kwargs):
         """ Insert data into template context. """
-        # pylint: disable=too-many-locals,too-many-statements,too-many-branches
         context = super().get_context_data(**kwargs)
         obj = context['object']
         context['page_title'] = obj.title
         context['entry_date'] = f'Last update {date_format(obj.last_update)}.'
-        entry_dir = settings.BASE_DIR / 'var' / 'data' / 'entries' / obj.slug
+        try:
+            content = obj.content
+        except EntryContent.DoesNotExist:
+            # Not imported yet.
+            sources = read_sources(obj.slug)
+            if sources['entry.md'] is None:
+                raise Http404()
+            content = render_content(obj.entry_type, sources)
 
         # Set context state variables.
-        char_data = ''
-        strip_entry = True
-        publish_notes = False
         publish_vocabulary = False
         context['is_plain'] = True
+        context['entry'] = content.plain_html
         if obj.entry_type != 'study':
-            strip_entry = False
             publish_vocabulary = True
             context['is_plain'] = False
         if self.request.resolver_match.url_name == 'entry-study':
             if obj.entry_type != 'study':
                 raise Http404()
-            strip_entry = False
-            publish_notes = True
             publish_vocabulary = True
             context['is_plain'] = False
             context['is_study'] = True
             context['page_title'] += ' 文'
+            context['entry'] = content.study_html
+            context['notes'] = content.notes_html
 
-        # Read notes.
-        if publish_notes:
-            notes_file = os.path.join(entry_dir, 'notes.md')
-            if os.path.isfile(notes_file):
-                with open(notes_file, encoding='utf8') as notes_fd:
-                    notes = notes_fd.read()
-                    if publish_vocabulary:
-                        char_data += notes
-                    context['notes'] = markdown.markdown(notes)
-
-        # Read entry.
-        entry_file = os.path.join(entry_dir, 'entry.md')
-        lines = []
-        with open(entry_file, encoding='utf8') as entry_fd:
-            for line in entry_fd.readlines():
-                if strip_entry and is_unihan(line[0]):
-                    continue
-                lines.append(line)
-        entry = ''.join(lines[2:])  # Remove title lines.
-        context['entry'] = markdown.markdown(entry)
-        if publish_vocabulary and not strip_entry:
-            char_data = entry + char_data
-
-        # Process the character map.
+        # Link the vocabulary shards for popup.js, or map the vocabulary
+        # characters into the page if there are no shards.
         context['unihan_map'] = None
+        context['ctext_target'] = 'dictionary'
+        if publish_vocabulary and self.request.user.is_authenticated:
+            context['ctext_target'] = 'search'
+        shard_urls = None
         if publish_vocabulary:
-            if self.request.user.is_authenticated:
-                context['unihan_map'] = unihan_map(char_data, False, 'search')
-            else:
-                context['unihan_map'] = unihan_map(char_data, False)
-
-        # Refs file to list of links, one per line.
-        context['ref_links'] = []
-        refs_file = os.path.join(entry_dir, 'refs.html')
-        if os.path.isfile(refs_file):
-            with open(refs_file, encoding='utf8') as refs_fd:
-                for ref in refs_fd.readlines():
-                    context['ref_links'].append(ref.strip())
+            shard_urls = get_shard_urls(content.vocabulary)
+        if shard_urls is not None:
+            context['unihan_dict'] = shard_urls and {
+                'bits': SHARD_BITS,
+                'ctext': context['ctext_target'],
+                'shards': shard_urls,
+            }
+            context['popup'] = bool(shard_urls)
+        elif publish_vocabulary:
+            context['vocabulary_codepoints'] = content.vocabulary
+            context['popup'] = bool(content.vocabulary)
+            if not self.is_streaming():
+                self.map_vocabulary(context)
+        context['ref_links'] = content.ref_links
 
         # Static image links.
-        context['header_img'] = f'{obj.slug}.jpg'
-        context['card_img'] = f'{obj.slug}-120.jpg'
+        context['header_img'] = get_image(obj.slug)
+        context['card_img'] = get_image(obj.slug, 120)
         return context
+
+    @staticmethod
+    def map_vocabulary(context):
+        """ Add the vocabulary characters and cards to the context. """
+        codepoints = context.pop('vocabulary_codepoints', None)
+        if codepoints:
+            found = get_characters(codepoints)
+            context['unihan_map'] = {
+                chr(cp): found[cp] for cp in codepoints if cp in found
+            }
+            context['vocabulary'] = get_cards(
+                context['unihan_map'], context['ctext_target']
+            )
+
+    def is_streaming(self):
+        """ Return True if the page should be streamed, which needs an
+        ASGI server to send an async generator. """
+        return settings.ENTRY_STREAMING and isinstance(
+            self.request, ASGIRequest
+        )
+
+    def render_to_response(self, context, **response_kwargs):
+        """ Return a streaming response under ASGI if ENTRY_STREAMING is
+        set. The page up to the article body is rendered now, and the
+        notes and vocabulary are rendered as the response is sent. """
+        if not self.is_streaming():
+            return super().render_to_response(context, **response_kwargs)
+        context['stream_slot'] = STREAM_SLOT
+        head, tail = render_to_string(
+            self.get_template_names(), context, self.request
+        ).split(STREAM_SLOT)
+        del context['stream_slot']
+        return StreamingHttpResponse(
+            self.stream(head, tail, context),
+            content_type='text/html; charset=utf-8',
+        )
+
+    def render_section(self, template_name, context):
+        """ Return a rendered section of the page. """
+        if template_name == 'entry/entry-vocabulary.html':
+            self.map_vocabulary(context)
+        return render_to_string(template_name, context, self.request)
+
+    async def stream(self, head, tail, context):
+        """ Yield the page head, its lazily rendered sections, which may
+        query the db, and its tail. """
+        yield head
+        for template_name in STREAM_SECTIONS:
+            yield await sync_to_async(self.render_section)(
+                template_name, context
+            )
+        yield tail
@@ -45,6 +45,20 @@ DEBUG = False
 
 EMAIL_SUBJECT_PREFIX = '[daoistic] '
 
+# Stream entry pages to ASGI servers.
+ENTRY_STREAMING = True
+
+# Source file hashes of the last importentries run.
+ENTRY_MANIFEST = BASE_DIR / 'var' / 'entries.manifest.json'
+
+# Written by importentries, collected with the other static files.
+ENTRY_IMG_DIR = BASE_DIR / 'entry' / 'static' / 'entry' / 'img'
+
+UNIHAN_SNAPSHOT = BASE_DIR / 'var' / 'unihan.snapshot'
+
+# Written by importunihan, collected with the other static files.
+UNIHAN_DICT_DIR = BASE_DIR / 'unihan' / 'static' / 'unihan' / 'dict'
+
 # https://docs.djangoproject.com/en/4.0/topics/security/#ssl-https
 CSRF_COOKIE_SECURE = True
 SESSION_COOKIE_SECURE = True
@@ -14,6 +14,6 @@ handler404 = custom404
 urlpatterns = [
     path('', include('entry.urls')),
     path('', include('common.urls')),
-    path('unihan', include('unihan.urls')),
+    path('', include('unihan.urls')),
     path('admin/', admin.site.urls),
 ]
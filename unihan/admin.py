@@ -1,6 +1,9 @@
 """ Unihan app admin module. """
 from django.contrib import admin
-from unihan.models import UnihanCharacter, UnihanRadical
+from django.db.models.expressions import RawSQL
+from unihan.blocks import UNIHAN_RE
+from unihan.models import UnihanCharacter, UnihanDataset, UnihanRadical
+from unihan.search import MATCH_SQL, match_query
 
 
 @admin.register(UnihanCharacter)
@@ -41,6 +44,16 @@ class CharacterAdmin(admin.ModelAdmin):
         """ Disable delete. """
         return False
 
+    def get_search_results(self, request, queryset, search_term):
+        """ Search definitions and pinyin with the full-text index, and
+        characters and variants with the default search. """
+        match = match_query(search_term)
+        if not match or UNIHAN_RE.search(search_term):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=RawSQL(MATCH_SQL, [match])), False
+
 
 @admin.register(UnihanRadical)
 class RadicalAdmin(admin.ModelAdmin):
@@ -72,3 +85,26 @@ class RadicalAdmin(admin.ModelAdmin):
     def pinyin(self, obj):
         """ For list display. """
         return obj.character.pinyin
+
+
+@admin.register(UnihanDataset)
+class DatasetAdmin(admin.ModelAdmin):
+    """ UnihanDataset admin tweaks. """
+
+    ordering = ('-imported',)
+    list_display = (
+        'unicode_version',
+        'imported',
+        'characters',
+        'inserted',
+        'updated',
+        'deleted',
+    )
+
+    def has_add_permission(self, request):
+        """ Disable add. """
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """ Disable change. """
+        return False
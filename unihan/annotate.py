@@ -0,0 +1,83 @@
+""" Unihan annotation module. Wraps unihan characters in popup links,
+as a Markdown extension or directly on escaped text. """
+import re
+from markdown.extensions import Extension
+from markdown.postprocessors import Postprocessor
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import ETX, STX
+from unihan.blocks import UNIHAN_RUN_RE
+
+
+LINK = '<a class="unihan %s" href="#%s" title="%s - %s">%s</a>'
+MARK = STX + r'unihan:\g<0>' + ETX
+MARKED_RUN_RE = re.compile(STX + 'unihan:([^' + ETX + ']*)' + ETX)
+
+
+def get_anchors(unihan_map):
+    """ Return a dict mapping each mapped character to its link. """
+    return {
+        char: LINK % (obj.utf8, obj.utf8, obj.pinyin, obj.definition, obj.utf8)
+        for char, obj in unihan_map.items()
+    }
+
+
+def annotate(text, anchors):
+    """ Return text with each run of unihan characters replaced by
+    their links. """
+    if not anchors:
+        return text
+    return UNIHAN_RUN_RE.sub(
+        lambda match: ''.join(
+            [anchors.get(char, char) for char in match.group()]
+        ),
+        text,
+    )
+
+
+class UnihanTreeprocessor(Treeprocessor):
+    """ Mark runs of unihan characters in text nodes. """
+
+    def run(self, root):
+        """ Wrap runs in element text and tails in markers. """
+        for element in root.iter():
+            if element.text:
+                element.text = UNIHAN_RUN_RE.sub(MARK, element.text)
+            if element.tail:
+                element.tail = UNIHAN_RUN_RE.sub(MARK, element.tail)
+
+
+class UnihanPostprocessor(Postprocessor):
+    """ Replace marked runs with links, with one regex substitution
+    over the document. """
+
+    def __init__(self, md, anchors):
+        super().__init__(md)
+        self.anchors = anchors
+
+    def run(self, text):
+        """ Replace marked runs. """
+        return MARKED_RUN_RE.sub(
+            lambda match: annotate(match.group(1), self.anchors), text
+        )
+
+
+class UnihanExtension(Extension):
+    """ Link unihan characters found in a unihan map. """
+
+    def __init__(self, **kwargs):
+        self.config = {
+            'unihan_map': [{}, 'Map of unihan characters to objects'],
+        }
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        """ Mark runs after inline processing and link them before raw
+        HTML is restored. """
+        unihan_map = self.getConfig('unihan_map')
+        if unihan_map:
+            md.treeprocessors.register(UnihanTreeprocessor(md), 'unihan', 15)
+            md.postprocessors.register(
+                UnihanPostprocessor(md, get_anchors(unihan_map)),
+                'unihan',
+                35,
+            )
@@ -0,0 +1,68 @@
+""" Unihan block classification module. """
+import bisect
+import re
+
+
+# https://www.unicode.org/reports/tr38/#BlockListing
+# https://www.unicode.org/reports/tr38/#SortingAlgorithm
+# First and last codepoints of the ideographs in each block, in
+# codepoint order, and the block's tr38 sort key block number.
+BLOCKS = (
+    # CJK Unified Ideographs Extension A
+    (0x3400, 0x4DBF, 1),
+    # CJK Unified Ideographs
+    (0x4E00, 0x9FFF, 0),
+    # CJK Compatibility Ideographs
+    (0xF900, 0xFAD9, 254),
+    # CJK Unified Ideographs Extension B
+    (0x20000, 0x2A6DF, 2),
+    # CJK Unified Ideographs Extension C
+    (0x2A700, 0x2B739, 3),
+    # CJK Unified Ideographs Extension D
+    (0x2B740, 0x2B81D, 4),
+    # CJK Unified Ideographs Extension E
+    (0x2B820, 0x2CEA1, 5),
+    # CJK Unified Ideographs Extension F
+    (0x2CEB0, 0x2EBE0, 6),
+    # CJK Unified Ideographs Extension I
+    (0x2EBF0, 0x2EE5D, 9),
+    # CJK Compatibility Supplement
+    (0x2F800, 0x2FA1D, 255),
+    # CJK Unified Ideographs Extension G
+    (0x30000, 0x3134A, 7),
+    # CJK Unified Ideographs Extension H
+    (0x31350, 0x323AF, 8),
+)
+_STARTS = [start for start, _, _ in BLOCKS]
+_CLASS = '[%s]' % ''.join(
+    f'{chr(start)}-{chr(end)}' for start, end, _ in BLOCKS
+)
+UNIHAN_RE = re.compile(_CLASS)
+UNIHAN_RUN_RE = re.compile(_CLASS + '+')
+
+
+def get_block(char):
+    """ Return the character's tr38 block number or -1. """
+    try:
+        codepoint = ord(char)
+    except TypeError:
+        return -1
+    index = bisect.bisect_right(_STARTS, codepoint) - 1
+    if index >= 0:
+        _, end, block = BLOCKS[index]
+        if codepoint <= end:
+            return block
+    return -1
+
+
+def is_unihan(char):
+    """ Return True if the character's codepoint is in a Unihan block. """
+    return get_block(char) >= 0
+
+
+def find_unihan(text):
+    """ Return a list of (position, character) tuples for each unihan
+    character in the text. """
+    return [(match.start(), match.group()) for match in UNIHAN_RE.finditer(
+        text
+    )]
@@ -0,0 +1,122 @@
+""" Unihan character record cache module. Records are cached in a
+bounded per-process LRU in front of the default cache, under keys that
+include the dataset version importunihan bumps. The default cache holds
+a dict of records per dictionary shard rather than a key per record, so
+that the records of a large page don't crowd out the pages and versions
+stored beside them. Processes read the version at most once per
+VERSION_TTL seconds, so LRU hits cost no cache round trip. """
+from collections import OrderedDict
+import threading
+import time
+from django.core.cache import cache
+from common.versions import bump_versions, get_versions
+from unihan.shards import shard_name
+
+
+LRU_SIZE = 8192
+MISSING = 0  # Cached negative lookup, records are always truthy.
+VERSION_NAME = 'unihan'
+VERSION_TTL = 1.0
+
+_LRU = OrderedDict()
+_LOCK = threading.Lock()
+_STATS = {'lru_hits': 0, 'cache_hits': 0, 'misses': 0}
+_VERSION = [None, 0.0]  # The version and when to read it again.
+
+
+def get_version():
+    """ Return the dataset version, a timestamp, read from the versions
+    cache if the process's copy is older than VERSION_TTL. """
+    now = time.monotonic()
+    with _LOCK:
+        if now < _VERSION[1]:
+            return _VERSION[0]
+    version = get_versions([VERSION_NAME])[0]
+    with _LOCK:
+        _VERSION[:] = [version, now + VERSION_TTL]
+    return version
+
+
+def bump_version():
+    """ Set a new dataset version, invalidating all cached records. """
+    version = bump_versions([VERSION_NAME])[VERSION_NAME]
+    with _LOCK:
+        _VERSION[:] = [version, time.monotonic() + VERSION_TTL]
+    return version
+
+
+def clear_lru():
+    """ Empty the process's LRU and reset its counters and version. """
+    with _LOCK:
+        _LRU.clear()
+        _VERSION[:] = [None, 0.0]
+        for key in _STATS:
+            _STATS[key] = 0
+
+
+def cache_stats():
+    """ Return a dict of hit and miss counters and the hit ratio. """
+    with _LOCK:
+        stats = dict(_STATS)
+    lookups = sum(stats.values())
+    stats['hit_ratio'] = (
+        (stats['lru_hits'] + stats['cache_hits']) / lookups
+        if lookups else 0.0
+    )
+    return stats
+
+
+def get_records(codepoints, loader, prefix='unihan'):
+    """ Return a dict mapping codepoints to records, calling loader
+    with a list of codepoints for records in neither cache tier. The
+    loader returns a dict of the records it found. """
+    version = get_version()
+    found = {}
+    keys = {}
+    with _LOCK:
+        for codepoint in codepoints:
+            key = f'{prefix}:{version}:{codepoint}'
+            record = _LRU.get(key)
+            if record is None:
+                keys[key] = codepoint
+                continue
+            _LRU.move_to_end(key)
+            _STATS['lru_hits'] += 1
+            if record:
+                found[codepoint] = record
+    if not keys:
+        return found
+
+    shard_keys = {
+        cp: f'{prefix}:{version}:{shard_name(cp)}' for cp in keys.values()
+    }
+    shards = cache.get_many(set(shard_keys.values()))
+    cached = {
+        cp: shards[key][cp] for cp, key in shard_keys.items()
+        if cp in shards.get(key, ())
+    }
+    loaded = {}
+    missing = [cp for cp in keys.values() if cp not in cached]
+    if missing:
+        # Concurrent updates of a shard may drop each other's records,
+        # which are then loaded again.
+        loaded = loader(missing)
+        updates = {}
+        for codepoint in missing:
+            key = shard_keys[codepoint]
+            if key not in updates:
+                updates[key] = dict(shards.get(key, {}))
+            updates[key][codepoint] = loaded.get(codepoint, MISSING)
+        cache.set_many(updates, None)
+
+    with _LOCK:
+        _STATS['cache_hits'] += len(cached)
+        _STATS['misses'] += len(missing)
+        for key, codepoint in keys.items():
+            record = cached.get(codepoint, loaded.get(codepoint, MISSING))
+            _LRU[key] = record
+            if record:
+                found[codepoint] = record
+        while len(_LRU) > LRU_SIZE:
+            _LRU.popitem(last=False)
+    return found
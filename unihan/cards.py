@@ -0,0 +1,79 @@
+""" Unihan vocabulary card module. Cards are rendered from a format
+string compiled from the character template, and stored in the record
+cache per ctext target and format. """
+from functools import lru_cache
+import hashlib
+from html import escape
+from types import SimpleNamespace
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from unihan.cache import get_records
+
+
+FIELDS = (
+    'utf8',
+    'pinyin',
+    'radical_utf8',
+    'radical_number',
+    'residual_strokes',
+    'definition',
+)
+
+
+@lru_cache
+def card_format(ctext_target):
+    """ Return a format string for the target's character cards. """
+    markers = {field: f'\0{field}\0' for field in FIELDS}
+    marker = SimpleNamespace(
+        radical=SimpleNamespace(
+            utf8=markers.pop('radical_utf8'),
+            radical_number=markers.pop('radical_number'),
+        ),
+        **markers,
+    )
+    html = render_to_string('unihan/character.html', {
+        'object': marker,
+        'ctext_target': ctext_target,
+    })
+    html = html.replace('{', '{{').replace('}', '}}')
+    for field in FIELDS:
+        html = html.replace(f'\0{field}\0', '{%s}' % field)
+    return html
+
+
+@lru_cache
+def card_prefix(ctext_target):
+    """ Return the record cache prefix of the target's cards, with a hash
+    of their format so that template edits don't serve cached cards. """
+    digest = hashlib.sha256(card_format(ctext_target).encode()).hexdigest()
+    return f'unihan-card-{ctext_target}-{digest[:12]}'
+
+
+def render_card(obj, ctext_target):
+    """ Return a character's card HTML, the same as the template's. """
+    radical_utf8 = radical_number = ''
+    if obj.radical:
+        radical_utf8 = escape(obj.radical.utf8)
+        radical_number = obj.radical.radical_number
+    return card_format(ctext_target).format(
+        utf8=escape(obj.utf8),
+        pinyin=escape(obj.pinyin),
+        radical_utf8=radical_utf8,
+        radical_number=radical_number,
+        residual_strokes=obj.residual_strokes,
+        definition=escape(obj.definition),
+    )
+
+
+def get_cards(unihan_map, ctext_target):
+    """ Return a list of safe card HTML strings for the map's
+    characters, in map order. """
+    objects = {obj.codepoint: obj for obj in unihan_map.values()}
+    cards = get_records(
+        objects,
+        lambda codepoints: {
+            cp: render_card(objects[cp], ctext_target) for cp in codepoints
+        },
+        card_prefix(ctext_target),
+    )
+    return [mark_safe(cards[cp]) for cp in objects]
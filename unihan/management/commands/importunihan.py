@@ -1,12 +1,38 @@
 """ Management utility to create unihan radical and character tables. """
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import csv
-import glob
-from itertools import islice
+import hashlib
+import heapq
+from itertools import chain, groupby, islice, repeat
+from operator import itemgetter
 import os
-from django.core.management.base import BaseCommand
+import re
+import resource
+import sqlite3
+import tempfile
+import time
+import zipfile
+import django
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from unihan.models import UnihanCharacter, UnihanRadical
-from unihan.views import get_block
+from django.db import connection, transaction
+from common.versions import SITE, bump_versions
+from unihan.blocks import get_block
+from unihan.cache import bump_version
+from unihan.models import (
+    UnihanCharacter,
+    UnihanDataset,
+    UnihanRadical,
+    UnihanReading,
+)
+from unihan.pinyin import readings
+from unihan.search import index, rebuild_index, unindex
+from unihan.shards import write_shards
+from unihan.signals import characters_changed
+from unihan.sources import get_data_files
+from unihan.snapshot import write_snapshot
 
 
 K_FIELDS = {
@@ -19,6 +45,32 @@ K_FIELDS = {
     'kMandarin',
     'kHanyuPinyin'
 }
+LOAD_BATCH_SIZE = 2000
+LOAD_PRAGMAS = ['PRAGMA cache_size = -65536', 'PRAGMA temp_store = MEMORY']
+BUILD_PRAGMAS = ['PRAGMA journal_mode = OFF', 'PRAGMA synchronous = OFF']
+MAX_INSERT_ROWS = 500  # Longer inserts are no faster.
+RANGES_PER_JOB = 4  # Smaller ranges even out the workers' loads.
+REPORT_LIMIT = 200  # Changed characters listed per category.
+STREAM_FIELDS = tuple(sorted(K_FIELDS))
+STREAM_SLOTS = {  # Keyed by the field names as read, in bytes.
+    field.encode(): slot for slot, field in enumerate(STREAM_FIELDS)
+}
+
+# A finished character row, as streamed into the loader.
+Record = namedtuple('Record', [
+    'codepoint',
+    'definition',
+    'pinyin',
+    'radical_id',
+    'residual_strokes',
+    'simplified_variants',
+    'traditional_variants',
+    'semantic_variants',
+    'sort_order',
+    'utf8',
+])
+RADICAL_FIELDS = ('character_id', 'radical_number', 'simplified', 'utf8')
+VERSION_RE = re.compile(r'^# Unicode version: (\S+)')
 
 
 def _add_calculated_fields(codepoint, fields, radical_data):
@@ -69,7 +121,7 @@ def _add_calculated_fields(codepoint, fields, radical_data):
         if cp_int in variants:
             variants.remove(cp_int)
         if variants:
-            fields['pTraditionalVariants'] = ''.join(variants)
+            fields['pTraditionalVariants'] = ''.join(sorted(variants))
 
     # Add simplified variants field.
     if 'kSimplifiedVariant' in fields:
@@ -77,7 +129,7 @@ def _add_calculated_fields(codepoint, fields, radical_data):
         if cp_int in variants:
             variants.remove(cp_int)
         if variants:
-            fields['pSimplifiedVariants'] = ''.join(variants)
+            fields['pSimplifiedVariants'] = ''.join(sorted(variants))
 
     # Add semantic variants field.
     variants = set()
@@ -91,143 +143,546 @@ def _add_calculated_fields(codepoint, fields, radical_data):
     if cp_int in variants:
         variants.remove(cp_int)
     if variants:
-        fields['pSemanticVariants'] = ''.join(variants)
+        fields['pSemanticVariants'] = ''.join(sorted(variants))
 
 
-def _create_chars(char_data, radical_objs):
-    """ Bulk create character objects from raw character data for
-    non-radical characters. """
-    count = 0
-    batch_size = 50  # SQLite 999 variable limit.
-    values = iter(char_data.values())
-    while True:
-        batch = list(islice(values, batch_size))
-        if not batch:
-            break
-        objs = []
-        for char in batch:
-            objs.append(UnihanCharacter(
-                codepoint=char['pCodepointInt'],
-                definition=char.get('kDefinition') or '',
-                pinyin=char.get('pPinyin') or '',
-                radical=radical_objs[char['pRadicalCodepoint']],
-                residual_strokes=char['pAdditionalStrokesInt'],
-                simplified_variants=char.get('pSimplifiedVariants') or '',
-                traditional_variants=char.get('pTraditionalVariants') or '',
-                semantic_variants=char.get('pSemanticVariants') or '',
-                sort_order=char['kDefaultSortKey'],
-                utf8=char['pCodepointChr'],
-            ))
-        count += len(batch)
-        if count % 10000 == 0:
-            print('Created %d character records' % count)
-        UnihanCharacter.objects.bulk_create(objs, batch_size)
-    print('Created %d character records' % count)
+def _write_snapshot():
+    """ Write the dictionary snapshot from the character table. """
+    write_snapshot(
+        settings.UNIHAN_SNAPSHOT,
+        UnihanCharacter.objects.select_related('radical').order_by(
+            'codepoint'
+        ).iterator(chunk_size=2000)
+    )
+    print('Wrote', settings.UNIHAN_SNAPSHOT)
 
 
-def _create_radicals(radical_char_data, radical_data):
-    """ Bulk create character and radical objects only for radicals
-    and return a dict mapping codepoint string (U+XXXX) to UnihanRadical
-    objects. """
+def _write_shards():
+    """ Write the static dictionary shards from the character table. """
+    manifest = write_shards(
+        settings.UNIHAN_DICT_DIR,
+        UnihanCharacter.objects.select_related('radical').order_by(
+            'codepoint'
+        ).iterator(chunk_size=2000)
+    )
+    print('Wrote %d shards to' % len(manifest), settings.UNIHAN_DICT_DIR)
 
-    # Create UnihanCharacter objects for each radical.
-    batch_size = 50  # SQLite 999 variable limit.
-    values = iter(radical_char_data)
-    char_objs = {}  # Indexed by codepoint string.
-    while True:
-        batch = list(islice(values, batch_size))
-        if not batch:
-            break
-        objs = []
-        for char in batch:
-            obj = UnihanCharacter(
-                codepoint=char['pCodepointInt'],
-                definition=char.get('kDefinition') or '',
-                pinyin=char.get('pPinyin') or '',
-                residual_strokes=char['pAdditionalStrokesInt'],
-                simplified_variants=char.get('pSimplifiedVariants') or '',
-                traditional_variants=char.get('pTraditionalVariants') or '',
-                semantic_variants=char.get('pSemanticVariants') or '',
-                sort_order=char['kDefaultSortKey'],
-                utf8=char['pCodepointChr'],
+
+def _get_char_data(data_file):
+    """ Return a dict mapping codepoint strings to a dict of fields
+    and their values. """
+    data = {}
+    summary = {}
+    with data_file.lines() as lines:
+        for line in lines:
+            if not line.startswith(b'U+'):
+                continue
+            codepoint, field, value = line.rstrip(b'\r\n').split(b'\t', 2)
+            slot = STREAM_SLOTS.get(field)
+            if slot is not None:
+                field = STREAM_FIELDS[slot]
+                if summary.get(field):
+                    summary[field] += 1
+                else:
+                    summary[field] = 1
+                codepoint = codepoint.decode()
+                if not data.get(codepoint):
+                    data[codepoint] = {}
+                data[codepoint].update({field: value.decode('utf-8')})
+    print(f'{data_file.name} {summary}')
+    return data
+
+
+def _iter_fields(data_file, start=0, end=None):
+    """ Yield (codepoint int, field slot, value) tuples for the K_FIELDS
+    lines of a Unihan file, which lists codepoints in order, or of the
+    lines in a byte range of it. Only kept values are decoded. """
+    with data_file.lines(start, end) as lines:
+        for line in lines:
+            if not line.startswith(b'U+'):
+                continue
+            codepoint, field, value = line.rstrip(b'\r\n').split(b'\t', 2)
+            slot = STREAM_SLOTS.get(field)
+            if slot is not None:
+                yield int(codepoint[2:], 16), slot, value.decode('utf-8')
+
+
+def _stream_char_data(data_files, ranges=None):
+    """ Yield (codepoint int, values) tuples in codepoint order, merged
+    from the Unihan files, or from a (start, end) byte range of each,
+    with a list of STREAM_FIELDS values or None for each codepoint. Only
+    one codepoint's values are held at a time. """
+    merged = heapq.merge(
+        *(
+            _iter_fields(data_file, *byte_range)
+            for data_file, byte_range in zip(
+                data_files, ranges or repeat(())
             )
-            char_objs[char['pCodepoint']] = obj
-            objs.append(obj)
-        UnihanCharacter.objects.bulk_create(objs, batch_size)
+        ),
+        key=itemgetter(0),
+    )
+    for codepoint, lines in groupby(merged, key=itemgetter(0)):
+        values = [None] * len(STREAM_FIELDS)
+        for _, slot, value in lines:
+            values[slot] = value
+        yield codepoint, values
+
+
+def _record(fields, radical_codepoints):
+    """ Return a Record for a character's fields, with calculated
+    fields. Radicals are their own radical. """
+    codepoint = fields['pCodepointInt']
+    radical_id = codepoint
+    if codepoint not in radical_codepoints:
+        radical_id = int(fields['pRadicalCodepoint'][2:], 16)
+    return Record(
+        codepoint=codepoint,
+        definition=fields.get('kDefinition') or '',
+        pinyin=fields.get('pPinyin') or '',
+        radical_id=radical_id,
+        residual_strokes=fields['pAdditionalStrokesInt'],
+        simplified_variants=fields.get('pSimplifiedVariants') or '',
+        traditional_variants=fields.get('pTraditionalVariants') or '',
+        semantic_variants=fields.get('pSemanticVariants') or '',
+        sort_order=fields['kDefaultSortKey'],
+        utf8=fields['pCodepointChr'],
+    )
+
 
-    # Create UnihanRadical objects for each radical.
-    values = iter(radical_data.values())
-    radical_objs = {}  # Indexed by codepoint string.
+def _radical_codepoints(radical_data):
+    """ Return the set of radical codepoint ints. """
+    return {rad['pCodepointInt'] for rad in radical_data.values()}
+
+
+def _dict_records(data_files, radical_data):
+    """ Yield a Record for each character in codepoint order, from data
+    files read into dicts. """
+
+    # Get character data, a dict indexed by codepoint (U+XXXX).
+    char_data = {}
+    for data_file in data_files:
+        data = _get_char_data(data_file)
+        for codepoint, values in data.items():
+            if char_data.get(codepoint):
+                char_data[codepoint].update(values)
+            else:
+                char_data[codepoint] = values
+
+    # Add calculated fields to character data.
+    for codepoint, values in char_data.items():
+        _add_calculated_fields(codepoint, values, radical_data)
+
+    radical_codepoints = _radical_codepoints(radical_data)
+    for fields in sorted(
+            char_data.values(), key=itemgetter('pCodepointInt')):
+        yield _record(fields, radical_codepoints)
+
+
+def _stream_records(data_files, radical_data, ranges=None):
+    """ Yield a Record for each character in codepoint order, with the
+    same calculated fields as the dict import. """
+    radical_codepoints = _radical_codepoints(radical_data)
+    for codepoint, values in _stream_char_data(data_files, ranges):
+        fields = {
+            field: value for field, value in zip(STREAM_FIELDS, values)
+            if value is not None
+        }
+        _add_calculated_fields(f'U+{codepoint:04X}', fields, radical_data)
+        yield _record(fields, radical_codepoints)
+
+
+def _first_line(data_fd, offset):
+    """ Return the (offset, codepoint int) of the first data line of a
+    binary file starting at or after an offset, or (None, None). """
+    data_fd.seek(max(offset - 1, 0))
+    if offset:
+        data_fd.readline()  # Skip to the next line start.
     while True:
-        batch = list(islice(values, batch_size))
-        if not batch:
-            break
-        objs = []
-        for rad in batch:
-            obj = UnihanRadical(
-                character=char_objs[rad['pCodepoint']],
-                radical_number=rad['pRadicalNumberInt'],
-                simplified=rad['pIsSimplified'],
-                utf8=rad['pCodepointChr'],
+        start = data_fd.tell()
+        line = data_fd.readline()
+        if not line:
+            return None, None
+        if line.startswith(b'U+'):
+            return start, int(line[2:line.index(b'\t')], 16)
+
+
+def _line_offset(data_fd, size, codepoint):
+    """ Return the offset of the first line of a binary file for a
+    codepoint at or after a codepoint, or its size, by bisection. """
+    low, high = 0, size
+    while low < high:
+        middle = (low + high) // 2
+        line_codepoint = _first_line(data_fd, middle)[1]
+        if line_codepoint is None or line_codepoint >= codepoint:
+            high = middle
+        else:
+            low = middle + 1
+    offset = _first_line(data_fd, low)[0]
+    return size if offset is None else offset
+
+
+def _split_ranges(data_files, parts):
+    """ Return a list of ranges, each a list of (start, end) byte ranges
+    of the data files, splitting the files at the same codepoints into
+    about parts ranges of the largest file. """
+    sizes = [data_file.size for data_file in data_files]
+    largest = sizes.index(max(sizes))
+    boundaries = set()
+    with data_files[largest].open() as data_fd:
+        for part in range(1, parts):
+            codepoint = _first_line(data_fd, sizes[largest] * part // parts)[1]
+            if codepoint is not None:
+                boundaries.add(codepoint)
+    file_offsets = []
+    for data_file, size in zip(data_files, sizes):
+        with data_file.open() as data_fd:
+            file_offsets.append(
+                [0]
+                + [
+                    _line_offset(data_fd, size, codepoint)
+                    for codepoint in sorted(boundaries)
+                ]
+                + [size]
             )
-            radical_objs[rad['pCodepoint']] = obj
-            objs.append(obj)
-        UnihanRadical.objects.bulk_create(objs, batch_size)
-
-    # Update radical field in char objects.
-    for key, value in char_objs.items():
-        UnihanCharacter.objects.filter(pk=value.codepoint).update(
-            radical=radical_objs[key],
+    return [
+        [(offsets[index], offsets[index + 1]) for offsets in file_offsets]
+        for index in range(len(boundaries) + 1)
+    ]
+
+
+def _parse_range(data_files, ranges, radical_data):
+    """ Return a list of Records for a range of the data files, in a
+    worker process. """
+    return list(_stream_records(data_files, radical_data, ranges))
+
+
+def _parallel_records(data_files, radical_data, jobs):
+    """ Return a list of Records in codepoint order, parsed over
+    codepoint ranges in a pool of worker processes. The ranges are
+    split on codepoint boundaries and merged in order, so the records
+    match a serial parse. """
+    ranges = _split_ranges(data_files, jobs * RANGES_PER_JOB)
+    # Spawned workers set up Django to import this module.
+    with ProcessPoolExecutor(jobs, initializer=django.setup) as executor:
+        return list(chain.from_iterable(executor.map(
+            _parse_range,
+            repeat(data_files),
+            ranges,
+            repeat(radical_data),
+        )))
+
+
+@contextmanager
+def _timed(stage):
+    """ Print the wall-clock time of a stage. """
+    start = time.perf_counter()
+    yield
+    print('%s took %.2fs' % (stage, time.perf_counter() - start))
+
+
+def _radical_rows(radical_data):
+    """ Return radical row tuples of RADICAL_FIELDS. """
+    return [
+        (
+            rad['pCodepointInt'],
+            rad['pRadicalNumberInt'],
+            rad['pIsSimplified'],
+            rad['pCodepointChr'],
         )
+        for rad in radical_data.values()
+    ]
 
-    # Return dict of UnihanRadical objects.
-    print('Created %d character and radical records.' % len(radical_objs))
-    return radical_objs
 
+def _reading_rows(records):
+    """ Return reading row tuples for records. """
+    return [
+        (record.codepoint, reading, record.sort_order)
+        for record in records
+        for reading in readings(record.pinyin)
+    ]
 
-def _get_char_data(data_file):
-    """ Return a dict mapping codepoint strings to a dict of fields
-    and their values. """
-    data = {}
-    summary = {}
-    basename = os.path.basename(data_file)
-    with open(data_file) as csvfile:
-        rdr = csv.reader(csvfile, delimiter='\t')
-        for line in rdr:
-            if line and not line[0].startswith('#'):
-                if line[1] in K_FIELDS:
-                    if summary.get(line[1]):
-                        summary[line[1]] += 1
-                    else:
-                        summary[line[1]] = 1
-                    if not data.get(line[0]):
-                        data[line[0]] = {}
-                    data[line[0]].update({line[1]: line[2]})
-    print(f'{basename} {summary}')
-    return data
+
+def _insert_many(db, table, columns, rows):
+    """ Insert row tuples into a table with executemany, through a
+    prepared multi-row insert sized to the SQLite variable limit, and a
+    single-row insert for the remainder. """
+    row_sql = '(%s)' % ', '.join('?' * len(columns))
+    per_insert = max(1, min(
+        MAX_INSERT_ROWS,
+        db.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER) // len(columns),
+    ))
+    sql = 'INSERT INTO %s (%s) VALUES ' % (table, ', '.join(columns))
+    rows = iter(rows)
+    remainder = []
+
+    def params():
+        """ Yield flat parameters for each full insert. """
+        while True:
+            batch = list(islice(rows, per_insert))
+            if len(batch) < per_insert:
+                remainder.extend(batch)
+                return
+            yield list(chain.from_iterable(batch))
+
+    db.executemany(sql + ', '.join([row_sql] * per_insert), params())
+    db.executemany(sql + row_sql, remainder)
+
+
+def _load_records(db, records, radical_data):
+    """ Replace the character, radical and reading rows with records,
+    using a DB-API sqlite3 connection in a transaction. Characters hold
+    their radical's codepoint and radicals are inserted after them,
+    with no backfill, since foreign keys are checked at commit. """
+    db.execute(f'DELETE FROM {UnihanReading._meta.db_table}')
+    db.execute(f'DELETE FROM {UnihanRadical._meta.db_table}')
+    db.execute(f'DELETE FROM {UnihanCharacter._meta.db_table}')
+    count = 0
+    reading_count = 0
+    while True:
+        batch = list(islice(records, LOAD_BATCH_SIZE))
+        if not batch:
+            break
+        _insert_many(
+            db, UnihanCharacter._meta.db_table, Record._fields, batch
+        )
+        reading_rows = _reading_rows(batch)
+        _insert_many(
+            db,
+            UnihanReading._meta.db_table,
+            ('character_id', 'numbered', 'sort_order'),
+            reading_rows,
+        )
+        count += len(batch)
+        reading_count += len(reading_rows)
+        if count % 10000 < LOAD_BATCH_SIZE:
+            print('Created %d character records' % count)
+    _insert_many(
+        db,
+        UnihanRadical._meta.db_table,
+        RADICAL_FIELDS,
+        _radical_rows(radical_data),
+    )
+    print('Created %d character, %d radical and %d reading records' % (
+        count, len(radical_data), reading_count
+    ))
+    return count
+
+
+def _load(records, radical_data):
+    """ Load records into the live database in one transaction, with
+    a large page cache so that readers aren't locked out by a spill
+    before the commit. """
+    if not connection.in_atomic_block:  # Pragmas can't change in one.
+        with connection.cursor() as cursor:
+            for pragma in LOAD_PRAGMAS:
+                cursor.execute(pragma)
+    with transaction.atomic():
+        count = _load_records(connection.connection, records, radical_data)
+        rebuild_index()
+    return count
+
+
+def _build_and_swap(records, radical_data):
+    """ Load records into a fresh database file, with journaling and
+    syncing off since the file is discarded on failure, then copy its
+    rows into the live tables with INSERT ... SELECT in one transaction.
+    The live tables are refilled in place, not renamed or replaced. """
+    tables = [
+        model._meta.db_table
+        for model in (UnihanCharacter, UnihanRadical, UnihanReading)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name "
+            "IN (%s)" % ', '.join(['%s'] * len(tables)), tables
+        )
+        schema = [row[0] for row in cursor.fetchall()]
+    with tempfile.TemporaryDirectory() as build_dir:
+        build_path = os.path.join(build_dir, 'unihan.sqlite3')
+        build_db = sqlite3.connect(build_path, isolation_level=None)
+        try:
+            for pragma in LOAD_PRAGMAS + BUILD_PRAGMAS:
+                build_db.execute(pragma)
+            for sql in schema:
+                build_db.execute(sql)
+            build_db.execute('BEGIN')
+            count = _load_records(build_db, records, radical_data)
+            build_db.execute('COMMIT')
+        finally:
+            build_db.close()
+        print('Built', build_path)
+
+        # Readers see the old or new rows, never a mix.
+        with connection.cursor() as cursor:
+            cursor.execute('ATTACH DATABASE %s AS build', [build_path])
+            try:
+                with transaction.atomic():
+                    for table in reversed(tables):
+                        cursor.execute(f'DELETE FROM main.{table}')
+                    for table in tables:
+                        cursor.execute(
+                            f'INSERT INTO main.{table} '
+                            f'SELECT * FROM build.{table}'
+                        )
+                    rebuild_index()
+            finally:
+                cursor.execute('DETACH DATABASE build')
+        print('Copied the built tables into the database')
+    return count
+
+
+def _row_hash(row):
+    """ Return a content hash of a character row tuple. """
+    return hashlib.blake2b(
+        repr(tuple(row)).encode(), digest_size=16
+    ).digest()
+
+
+def _diff(records, radical_data):
+    """ Apply the differences between records and the character rows,
+    compared through per-codepoint content hashes, in one transaction.
+    Only inserted, updated and deleted characters, their readings and
+    their search index rows are written, with radicals synced after
+    them. Return sorted (inserted, updated, deleted) codepoint lists. """
+    existing = {
+        row[0]: _row_hash(row)
+        for row in UnihanCharacter.objects.values_list(
+            *Record._fields
+        ).iterator(chunk_size=LOAD_BATCH_SIZE)
+    }
+    inserts = []
+    updates = []
+    for record in records:
+        old_hash = existing.pop(record.codepoint, None)
+        if old_hash is None:
+            inserts.append(record)
+        elif old_hash != _row_hash(record):
+            updates.append(record)
+    deleted = sorted(existing)
+    inserted = [record.codepoint for record in inserts]
+    updated = [record.codepoint for record in updates]
+
+    radical_rows = {row[0]: row for row in _radical_rows(radical_data)}
+    old_radical_rows = {
+        row[0]: row for row in UnihanRadical.objects.values_list(
+            *RADICAL_FIELDS
+        )
+    }
+    radical_changes = [
+        row for codepoint, row in radical_rows.items()
+        if old_radical_rows.get(codepoint) != row
+    ]
+    radical_deletes = [
+        [codepoint] for codepoint in old_radical_rows
+        if codepoint not in radical_rows
+    ]
+    if not (inserts or updates or deleted or radical_changes
+            or radical_deletes):
+        return inserted, updated, deleted
+
+    db = connection.connection
+    char_table = UnihanCharacter._meta.db_table
+    with transaction.atomic():
+        unindex(updated + deleted)
+        db.executemany(
+            f'DELETE FROM {UnihanReading._meta.db_table} '
+            'WHERE character_id = ?',
+            [[codepoint] for codepoint in updated + deleted],
+        )
+        db.executemany(
+            f'DELETE FROM {UnihanRadical._meta.db_table} '
+            'WHERE character_id = ?',
+            radical_deletes,
+        )
+        db.executemany(
+            f'DELETE FROM {char_table} WHERE codepoint = ?',
+            [[codepoint] for codepoint in deleted],
+        )
+        db.executemany(
+            'UPDATE %s SET %s WHERE codepoint = ?' % (
+                char_table,
+                ', '.join(f'{field} = ?' for field in Record._fields[1:]),
+            ),
+            [record[1:] + record[:1] for record in updates],
+        )
+        _insert_many(db, char_table, Record._fields, inserts)
+        db.executemany(
+            'INSERT OR REPLACE INTO %s (%s) VALUES (%s)' % (
+                UnihanRadical._meta.db_table,
+                ', '.join(RADICAL_FIELDS),
+                ', '.join('?' * len(RADICAL_FIELDS)),
+            ),
+            radical_changes,
+        )
+        _insert_many(
+            db,
+            UnihanReading._meta.db_table,
+            ('character_id', 'numbered', 'sort_order'),
+            _reading_rows(inserts + updates),
+        )
+        index(inserted + updated)
+
+    # Characters show their radical, so those of changed radicals are
+    # reported as updated too.
+    changed = set(inserted + updated + deleted)
+    updated = sorted(set(updated).union(
+        codepoint for codepoint in UnihanCharacter.objects.filter(
+            radical__in=[row[0] for row in radical_changes]
+        ).values_list('codepoint', flat=True)
+        if codepoint not in changed
+    ))
+    return inserted, updated, deleted
+
+
+def _report(label, codepoints):
+    """ Print the changed characters of a category. """
+    print('%s %d characters' % (label, len(codepoints)))
+    listed = codepoints[:REPORT_LIMIT]
+    if listed:
+        print('  ' + ' '.join(
+            f'U+{codepoint:04X} {chr(codepoint)}' for codepoint in listed
+        ))
+    if len(codepoints) > len(listed):
+        print('  and %d more' % (len(codepoints) - len(listed)))
+
+
+def _get_unicode_version(data_files):
+    """ Return the Unicode version in the data files' headers, or an
+    empty string. """
+    for data_file in data_files:
+        with data_file.lines() as lines:
+            for line in lines:
+                if not line.startswith(b'#'):
+                    break
+                match = VERSION_RE.match(line.decode('utf-8'))
+                if match:
+                    return match.group(1)
+    return ''
 
 
 def _get_radical_data(data_file):
     """ Return a dict of dicts of radical data indexed by radical number
     string, including the \' that indicates simplified/traditional. """
     data = {}
-    with open(data_file) as csvfile:
-        rdr = csv.reader(csvfile, delimiter=';')
-        for line in rdr:
-            if line and not line[0].startswith('#') and len(line) == 3:
-                rad_num = line[0].strip()
-                ideograph = line[2].strip()
-                codepoint = 'U+%s' % ideograph
-                codepoint_int = int(ideograph, 16)
-                radical = {
-                    'pCodepoint': codepoint,
-                    'pCodepointChr': chr(codepoint_int),
-                    'pCodepointInt': codepoint_int,
-                    'pIsSimplified': rad_num.endswith('\''),
-                    'pRadicalNumber': rad_num,
-                    'pRadicalNumberInt': int(rad_num.rstrip('\'')),
-                }
-                data[rad_num] = radical
+    with data_file.lines() as lines:
+        rows = list(csv.reader(
+            (line.decode('utf-8') for line in lines), delimiter=';'
+        ))
+    for line in rows:
+        if line and not line[0].startswith('#') and len(line) == 3:
+            rad_num = line[0].strip()
+            ideograph = line[2].strip()
+            codepoint = 'U+%s' % ideograph
+            codepoint_int = int(ideograph, 16)
+            radical = {
+                'pCodepoint': codepoint,
+                'pCodepointChr': chr(codepoint_int),
+                'pCodepointInt': codepoint_int,
+                'pIsSimplified': rad_num.endswith('\''),
+                'pRadicalNumber': rad_num,
+                'pRadicalNumberInt': int(rad_num.rstrip('\'')),
+            }
+            data[rad_num] = radical
     return data
 
 
@@ -280,39 +735,150 @@ class Command(BaseCommand):
     help = 'Used to import unihan db data.'
     requires_migrations_checks = True
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            help='A directory of data files, which are memory-mapped, or '
+                 'Unihan.zip, with CJKRadicals.txt in it or beside it. '
+                 'Defaults to var/unihan.',
+        )
+        parser.add_argument(
+            '--stream',
+            action='store_true',
+            help='Parse the data files in one pass with bounded memory.',
+        )
+        parser.add_argument(
+            '--swap',
+            action='store_true',
+            help='Build the tables in a fresh database file, then copy its '
+                 'rows into the live tables in one transaction, so the site '
+                 'never reads half-built tables. The live tables are '
+                 'refilled, not replaced.',
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=0,
+            help='Parse the data files over codepoint ranges in this many '
+                 'worker processes, or in this process if 0, the default.',
+        )
+        parser.add_argument(
+            '--diff',
+            action='store_true',
+            help='Only apply the characters that differ from the db, and '
+                 'invalidate the pages that show them.',
+        )
+        parser.add_argument(
+            '--snapshot-only',
+            action='store_true',
+            help='Only rewrite the dictionary snapshot and shards from '
+                 'the db.',
+        )
+
     def handle(self, *args, **options):
-        """ Import unihan data. """
+        """ Import unihan data, printing the wall-clock time of each
+        stage. """
+        if options['diff'] and options['swap']:
+            raise CommandError('--diff and --swap are exclusive.')
+        if options['jobs'] < 0:
+            raise CommandError('--jobs must not be negative.')
+        if options['snapshot_only']:
+            _write_snapshot()
+            _write_shards()
+            bump_versions([SITE])  # Pages link the shards.
+            return
+        with _timed('Import'):
+            self.do_import(options)
+        print('Peak RSS %.1f MB' % (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        ))
+
+    def do_import(self, options):
+        """ Parse and load or diff the data files. """
 
         # https://www.unicode.org/Public/UCD/latest/ucd/CJKRadicals.txt
         # https://www.unicode.org/Public/UCD/latest/ucd/Unihan.zip
-        data_dir = settings.BASE_DIR / 'var' / 'unihan'
+        source = options['source'] or settings.BASE_DIR / 'var' / 'unihan'
+        try:
+            radicals_file, data_files = get_data_files(source)
+        except (FileNotFoundError, zipfile.BadZipFile) as error:
+            raise CommandError(f'Bad source {source}: {error}') from error
+        if options['jobs'] and not all(
+                data_file.seekable for data_file in data_files):
+            raise CommandError(
+                '--jobs needs a directory source, since archive members '
+                'can only be read in order.'
+            )
 
         # Get radical data, a dict indexed by radical number.
-        radical_data = _get_radical_data(
-            os.path.join(data_dir, 'CJKRadicals.txt')
-        )
-
-        # Get character data, a dict indexed by codepoint (U+XXXX).
-        char_data = {}
-        for data_glob in glob.glob(os.path.join(data_dir, 'Unihan_*.txt')):
-            data = _get_char_data(os.path.join(data_dir, data_glob))
-            for codepoint, values in data.items():
-                if char_data.get(codepoint):
-                    char_data[codepoint].update(values)
+        radical_data = _get_radical_data(radicals_file)
+
+        stage = 'Parse and %s'
+        if options['jobs']:
+            # Parse before loading, so the load transaction is short.
+            with _timed('Parse'):
+                records = iter(_parallel_records(
+                    data_files, radical_data, options['jobs']
+                ))
+            stage = '%s'
+        elif options['stream']:
+            # Stream finished records into the loader.
+            records = _stream_records(data_files, radical_data)
+        else:
+            records = _dict_records(data_files, radical_data)
+
+        unicode_version = _get_unicode_version(data_files)
+        if options['diff']:
+            # Apply changed characters and record the dataset, then
+            # rewrite the snapshot and shards and invalidate only the
+            # pages showing changed characters, if any.
+            with _timed((stage % 'diff').capitalize()):
+                inserted, updated, deleted = _diff(records, radical_data)
+            _report('Inserted', inserted)
+            _report('Updated', updated)
+            _report('Deleted', deleted)
+            UnihanDataset.objects.create(
+                unicode_version=unicode_version,
+                characters=UnihanCharacter.objects.count(),
+                inserted=len(inserted),
+                updated=len(updated),
+                deleted=len(deleted),
+            )
+            changed = set(inserted + updated + deleted)
+            if changed:
+                self.write_files()
+                print('Dataset version', bump_version())
+                characters_changed.send(
+                    sender=self.__class__,
+                    codepoints=changed,
+                    inserted=set(inserted),
+                )
+        else:
+            # Load characters, radicals and pinyin readings without tone
+            # marks, and index definitions and pinyin for full-text
+            # search.
+            with _timed((stage % 'load').capitalize()):
+                if options['swap']:
+                    count = _build_and_swap(records, radical_data)
                 else:
-                    char_data[codepoint] = values
-
-        # Add calculated fields to character data.
-        for codepoint, values in char_data.items():
-            _add_calculated_fields(codepoint, values, radical_data)
-
-        # Pop radicals from character data.
-        radical_char_data = []
-        for rad in radical_data.values():
-            radical_char_data.append(
-                char_data.pop(rad['pCodepoint'], None)
+                    count = _load(records, radical_data)
+            print('Rebuilt search index')
+            UnihanDataset.objects.create(
+                unicode_version=unicode_version,
+                characters=count,
+                inserted=count,
             )
 
-        # Create radicals and characters.
-        radical_objs = _create_radicals(radical_char_data, radical_data)
-        _create_chars(char_data, radical_objs)
+            # Write the dictionary snapshot and shards, and invalidate
+            # cached records and pages.
+            self.write_files()
+            print('Dataset version', bump_version())
+            bump_versions([SITE])
+
+    @staticmethod
+    def write_files():
+        """ Write the dictionary snapshot and shards. """
+        with _timed('Snapshot'):
+            _write_snapshot()
+        with _timed('Shards'):
+            _write_shards()
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('unihan', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=(
+                "CREATE VIRTUAL TABLE unihan_search USING fts5("
+                "definition, pinyin, "
+                "content='unihan_unihancharacter', content_rowid='codepoint', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            ),
+            reverse_sql='DROP TABLE unihan_search',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('unihan', '0002_unihan_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnihanReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numbered', models.CharField(max_length=8)),
+                ('sort_order', models.IntegerField()),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='unihan.unihancharacter')),
+            ],
+            options={
+                'verbose_name': 'Reading',
+                'verbose_name_plural': 'Readings',
+                'indexes': [models.Index(fields=['numbered', 'sort_order'], name='unihan_unih_numbere_aa0e0b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('unihan', '0003_unihan_reading'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnihanDataset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unicode_version', models.CharField(default='', max_length=20)),
+                ('imported', models.DateTimeField(auto_now_add=True)),
+                ('characters', models.IntegerField()),
+                ('inserted', models.IntegerField()),
+                ('updated', models.IntegerField(default=0)),
+                ('deleted', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Dataset',
+                'verbose_name_plural': 'Datasets',
+            },
+        ),
+    ]
@@ -66,3 +66,62 @@ class UnihanRadical(models.Model):
 
     def __str__(self):
         return self.utf8
+
+
+class UnihanReading(models.Model):
+    """ A pinyin reading of a UnihanCharacter, numbered instead of tone
+    marked, so every toneless syllable is a prefix of its readings.
+    Built by importunihan, with the character's sort order copied so
+    that lookups are ordered from the index. """
+
+    character = models.ForeignKey(
+        'UnihanCharacter',
+        on_delete=models.CASCADE,
+    )
+    numbered = models.CharField(
+        max_length=8,
+    )
+    sort_order = models.IntegerField(
+    )
+
+    class Meta:
+        """ Model meta tweaks. """
+        verbose_name = 'Reading'
+        verbose_name_plural = 'Readings'
+        indexes = [
+            models.Index(fields=['numbered', 'sort_order']),
+        ]
+
+    def __str__(self):
+        return self.numbered
+
+
+class UnihanDataset(models.Model):
+    """ An imported Unihan dataset, recorded by importunihan with the
+    number of characters it inserted, updated and deleted. """
+
+    unicode_version = models.CharField(
+        default='',
+        max_length=20,
+    )
+    imported = models.DateTimeField(
+        auto_now_add=True,
+    )
+    characters = models.IntegerField(
+    )
+    inserted = models.IntegerField(
+    )
+    updated = models.IntegerField(
+        default=0,
+    )
+    deleted = models.IntegerField(
+        default=0,
+    )
+
+    class Meta:
+        """ Model meta tweaks. """
+        verbose_name = 'Dataset'
+        verbose_name_plural = 'Datasets'
+
+    def __str__(self):
+        return f'Unicode {self.unicode_version} {self.imported:%Y-%m-%d}'
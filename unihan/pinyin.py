@@ -0,0 +1,58 @@
+""" Unihan pinyin reading module. Toned syllables are indexed in their
+numbered-tone form, with ü written as v, so that readers can look
+characters up by what they can type. Every toneless syllable is a
+prefix of its numbered forms, so one index serves both. """
+import re
+import unicodedata
+
+
+# Combining marks left by NFD decomposition of toned pinyin vowels.
+TONES = {
+    '̄': '1',
+    '́': '2',
+    '̌': '3',
+    '̀': '4',
+}
+UMLAUT = '̈'
+NEUTRAL_TONE = '5'
+QUERY_RE = re.compile(r'[a-z]+[1-5]?')
+
+
+def numbered(syllable):
+    """ Return the numbered-tone form of a toned syllable. """
+    tone = NEUTRAL_TONE
+    letters = []
+    for char in unicodedata.normalize('NFD', syllable.lower()):
+        if char in TONES:
+            tone = TONES[char]
+        elif char == UMLAUT and letters:
+            letters[-1] = 'v'
+        else:
+            letters.append(char)
+    return ''.join(letters) + tone
+
+
+def readings(pinyin):
+    """ Return a list of distinct numbered readings for a
+    space-separated pinyin field, skipping any that can't be typed
+    (such as ê). """
+    return list(dict.fromkeys(
+        reading for reading in map(numbered, pinyin.split())
+        if QUERY_RE.fullmatch(reading)
+    ))
+
+
+def query_key(text):
+    """ Return the reading prefix for a typed syllable, which may be
+    toneless, numbered or tone marked, or None. """
+    text = text.strip().lower().replace('u:', 'v').replace('ü', 'v')
+    if not text.isascii():
+        text = numbered(text)
+    if not QUERY_RE.fullmatch(text):
+        return None
+    return text
+
+
+def key_range(key):
+    """ Return the (start, end) range of readings starting with key. """
+    return key, key[:-1] + chr(ord(key[-1]) + 1)
@@ -0,0 +1,68 @@
+""" Unihan full-text search module. An FTS5 index over character
+definitions and pinyin, with tone marks folded, kept in sync by
+importunihan. """
+import re
+from django.db import connection
+
+
+MATCH_SQL = 'SELECT rowid FROM unihan_search WHERE unihan_search MATCH %s'
+WORD_RE = re.compile(r'\w+')
+
+
+def rebuild_index():
+    """ Rebuild the search index from the character table. """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO unihan_search(unihan_search) VALUES('rebuild')"
+        )
+
+
+def unindex(codepoints):
+    """ Remove characters from the index before their rows change or are
+    deleted. An external content index needs the indexed values. """
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO unihan_search(unihan_search, rowid, definition, '
+            "pinyin) SELECT 'delete', codepoint, definition, pinyin "
+            'FROM unihan_unihancharacter WHERE codepoint = %s',
+            [[codepoint] for codepoint in codepoints],
+        )
+
+
+def index(codepoints):
+    """ Add inserted or updated characters to the index. """
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO unihan_search(rowid, definition, pinyin) '
+            'SELECT codepoint, definition, pinyin '
+            'FROM unihan_unihancharacter WHERE codepoint = %s',
+            [[codepoint] for codepoint in codepoints],
+        )
+
+
+def match_query(text):
+    """ Return an FTS5 query matching all words in the text, the last
+    as a prefix, or None. """
+    words = WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    phrases = ['"%s"' % word for word in words]
+    phrases[-1] += '*'
+    return ' '.join(phrases)
+
+
+def search(text, page=1, per_page=50):
+    """ Return a list of matching codepoints, best match first, then
+    in sort order. """
+    match = match_query(text)
+    if not match:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.codepoint FROM unihan_search s '
+            'JOIN unihan_unihancharacter c ON c.codepoint = s.rowid '
+            'WHERE unihan_search MATCH %s '
+            'ORDER BY s.rank, c.sort_order LIMIT %s OFFSET %s',
+            [match, per_page, (page - 1) * per_page],
+        )
+        return [row[0] for row in cursor.fetchall()]
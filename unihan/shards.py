@@ -0,0 +1,143 @@
+""" Unihan dictionary shards module. The character data is written by
+importunihan as static, content-hashed JSON shards of SHARD_SIZE
+codepoints, so that popup.js fetches the shards a page needs once and
+browsers cache them indefinitely, instead of each page embedding its
+vocabulary. """
+import hashlib
+import json
+import os
+import tempfile
+from django.conf import settings
+from django.templatetags.static import static
+
+
+SHARD_BITS = 9
+SHARD_SIZE = 1 << SHARD_BITS
+MANIFEST = 'manifest.json'
+STATIC_PREFIX = 'unihan/dict/'
+
+
+def shard_name(codepoint):
+    """ Return the name of the shard holding a codepoint, the hex
+    codepoint of its first slot. """
+    return '%05x' % (codepoint >> SHARD_BITS << SHARD_BITS)
+
+
+def _write(path, data):
+    """ Atomically write data to a file. """
+    with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), delete=False) as new_fd:
+        try:
+            new_fd.write(data)
+        except BaseException:
+            os.remove(new_fd.name)
+            raise
+    os.chmod(new_fd.name, 0o644)
+    os.replace(new_fd.name, path)
+
+
+def _shard_data(characters):
+    """ Return a shard's JSON data for its characters. Each maps the
+    character to [pinyin, definition, radical, radical number, residual
+    strokes], with a null radical and number for radicals. """
+    data = {}
+    for char in characters:
+        radical = char.radical
+        data[char.utf8] = [
+            char.pinyin,
+            char.definition,
+            radical.utf8 if radical else None,
+            radical.radical_number if radical else None,
+            char.residual_strokes,
+        ]
+    return json.dumps(
+        data, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+def write_shards(path, characters):
+    """ Write characters, ordered by codepoint, as shards and a manifest
+    in a directory, and remove shards in neither it nor the previous
+    manifest. Characters are UnihanCharacter or snapshot Character
+    objects. Shard file names hold a hash of their data, so unchanged
+    shards keep their URLs. Return the manifest, a dict mapping shard
+    names to file names. """
+    path = os.fspath(path)
+    os.makedirs(path, exist_ok=True)
+    manifest = {}
+
+    def flush(name, batch):
+        """ Write a shard unless a file with its data exists. """
+        data = _shard_data(batch)
+        file_name = '%s.%s.json' % (
+            name, hashlib.sha256(data).hexdigest()[:12]
+        )
+        if not os.path.exists(os.path.join(path, file_name)):
+            _write(os.path.join(path, file_name), data)
+        manifest[name] = file_name
+
+    name = None
+    batch = []
+    for char in characters:
+        char_shard = shard_name(char.codepoint)
+        if char_shard != name:
+            if batch:
+                flush(name, batch)
+            name, batch = char_shard, []
+        batch.append(char)
+    if batch:
+        flush(name, batch)
+
+    # Shards of the previous manifest are kept until the next run, so
+    # that pages cached or exported before this one keep working.
+    try:
+        with open(
+                os.path.join(path, MANIFEST), encoding='utf-8') as old_fd:
+            keep = set(json.load(old_fd).values())
+    except FileNotFoundError:
+        keep = set()
+    keep.update(manifest.values())
+    _write(
+        os.path.join(path, MANIFEST),
+        json.dumps(manifest, indent=1, sort_keys=True).encode()
+    )
+    for file_name in os.listdir(path):
+        if file_name.endswith('.json') and file_name != MANIFEST:
+            if file_name not in keep:
+                os.remove(os.path.join(path, file_name))
+    return manifest
+
+
+_MANIFEST = None
+
+
+def get_manifest():
+    """ Return the current shard manifest or None if there are no
+    shards. Reloads when importunihan replaces the manifest. """
+    global _MANIFEST  # pylint: disable=global-statement
+    path = os.path.join(settings.UNIHAN_DICT_DIR, MANIFEST)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        _MANIFEST = None
+        return None
+    if (
+            _MANIFEST is None
+            or _MANIFEST[0].st_ino != stat.st_ino
+            or _MANIFEST[0].st_mtime_ns != stat.st_mtime_ns):
+        with open(path, encoding='utf-8') as manifest_fd:
+            _MANIFEST = (stat, json.load(manifest_fd))
+    return _MANIFEST[1]
+
+
+def get_shard_urls(codepoints):
+    """ Return a dict mapping the names of the shards holding the
+    codepoints to their static URLs, or None if there are no shards. """
+    manifest = get_manifest()
+    if manifest is None:
+        return None
+    urls = {}
+    for name in dict.fromkeys(map(shard_name, codepoints)):
+        if name in manifest:
+            urls[name] = static(STATIC_PREFIX + manifest[name])
+    return urls
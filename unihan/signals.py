@@ -0,0 +1,8 @@
+""" Unihan signals module. """
+from django.dispatch import Signal
+
+
+# Sent by importunihan --diff with the set of inserted, updated and
+# deleted codepoints, and the set of inserted ones, so that apps can
+# invalidate pages that show them or may now show them.
+characters_changed = Signal()
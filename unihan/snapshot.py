@@ -0,0 +1,331 @@
+""" Unihan dictionary snapshot module. A read-only binary copy of the
+character data, written by importunihan and mmapped by each process so
+that all workers on a node share one page cache copy. """
+from array import array
+import bisect
+import heapq
+from itertools import groupby, islice
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from django.conf import settings
+from unihan.pinyin import key_range, readings
+
+
+# Native byte order sections, each padded to 8 bytes: the header (magic,
+# count and string blob sizes), count uint32 sorted codepoints, int64
+# sort orders, uint32 radical codepoints (0 for none), uint16 radical
+# numbers, int16 residual strokes, count + 1 uint32 offsets and a UTF-8
+# blob for each string field, then the reading index: the sorted
+# numbered pinyin readings as key count + 1 uint32 offsets and an ASCII
+# blob, key count + 1 uint32 starts into the postings, and the postings,
+# uint32 character indexes in sort order for each reading.
+MAGIC = b'UNIHAN02'
+STRING_FIELDS = (
+    'pinyin',
+    'definition',
+    'simplified_variants',
+    'traditional_variants',
+    'semantic_variants',
+)
+HEADER = struct.Struct('=8sI%dIIII' % len(STRING_FIELDS))
+
+
+def _pad(size):
+    """ Return size rounded up to the next multiple of 8. """
+    return (size + 7) & ~7
+
+
+class Radical:
+    """ A snapshot radical. """
+    __slots__ = ('utf8', 'radical_number')
+
+    def __init__(self, utf8, radical_number):
+        self.utf8 = utf8
+        self.radical_number = radical_number
+
+    def __str__(self):
+        return self.utf8
+
+
+class Character:
+    """ A snapshot character, used in place of UnihanCharacter. """
+    __slots__ = (
+        'codepoint',
+        'utf8',
+        'sort_order',
+        'radical',
+        'residual_strokes',
+    ) + STRING_FIELDS
+
+    def __init__(self, codepoint, sort_order, radical, residual_strokes,
+                 strings):
+        # pylint: disable=too-many-arguments
+        self.codepoint = codepoint
+        self.utf8 = chr(codepoint)
+        self.sort_order = sort_order
+        self.radical = radical
+        self.residual_strokes = residual_strokes
+        for field, value in zip(STRING_FIELDS, strings):
+            setattr(self, field, value)
+
+    def __str__(self):
+        return self.utf8
+
+    @classmethod
+    def from_model(cls, obj):
+        """ Return a Character copied from a UnihanCharacter. """
+        radical = None
+        if obj.radical:
+            radical = Radical(obj.radical.utf8, obj.radical.radical_number)
+        return cls(
+            obj.codepoint,
+            obj.sort_order,
+            radical,
+            obj.residual_strokes,
+            [getattr(obj, field) for field in STRING_FIELDS],
+        )
+
+
+class Snapshot:
+    """ A memory-mapped snapshot reader. Character objects are created
+    once per process, on first lookup. """
+    __slots__ = (
+        'stat',
+        '_buffer',
+        '_codepoints',
+        '_sort_orders',
+        '_radicals',
+        '_numbers',
+        '_strokes',
+        '_strings',
+        '_reading_keys',
+        '_reading_starts',
+        '_postings',
+        '_characters',
+        '_radical_objs',
+    )
+
+    def __init__(self, path):
+        with open(path, 'rb') as snapshot_fd:
+            self.stat = os.fstat(snapshot_fd.fileno())
+            self._buffer = memoryview(mmap.mmap(
+                snapshot_fd.fileno(), 0, access=mmap.ACCESS_READ
+            ))
+        magic, count, *blob_sizes = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a unihan snapshot')
+        *blob_sizes, key_count, key_size, posting_count = blob_sizes
+        offset = _pad(HEADER.size)
+        self._codepoints, offset = self._section(offset, 'I', count)
+        self._sort_orders, offset = self._section(offset, 'q', count)
+        self._radicals, offset = self._section(offset, 'I', count)
+        self._numbers, offset = self._section(offset, 'H', count)
+        self._strokes, offset = self._section(offset, 'h', count)
+        self._strings = []
+        for blob_size in blob_sizes:
+            offsets, offset = self._section(offset, 'I', count + 1)
+            blob = self._buffer[offset:offset + blob_size]
+            self._strings.append((offsets, blob))
+            offset = _pad(offset + blob_size)
+        key_offsets, offset = self._section(offset, 'I', key_count + 1)
+        keys = str(self._buffer[offset:offset + key_size], 'ascii')
+        self._reading_keys = [
+            keys[key_offsets[index]:key_offsets[index + 1]]
+            for index in range(key_count)
+        ]
+        offset = _pad(offset + key_size)
+        self._reading_starts, offset = self._section(
+            offset, 'I', key_count + 1
+        )
+        self._postings, offset = self._section(offset, 'I', posting_count)
+        self._characters = {}
+        self._radical_objs = {}
+
+    def __len__(self):
+        return len(self._codepoints)
+
+    def _section(self, offset, typecode, count):
+        """ Return a typed view of a section and the next offset. """
+        size = struct.calcsize(typecode) * count
+        view = self._buffer[offset:offset + size].cast(typecode)
+        return view, _pad(offset + size)
+
+    def _index(self, codepoint):
+        """ Return the codepoint's index or -1. """
+        index = bisect.bisect_left(self._codepoints, codepoint)
+        if index < len(self._codepoints):
+            if self._codepoints[index] == codepoint:
+                return index
+        return -1
+
+    def _radical(self, index):
+        """ Return the radical object for a character index. """
+        radical_cp = self._radicals[index]
+        if not radical_cp:
+            return None
+        radical = self._radical_objs.get(radical_cp)
+        if not radical:
+            radical = Radical(chr(radical_cp), self._numbers[index])
+            self._radical_objs[radical_cp] = radical
+        return radical
+
+    def get(self, codepoint):
+        """ Return the codepoint's Character or None. """
+        character = self._characters.get(codepoint)
+        if character:
+            return character
+        index = self._index(codepoint)
+        if index < 0:
+            return None
+        strings = []
+        for offsets, blob in self._strings:
+            strings.append(str(
+                blob[offsets[index]:offsets[index + 1]], 'utf-8'
+            ))
+        character = Character(
+            codepoint,
+            self._sort_orders[index],
+            self._radical(index),
+            self._strokes[index],
+            strings,
+        )
+        self._characters[codepoint] = character
+        return character
+
+    def in_bulk(self, codepoints):
+        """ Return a dict mapping codepoints to found Characters. """
+        found = {}
+        for codepoint in codepoints:
+            character = self.get(codepoint)
+            if character:
+                found[codepoint] = character
+        return found
+
+    def find_readings(self, key, start, stop):
+        """ Return a list of codepoints with a reading starting with
+        key, in sort order, sliced from start to stop. """
+        first, last = key_range(key)
+        runs = [
+            self._postings[
+                self._reading_starts[index]:self._reading_starts[index + 1]
+            ]
+            for index in range(
+                bisect.bisect_left(self._reading_keys, first),
+                bisect.bisect_left(self._reading_keys, last),
+            )
+        ]
+        # A character appears once per reading, so merged duplicates
+        # are adjacent.
+        merged = groupby(heapq.merge(
+            *runs, key=self._sort_orders.__getitem__
+        ))
+        return [
+            self._codepoints[index]
+            for index, _ in islice(merged, start, stop)
+        ]
+
+
+def write_snapshot(path, characters):
+    """ Write characters, ordered by codepoint, to a snapshot file.
+    Characters are UnihanCharacter or Character objects. The file is
+    replaced atomically so readers never see a partial snapshot. """
+    # pylint: disable=too-many-locals
+    codepoints = array('I')
+    sort_orders = array('q')
+    radicals = array('I')
+    numbers = array('H')
+    strokes = array('h')
+    strings = [(array('I', [0]), bytearray()) for _ in STRING_FIELDS]
+    postings = {}
+    for index, char in enumerate(characters):
+        if codepoints and char.codepoint <= codepoints[-1]:
+            raise ValueError('Snapshot characters must be in order')
+        codepoints.append(char.codepoint)
+        sort_orders.append(char.sort_order)
+        if char.radical:
+            radicals.append(ord(char.radical.utf8))
+            numbers.append(char.radical.radical_number)
+        else:
+            radicals.append(0)
+            numbers.append(0)
+        strokes.append(char.residual_strokes)
+        for field, (offsets, blob) in zip(STRING_FIELDS, strings):
+            blob += getattr(char, field).encode('utf-8')
+            offsets.append(len(blob))
+        for reading in readings(char.pinyin):
+            postings.setdefault(reading, []).append(
+                (char.sort_order, index)
+            )
+
+    key_offsets = array('I', [0])
+    keys = bytearray()
+    reading_starts = array('I', [0])
+    posting_indexes = array('I')
+    for key in sorted(postings):
+        keys += key.encode('ascii')
+        key_offsets.append(len(keys))
+        posting_indexes.extend(index for _, index in sorted(postings[key]))
+        reading_starts.append(len(posting_indexes))
+
+    path = os.fspath(path)
+    header = HEADER.pack(
+        MAGIC,
+        len(codepoints),
+        *(len(blob) for _, blob in strings),
+        len(postings),
+        len(keys),
+        len(posting_indexes),
+    )
+    sections = [header, codepoints, sort_orders, radicals, numbers, strokes]
+    for offsets, blob in strings:
+        sections.append(offsets)
+        sections.append(blob)
+    sections.extend([key_offsets, keys, reading_starts, posting_indexes])
+    with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), delete=False) as snapshot_fd:
+        try:
+            for section in sections:
+                data = bytes(section)
+                snapshot_fd.write(data)
+                snapshot_fd.write(b'\0' * (_pad(len(data)) - len(data)))
+        except BaseException:
+            os.remove(snapshot_fd.name)
+            raise
+    os.chmod(snapshot_fd.name, 0o644)
+    os.replace(snapshot_fd.name, path)
+
+
+_SNAPSHOT = None
+_INVALID = None  # The (inode, mtime) of an unreadable snapshot file.
+
+
+def get_snapshot():
+    """ Return the current process's Snapshot or None if there is no
+    valid snapshot file, such as one in an old format, so that lookups
+    fall back to the db. Reloads when importunihan replaces the
+    file. """
+    global _SNAPSHOT, _INVALID  # pylint: disable=global-statement
+    try:
+        stat = os.stat(settings.UNIHAN_SNAPSHOT)
+    except FileNotFoundError:
+        _SNAPSHOT = None
+        return None
+    file_id = (stat.st_ino, stat.st_mtime_ns)
+    if file_id == _INVALID:
+        return None
+    if (
+            _SNAPSHOT is None
+            or _SNAPSHOT.stat.st_ino != stat.st_ino
+            or _SNAPSHOT.stat.st_mtime_ns != stat.st_mtime_ns):
+        try:
+            _SNAPSHOT = Snapshot(settings.UNIHAN_SNAPSHOT)
+        except (ValueError, struct.error) as error:
+            logging.getLogger('django.server').error(
+                'Unreadable unihan snapshot, run importunihan: %s', error
+            )
+            _SNAPSHOT, _INVALID = None, file_id
+            return None
+    return _SNAPSHOT
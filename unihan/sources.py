@@ -0,0 +1,111 @@
+""" Unihan data source module. importunihan reads CJKRadicals.txt and
+the Unihan_*.txt files as binary lines, either memory-mapped from a
+plain-text directory or streamed straight out of the Unihan.zip
+distribution archive. """
+from contextlib import contextmanager
+import fnmatch
+import io
+import mmap
+import os
+import zipfile
+
+
+RADICALS_FILE = 'CJKRadicals.txt'
+UNIHAN_PATTERN = 'Unihan_*.txt'
+
+
+class DataFile:
+    """ A data file in a directory, or a member of a zip archive.
+    Instances only hold names, so they can be sent to worker
+    processes. """
+
+    def __init__(self, path, member=None):
+        self.path = os.fspath(path)
+        self.member = member
+
+    def __repr__(self):
+        if self.member:
+            return f'<DataFile {self.path}:{self.member}>'
+        return f'<DataFile {self.path}>'
+
+    @property
+    def name(self):
+        """ Return the file's base name. """
+        return os.path.basename(self.member or self.path)
+
+    @property
+    def seekable(self):
+        """ Return True if the file can be read from any offset without
+        reading what comes before. """
+        return self.member is None
+
+    @property
+    def size(self):
+        """ Return the file's uncompressed size. """
+        if self.member:
+            with zipfile.ZipFile(self.path) as archive:
+                return archive.getinfo(self.member).file_size
+        return os.path.getsize(self.path)
+
+    @contextmanager
+    def open(self):
+        """ Yield a binary file object for the data, memory-mapped for
+        plain files and buffered for archive members. """
+        if self.member:
+            with zipfile.ZipFile(self.path) as archive:
+                with io.BufferedReader(
+                        archive.open(self.member), 1 << 16) as data_fd:
+                    yield data_fd
+            return
+        with open(self.path, 'rb') as data_fd:
+            if not os.fstat(data_fd.fileno()).st_size:
+                yield data_fd  # Empty files can't be mapped.
+                return
+            with mmap.mmap(
+                    data_fd.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield data
+
+    @contextmanager
+    def lines(self, start=0, end=None):
+        """ Yield an iterator of the file's binary lines, or of the lines
+        in a byte range, read into memory. """
+        with self.open() as data_fd:
+            data_fd.seek(start)
+            if end is None:
+                yield iter(data_fd.readline, b'')
+            else:
+                yield io.BytesIO(data_fd.read(end - start))
+
+
+def get_data_files(source):
+    """ Return a (radicals DataFile, list of Unihan DataFiles) tuple
+    for a directory or Unihan.zip source. CJKRadicals.txt is not part
+    of Unihan.zip, so archives use a copy beside them unless they hold
+    one. Raise FileNotFoundError for a missing source, radicals or Unihan
+    files, so that a wrong source never empties the tables. """
+    source = os.fspath(source)
+    if os.path.isdir(source):
+        radicals = DataFile(os.path.join(source, RADICALS_FILE))
+        unihan_files = [
+            DataFile(os.path.join(source, name))
+            for name in sorted(os.listdir(source))
+            if fnmatch.fnmatch(name, UNIHAN_PATTERN)
+        ]
+    else:
+        with zipfile.ZipFile(source) as archive:
+            members = sorted(archive.namelist(), key=os.path.basename)
+        radicals = DataFile(
+            os.path.join(os.path.dirname(source), RADICALS_FILE)
+        )
+        for member in members:
+            if os.path.basename(member) == RADICALS_FILE:
+                radicals = DataFile(source, member)
+        unihan_files = [
+            DataFile(source, member) for member in members
+            if fnmatch.fnmatch(os.path.basename(member), UNIHAN_PATTERN)
+        ]
+    if radicals.member is None and not os.path.exists(radicals.path):
+        raise FileNotFoundError(radicals.path)
+    if not unihan_files:
+        raise FileNotFoundError(os.path.join(source, UNIHAN_PATTERN))
+    return radicals, unihan_files
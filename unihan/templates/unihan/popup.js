@@ -1,5 +1,113 @@
-function showPanel(event, panel) {
-  const article = document.querySelector(event.target.attributes.href.value);
+const unihanDict = loadUnihanDict();
+const shardRequests = new Map();
+
+function loadUnihanDict() {
+  const script = document.querySelector('#unihan-dict');
+  return script ? JSON.parse(script.textContent) : null;
+}
+
+function shardName(char) {
+  const start = (char.codePointAt(0) >> unihanDict.bits) << unihanDict.bits;
+  return start.toString(16).padStart(5, '0');
+}
+
+function fetchShard(url) {
+  // Shard URLs hold a hash of their data, so the browser caches them
+  // indefinitely, and each is requested at most once per page.
+  if (!shardRequests.has(url)) {
+    const request = fetch(url).then((response) => {
+      if (!response.ok) {
+        throw new Error(`${url} ${response.status}`);
+      }
+      return response.json();
+    }).catch((error) => {
+      shardRequests.delete(url);
+      throw error;
+    });
+    shardRequests.set(url, request);
+  }
+  return shardRequests.get(url);
+}
+
+function createElement(tag, attributes, ...children) {
+  const element = document.createElement(tag);
+  Object.entries(attributes).forEach(([name, value]) => {
+    element.setAttribute(name, value);
+  });
+  element.append(...children);
+  return element;
+}
+
+function createLink(href, title, text) {
+  return createElement('li', {}, createElement('a', {
+    href,
+    title,
+    target: '_blank',
+    rel: 'noopener noreferrer nofollow',
+  }, text));
+}
+
+function createCharacter(char, fields) {
+  // The same markup as unihan/character.html.
+  const [pinyin, definition, radical, radicalNumber, strokes] = fields;
+  const links = [];
+  if (unihanDict.ctext === 'dictionary') {
+    links.push(createLink(
+      `https://ctext.org/dictionary.pl?char=${char}`,
+      'ctext dictionary link',
+      'C'
+    ));
+  } else if (unihanDict.ctext === 'search') {
+    links.push(createLink(
+      `https://ctext.org/pre-qin-and-han?searchu=${char}`,
+      'ctext search link',
+      'C'
+    ));
+  }
+  links.push(createLink(
+    `https://en.wiktionary.org/wiki/${char}`,
+    'Wiktionary link',
+    'W'
+  ));
+  return createElement('article', {class: 'character', id: char},
+    createElement('section', {class: 'utf8'}, char),
+    createElement('section', {class: 'refs'},
+      createElement('div', {}, pinyin),
+      createElement(
+        'div',
+        {class: 'kangxi'},
+        `${radical ?? ''} ${radicalNumber ?? ''} + ${strokes}`
+      ),
+      createElement('div', {class: 'links'},
+        createElement('ul', {}, ...links)
+      )
+    ),
+    createElement('section', {}, definition)
+  );
+}
+
+async function findCharacter(char) {
+  // Pages without shards embed their characters.
+  const article = document.getElementById(char);
+  if (article || !unihanDict) {
+    return article;
+  }
+  const url = unihanDict.shards[shardName(char)];
+  if (!url) {
+    return null;
+  }
+  const shard = await fetchShard(url);
+  return shard[char] ? createCharacter(char, shard[char]) : null;
+}
+
+async function showPanel(event, panel) {
+  const char = event.target.attributes.href.value.slice(1);
+  panel.dataset.char = char;
+  const article = await findCharacter(char);
+  if (!article || panel.dataset.char !== char) {
+    // Not found, or another character was clicked meanwhile.
+    return;
+  }
   panel.innerHTML = article.outerHTML;
   panel.classList.remove('hide');
   panel.classList.add('show');
@@ -2,6 +2,7 @@
 from django import template
 from django.template.defaultfilters import stringfilter
 from django.utils.safestring import mark_safe
+from unihan.annotate import annotate, get_anchors
 
 
 register = template.Library()
@@ -10,20 +11,7 @@ register = template.Library()
 @register.filter
 @stringfilter
 def linkify(value, unihan_map):
-    """ Convert unihan characters to links. """
-    link = '<a class="unihan %s" href="#%s" title="%s - %s">%s</a>'
-    converted = []
+    """ Convert unihan characters in escaped text to links. """
     if unihan_map:
-        for char in value:
-            if char in unihan_map:
-                converted.append(link % (
-                    unihan_map[char].utf8,
-                    unihan_map[char].utf8,
-                    unihan_map[char].pinyin,
-                    unihan_map[char].definition,
-                    unihan_map[char].utf8
-                ))
-            else:
-                converted.append(char)
-        return mark_safe(''.join(converted))
+        return mark_safe(annotate(value, get_anchors(unihan_map)))
     return mark_safe(value)
@@ -0,0 +1,157 @@
+""" Unihan test case base module. """
+import os
+import tempfile
+from django.conf import settings
+from django.test import override_settings
+from common.tests.base import BaseTestCase
+from unihan.cache import clear_lru
+from unihan.models import UnihanCharacter, UnihanRadical
+from unihan.shards import write_shards
+from unihan.snapshot import write_snapshot
+
+
+RADICALS = ((1, 0x4E00), (2, 0x4E28), (3, 0x4E36))
+PINYIN = ('yī', 'gǔn', 'zhǔ', 'lǜ', 'ma')
+
+
+def write_unihan_data(path, count):
+    """ Write CJKRadicals.txt and Unihan_*.txt files in a directory for
+    count characters, half from the unified block, which includes the
+    radicals, and half from Extension B. """
+    codepoints = [
+        start + offset
+        for start in (0x4E00, 0x20000)
+        for offset in range(max(count // 2, 0x40))
+    ]
+    radicals = {codepoint: number for number, codepoint in RADICALS}
+    files = {
+        'CJKRadicals.txt': ['# CJKRadicals.txt'] + [
+            f'{number}; {0x2F00 + number - 1:04X}; {codepoint:04X}'
+            for number, codepoint in RADICALS
+        ],
+        'Unihan_IRGSources.txt': ['# Unihan_IRGSources.txt', ''],
+        'Unihan_Readings.txt': ['# Unihan_Readings.txt', ''],
+        'Unihan_Variants.txt': ['# Unihan_Variants.txt', ''],
+    }
+    for index, codepoint in enumerate(codepoints):
+        code = f'U+{codepoint:04X}'
+        if codepoint in radicals:
+            rs_unicode = f'{radicals[codepoint]}.0'
+        else:
+            rs_unicode = f'{index % 3 + 1}.{index % 17}'
+        files['Unihan_IRGSources.txt'].extend([
+            f'{code}\tkIRG_GSource\tG0-{codepoint:04X}',
+            f'{code}\tkRSUnicode\t{rs_unicode}',
+        ])
+        if index % 5:
+            files['Unihan_Readings.txt'].extend([
+                f'{code}\tkCantonese\tjat1',
+                f'{code}\tkDefinition\tdefinition {index}',
+                f'{code}\tkHanyuPinyin\t10001.010:'
+                f'{PINYIN[index % 5]},{PINYIN[(index + 1) % 5]}',
+                f'{code}\tkMandarin\t{PINYIN[index % 5]}',
+            ])
+        if index % 7 == 0:
+            files['Unihan_Variants.txt'].extend([
+                f'{code}\tkSemanticVariant\tU+4E00<kMatthews',
+                f'{code}\tkTraditionalVariant\t{code} U+4E28',
+            ])
+    for name, lines in files.items():
+        with open(os.path.join(path, name), 'w', encoding='utf-8') as data_fd:
+            data_fd.write('\n'.join(lines) + '\n')
+
+
+@override_settings(
+    UNIHAN_DICT_DIR=settings.BASE_DIR / 'var' / 'no-such-dict',
+    UNIHAN_SNAPSHOT=settings.BASE_DIR / 'var' / 'no-such.snapshot',
+)
+class UnihanTestCase(BaseTestCase):
+    """ Parent class with a small block of character data, and no
+    snapshot or shards. """
+    first_codepoint = 0x4E00
+    char_count = 600
+
+    @classmethod
+    def setUpTestData(cls):
+        """ Create one radical and a run of characters after it. """
+        radical_char = UnihanCharacter.objects.create(
+            codepoint=cls.first_codepoint,
+            definition='one',
+            pinyin='yī',
+            residual_strokes=0,
+            sort_order=0,
+            utf8=chr(cls.first_codepoint),
+        )
+        radical = UnihanRadical.objects.create(
+            character=radical_char,
+            radical_number=1,
+            simplified=False,
+            utf8=chr(cls.first_codepoint),
+        )
+        radical_char.radical = radical
+        radical_char.save()
+        UnihanCharacter.objects.bulk_create([
+            UnihanCharacter(
+                codepoint=codepoint,
+                radical=radical,
+                residual_strokes=codepoint - cls.first_codepoint,
+                sort_order=codepoint - cls.first_codepoint,
+                utf8=chr(codepoint),
+                **cls.character_fields(codepoint),
+            )
+            for codepoint in range(
+                cls.first_codepoint + 1,
+                cls.first_codepoint + cls.char_count
+            )
+        ])
+
+    @classmethod
+    def character_fields(cls, codepoint):
+        """ Return definition and pinyin for a test character. """
+        return {'definition': f'definition {codepoint}', 'pinyin': 'yī'}
+
+    def setUp(self):
+        """ Start with an empty character LRU. """
+        super().setUp()
+        clear_lru()
+
+    def use_snapshot(self):
+        """ Write a snapshot of the test characters to a temp dir and
+        use it for the rest of the test. """
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = os.path.join(temp_dir.name, 'unihan.snapshot')
+        write_snapshot(
+            path,
+            UnihanCharacter.objects.select_related('radical').order_by(
+                'codepoint'
+            )
+        )
+        settings_override = override_settings(UNIHAN_SNAPSHOT=path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def use_shards(self):
+        """ Write shards of the test characters to a temp dir and use
+        them for the rest of the test. Return the shard directory. """
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        write_shards(
+            temp_dir.name,
+            UnihanCharacter.objects.select_related('radical').order_by(
+                'codepoint'
+            )
+        )
+        settings_override = override_settings(UNIHAN_DICT_DIR=temp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        return temp_dir.name
+
+    @classmethod
+    def chars(cls, count):
+        """ Return a string of the first count test characters. """
+        return ''.join(
+            chr(codepoint) for codepoint in range(
+                cls.first_codepoint, cls.first_codepoint + count
+            )
+        )
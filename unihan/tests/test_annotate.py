@@ -0,0 +1,85 @@
+""" Unihan annotation test module. """
+import time
+import markdown
+from unihan.annotate import UnihanExtension
+from unihan.tests.base import UnihanTestCase
+from unihan.views import unihan_map
+
+
+def _linkify(value, objects):
+    """ The original per-character HTML filter, for comparison. """
+    link = '<a class="unihan %s" href="#%s" title="%s - %s">%s</a>'
+    converted = []
+    for char in value:
+        if char in objects:
+            converted.append(link % (
+                objects[char].utf8,
+                objects[char].utf8,
+                objects[char].pinyin,
+                objects[char].definition,
+                objects[char].utf8
+            ))
+        else:
+            converted.append(char)
+    return ''.join(converted)
+
+
+class AnnotateTestCase(UnihanTestCase):
+    """ Verify markdown annotation against the original filter. """
+
+    def _entry(self, paragraphs):
+        """ Return a long study entry's markdown. """
+        chars = self.chars(self.char_count)
+        lines = []
+        for i in range(paragraphs):
+            line = chars[i % 500:i % 500 + 40]
+            lines.append(
+                f'{line}\n\n'
+                f'*{line[:5]}* and **{line[5:10]}**, see [{line[10]}](#n).\n\n'
+                f'- {line[11:20]} item <{i}> & more\n\n'
+            )
+        return ''.join(lines)
+
+    def test_annotate_matches_filter(self):
+        """ Assert annotated markdown matches the filtered HTML. """
+        entry = self._entry(50)
+        objects = unihan_map(entry, False)
+        self.assertEqual(
+            markdown.markdown(
+                entry, extensions=[UnihanExtension(unihan_map=objects)]
+            ),
+            _linkify(markdown.markdown(entry), objects),
+        )
+
+    def test_annotate_text_only(self):
+        """ Assert attributes are left alone. """
+        entry = '[一](#x "丁") ![七](a.jpg)'
+        objects = unihan_map(entry, False)
+        html = markdown.markdown(
+            entry, extensions=[UnihanExtension(unihan_map=objects)]
+        )
+        self.assertIn('title="丁"', html)
+        self.assertIn('alt="七"', html)
+        self.assertIn('<a class="unihan 一"', html)
+
+    def test_benchmark(self):
+        """ Log filter and extension times for a long study entry. """
+        entry = self._entry(2000)
+        objects = unihan_map(entry, False)
+        start = time.perf_counter()
+        html = markdown.markdown(entry)
+        markdown_time = time.perf_counter() - start
+        start = time.perf_counter()
+        _linkify(html, objects)
+        filter_time = time.perf_counter() - start
+        start = time.perf_counter()
+        markdown.markdown(
+            entry, extensions=[UnihanExtension(unihan_map=objects)]
+        )
+        extension_time = time.perf_counter() - start - markdown_time
+        self._log(
+            f'Annotation benchmark, {len(entry)} chars, markdown '
+            f'{markdown_time * 1000:.0f}ms plus: '
+            f'filter {filter_time * 1000:.0f}ms, '
+            f'extension {extension_time * 1000:.0f}ms'
+        )
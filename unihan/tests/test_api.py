@@ -0,0 +1,43 @@
+""" Unihan JSON lookup test module. """
+from django.conf import settings
+from django.test import Client
+from unihan.tests.base import UnihanTestCase
+
+
+class CharacterViewTestCase(UnihanTestCase):
+    """ Verify canonical URLs, character data and validators. """
+
+    def setUp(self):
+        """ Add a client. """
+        super().setUp()
+        self.client = Client(HTTP_X_FORWARDED_HOST=settings.ALLOWED_HOSTS[0])
+
+    def test_canonical_redirect(self):
+        """ Assert equivalent queries redirect to one canonical URL. """
+        locations = set()
+        for query in ('丁一 丁', '一丁', 'x一丁'):
+            response = self.client.get('/unihan/characters', {'q': query})
+            self.assertEqual(response.status_code, 302)
+            locations.add(response['Location'])
+        self.assertEqual(len(locations), 1)
+        response = self.client.get('/unihan/characters', {'q': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_characters(self):
+        """ Assert character data, long caching and conditional GET. """
+        response = self.client.get(
+            '/unihan/characters', {'q': '丁一龥'}, follow=True
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        data = response.json()
+        self.assertEqual(
+            [char['utf8'] for char in data['characters']], ['一', '丁']
+        )
+        self.assertEqual(data['characters'][1]['radical']['utf8'], '一')
+        self.assertEqual(data['missing'], ['龥'])
+        response = self.client.get(
+            response.redirect_chain[-1][0],
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,85 @@
+""" Unihan block classification test module. """
+import string
+import time
+from common.tests.base import BaseTestCase
+from unihan.blocks import find_unihan, get_block
+
+
+def _match_block(char):
+    """ The original per-character match chain, for comparison. """
+    # pylint: disable=too-many-return-statements
+    try:
+        codepoint = ord(char)
+    except TypeError:
+        return -1
+    if char in string.printable:
+        return -1
+    match codepoint:
+        case codepoint if 0x4E00 <= codepoint <= 0x9FFF:
+            return 0
+        case codepoint if 0x3400 <= codepoint <= 0x4DBF:
+            return 1
+        case codepoint if 0x20000 <= codepoint <= 0x2A6DF:
+            return 2
+        case codepoint if 0x2A700 <= codepoint <= 0x2B739:
+            return 3
+        case codepoint if 0x2B740 <= codepoint <= 0x2B81D:
+            return 4
+        case codepoint if 0x2B820 <= codepoint <= 0x2CEA1:
+            return 5
+        case codepoint if 0x2CEB0 <= codepoint <= 0x2EBE0:
+            return 6
+        case codepoint if 0x30000 <= codepoint <= 0x3134A:
+            return 7
+        case codepoint if 0x31350 <= codepoint <= 0x323AF:
+            return 8
+        case codepoint if 0x2EBF0 <= codepoint <= 0x2EE5D:
+            return 9
+        case codepoint if 0xF900 <= codepoint <= 0xFAD9:
+            return 254
+        case codepoint if 0x2F800 <= codepoint <= 0x2FA1D:
+            return 255
+    return -1
+
+
+class BlockTestCase(BaseTestCase):
+    """ Verify the block table against the original match chain. """
+
+    def test_all_codepoints(self):
+        """ Assert both classifications agree for every codepoint. """
+        for codepoint in range(0x32400):
+            char = chr(codepoint)
+            self.assertEqual(
+                get_block(char), _match_block(char), hex(codepoint)
+            )
+        self.assertEqual(get_block(''), -1)
+        self.assertEqual(get_block(None), -1)
+
+    def test_find_unihan(self):
+        """ Assert whole-string lookups return characters and positions. """
+        self.assertEqual(
+            find_unihan('a道b\U00020000 德\n'),
+            [(1, '道'), (3, '\U00020000'), (5, '德')],
+        )
+
+    def test_benchmark(self):
+        """ Log per-character and whole-string times on a mixed corpus. """
+        corpus = (
+            'Dao ke dao, fei chang dao. 道可道，非常道。名可名，非常名。\n'
+            '\U00020001\U0002A701 更 㐀 Tao Te Ching 1.\n'
+        ) * 5000
+        start = time.perf_counter()
+        expected = [
+            (pos, char) for pos, char in enumerate(corpus)
+            if _match_block(char) >= 0
+        ]
+        chain_time = time.perf_counter() - start
+        start = time.perf_counter()
+        found = find_unihan(corpus)
+        table_time = time.perf_counter() - start
+        self.assertEqual(found, expected)
+        self._log(
+            f'Block benchmark, {len(corpus)} chars: '
+            f'match chain {chain_time * 1000:.1f}ms, '
+            f'find_unihan {table_time * 1000:.1f}ms'
+        )
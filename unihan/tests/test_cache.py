@@ -0,0 +1,69 @@
+""" Unihan record cache test module. """
+from unittest import mock
+from django.core.cache import cache
+from common.versions import get_versions
+from unihan.cache import (
+    VERSION_TTL,
+    bump_version,
+    cache_stats,
+    clear_lru,
+    get_version,
+)
+from unihan.shards import shard_name
+from unihan.tests.base import UnihanTestCase
+from unihan.views import unihan_map
+
+
+class RecordCacheTestCase(UnihanTestCase):
+    """ Verify the two cache tiers and negative lookups. """
+
+    def test_cache_tiers(self):
+        """ Assert repeat lookups skip the db, misses included. """
+        text = self.chars(10) + '龥'
+        with self.assertNumQueries(1), self.assertLogs('django.server'):
+            unihan_map(text)
+        with self.assertNumQueries(0), self.assertLogs('django.server'):
+            self.assertEqual(len(unihan_map(text)), 10)
+        clear_lru()
+        with self.assertNumQueries(0), self.assertLogs('django.server'):
+            self.assertEqual(len(unihan_map(text)), 10)
+        stats = cache_stats()
+        self.assertEqual(stats['cache_hits'], 11)
+        self.assertEqual(stats['misses'], 0)
+        self.assertEqual(stats['hit_ratio'], 1.0)
+
+    def test_shard_keys(self):
+        """ Assert records are cached in a key per shard. """
+        chars = self.chars(self.char_count)
+        unihan_map(chars, False)
+        keys = {
+            f'unihan:{get_version()}:{shard_name(ord(char))}'
+            for char in chars
+        }
+        shards = cache.get_many(keys)
+        self.assertEqual(len(shards), len(keys))
+        self.assertLess(len(keys), len(chars) / 100)
+        self.assertEqual(
+            sum(len(records) for records in shards.values()), len(chars)
+        )
+
+    def test_version_ttl(self):
+        """ Assert the version is read once per VERSION_TTL, and LRU
+        hits cost no cache round trip. """
+        with mock.patch(
+                'unihan.cache.get_versions', side_effect=get_versions
+        ) as read, mock.patch('unihan.cache.time.monotonic') as monotonic:
+            monotonic.return_value = 100.0
+            unihan_map(self.chars(10))
+            unihan_map(self.chars(10))
+            self.assertEqual(read.call_count, 1)
+            monotonic.return_value += VERSION_TTL
+            unihan_map(self.chars(10))
+            self.assertEqual(read.call_count, 2)
+
+    def test_version_bump(self):
+        """ Assert a version bump sends lookups back to the db. """
+        unihan_map(self.chars(10))
+        bump_version()
+        with self.assertNumQueries(1):
+            self.assertEqual(len(unihan_map(self.chars(10))), 10)
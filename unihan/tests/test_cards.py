@@ -0,0 +1,66 @@
+""" Unihan vocabulary card test module. """
+import time
+from unittest import mock
+from django.template.loader import render_to_string
+from unihan.cards import card_prefix, get_cards, render_card
+from unihan.models import UnihanCharacter
+from unihan.snapshot import Character
+from unihan.tests.base import UnihanTestCase
+from unihan.views import unihan_map
+
+
+class CardTestCase(UnihanTestCase):
+    """ Verify cards match the character template. """
+
+    def test_cards_match_template(self):
+        """ Assert cards are byte-for-byte the template's output. """
+        odd = UnihanCharacter.objects.get(pk=self.first_codepoint + 1)
+        odd.definition = '<b>"it\'s" & {0} %s</b>'
+        odd.pinyin = 'a&b'
+        odd.radical = None
+        objs = list(UnihanCharacter.objects.select_related('radical')[:50])
+        objs += [odd, Character.from_model(odd), Character.from_model(objs[3])]
+        for ctext_target in ('dictionary', 'search', ''):
+            for obj in objs:
+                self.assertEqual(
+                    render_card(obj, ctext_target),
+                    render_to_string('unihan/character.html', {
+                        'object': obj, 'ctext_target': ctext_target,
+                    }),
+                )
+
+    def test_get_cards(self):
+        """ Assert cards come back in map order from the cache. """
+        objects = unihan_map(self.chars(20)[::-1], False)
+        cards = get_cards(objects, 'search')
+        self.assertEqual(len(cards), 20)
+        self.assertIn('id="%s"' % self.chars(20)[-1], cards[0])
+        self.assertEqual(get_cards(objects, 'search'), cards)
+        self.assertNotEqual(get_cards(objects, 'dictionary'), cards)
+
+        # Template edits change the cards' cache keys.
+        self.addCleanup(card_prefix.cache_clear)
+        card_prefix.cache_clear()
+        with mock.patch(
+                'unihan.cards.card_format', return_value='<b>{utf8}</b>'):
+            new_cards = get_cards(objects, 'search')
+        self.assertEqual(new_cards[0], '<b>%s</b>' % self.chars(20)[-1])
+
+    def test_benchmark(self):
+        """ Log card render times for template and format string. """
+        objs = list(UnihanCharacter.objects.select_related('radical'))
+        start = time.perf_counter()
+        for obj in objs:
+            render_to_string('unihan/character.html', {
+                'object': obj, 'ctext_target': 'dictionary',
+            })
+        template_time = (time.perf_counter() - start) / len(objs)
+        start = time.perf_counter()
+        for obj in objs:
+            render_card(obj, 'dictionary')
+        card_time = (time.perf_counter() - start) / len(objs)
+        self._log(
+            f'Card benchmark, per card: template {template_time * 1e6:.0f}us,'
+            f' format string {card_time * 1e6:.1f}us '
+            f'({card_time * 98000:.2f}s for 98k characters)'
+        )
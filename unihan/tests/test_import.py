@@ -0,0 +1,254 @@
+""" Unihan import test module. """
+from contextlib import redirect_stdout
+import glob
+import io
+import os
+from pathlib import Path
+import shutil
+import tempfile
+import tracemalloc
+import zipfile
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase, override_settings
+from common.tests.base import BaseTestCase
+from unihan.cache import get_version
+from unihan.management.commands.importunihan import (
+    _get_char_data,
+    _get_radical_data,
+    _parallel_records,
+    _split_ranges,
+    _stream_records,
+)
+from unihan.models import (
+    UnihanCharacter,
+    UnihanDataset,
+    UnihanRadical,
+    UnihanReading,
+)
+from unihan.search import search
+from unihan.signals import characters_changed
+from unihan.sources import get_data_files
+from unihan.tests.base import write_unihan_data
+
+
+STREAM_BUDGET = 256 * 1024  # Bytes of peak traced allocations.
+
+
+class ImportMixin:
+    """ Temp data and output dirs and an import runner. """
+
+    def setUp(self):
+        """ Write the data files and output to a temp dir. """
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.base_dir = temp_dir.name
+        self.data_dir = os.path.join(self.base_dir, 'var', 'unihan')
+        os.makedirs(self.data_dir)
+        settings_override = override_settings(
+            BASE_DIR=Path(self.base_dir),
+            UNIHAN_DICT_DIR=os.path.join(self.base_dir, 'dict'),
+            UNIHAN_SNAPSHOT=os.path.join(self.base_dir, 'unihan.snapshot'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def import_rows(self, *args):
+        """ Run importunihan and return its rows. """
+        with redirect_stdout(io.StringIO()) as output:
+            call_command('importunihan', *args)
+        self.assertIn('Peak RSS', output.getvalue())
+        return (
+            list(UnihanCharacter.objects.order_by('pk').values_list()),
+            list(UnihanRadical.objects.order_by('pk').values_list()),
+            list(UnihanReading.objects.order_by(
+                'character', 'numbered'
+            ).values_list('character', 'numbered', 'sort_order')),
+        )
+
+
+class ImportTestCase(ImportMixin, BaseTestCase):
+    """ Verify streamed imports match dict imports in bounded memory. """
+
+    def test_stream_import(self):
+        """ Assert streamed and dict imports create the same rows. """
+        write_unihan_data(self.data_dir, 600)
+        rows = self.import_rows()
+        self.assertEqual(len(rows[0]), 600)
+        self.assertEqual(len(rows[1]), 3)
+        self.assertEqual(self.import_rows('--stream'), rows)
+        write_unihan_data(self.data_dir, 300)
+        self.assertEqual(len(self.import_rows('--stream')[0]), 300)
+
+    def test_sources(self):
+        """ Assert imports from Unihan.zip, with radicals beside or in
+        it, and from another directory match var/unihan imports. """
+        write_unihan_data(self.data_dir, 600)
+        rows = self.import_rows()
+        archive_dir = os.path.join(self.base_dir, 'archive')
+        os.makedirs(archive_dir)
+        archive_path = os.path.join(archive_dir, 'Unihan.zip')
+        with zipfile.ZipFile(
+                archive_path, 'w', zipfile.ZIP_DEFLATED) as zip_fd:
+            for data_file in glob.glob(
+                    os.path.join(self.data_dir, 'Unihan_*.txt')):
+                zip_fd.write(data_file, os.path.basename(data_file))
+        with self.assertRaisesMessage(CommandError, 'CJKRadicals.txt'):
+            self.import_rows('--source', archive_path)
+        os.rename(
+            os.path.join(self.data_dir, 'CJKRadicals.txt'),
+            os.path.join(archive_dir, 'CJKRadicals.txt'),
+        )
+        self.assertEqual(self.import_rows('--source', archive_path), rows)
+        self.assertEqual(
+            self.import_rows('--source', archive_path, '--stream'), rows
+        )
+        with self.assertRaisesMessage(CommandError, '--jobs'):
+            self.import_rows('--source', archive_path, '--jobs', '2')
+
+        with zipfile.ZipFile(archive_path, 'a') as zip_fd:
+            zip_fd.write(
+                os.path.join(archive_dir, 'CJKRadicals.txt'),
+                'CJKRadicals.txt',
+            )
+        os.rename(
+            os.path.join(archive_dir, 'CJKRadicals.txt'),
+            os.path.join(self.data_dir, 'CJKRadicals.txt'),
+        )
+        self.assertEqual(self.import_rows('--source', archive_path), rows)
+        os.rename(self.data_dir, os.path.join(self.base_dir, 'unpacked'))
+        self.assertEqual(self.import_rows(
+            '--source', os.path.join(self.base_dir, 'unpacked'), '--stream'
+        ), rows)
+        os.remove(archive_path)
+        shutil.copy(
+            os.path.join(self.base_dir, 'unpacked', 'CJKRadicals.txt'),
+            archive_dir,
+        )
+        with self.assertRaisesMessage(CommandError, 'Unihan_*.txt'):
+            self.import_rows('--source', archive_dir)
+
+    def test_parallel(self):
+        """ Assert parallel parses match serial ones whatever the ranges,
+        and parallel imports match dict imports. """
+        write_unihan_data(self.data_dir, 600)
+        radicals_file, data_files = get_data_files(self.data_dir)
+        radical_data = _get_radical_data(radicals_file)
+        records = list(_stream_records(data_files, radical_data))
+        for parts in (1, 7, 50, 5000):
+            ranges = _split_ranges(data_files, parts)
+            self.assertEqual(
+                [
+                    record for byte_ranges in ranges
+                    for record in _stream_records(
+                        data_files, radical_data, byte_ranges
+                    )
+                ],
+                records,
+            )
+        self.assertEqual(
+            _parallel_records(data_files, radical_data, 3), records
+        )
+        rows = self.import_rows()
+        self.assertEqual(self.import_rows('--jobs', '2'), rows)
+        with self.assertRaisesMessage(CommandError, 'must not be negative'):
+            self.import_rows('--jobs', '-1')
+
+    def test_diff(self):
+        """ Assert diff imports apply and report exactly the changed
+        characters, and skip invalidation when nothing changed. """
+        write_unihan_data(self.data_dir, 600)
+        self.import_rows()
+        deleted = {0x20000 + offset for offset in range(250, 300)}
+        for data_file in glob.glob(os.path.join(self.data_dir, 'Unihan_*')):
+            with open(data_file, encoding='utf-8') as data_fd:
+                lines = [
+                    line for line in data_fd
+                    if not line.startswith('U+')
+                    or int(line.split('\t')[0][2:], 16) not in deleted
+                ]
+            if data_file.endswith('Readings.txt'):
+                lines.insert(1, '# Unicode version: 99.0.0\n')
+                lines[lines.index('U+4E01\tkDefinition\tdefinition 1\n')] = (
+                    'U+4E01\tkDefinition\tamended\n'
+                )
+            with open(data_file, 'w', encoding='utf-8') as data_fd:
+                data_fd.writelines(lines)
+        sent = []
+
+        def receiver(codepoints, **kwargs):
+            """ Record the changed codepoints. """
+            sent.append((codepoints, kwargs))
+
+        characters_changed.connect(receiver)
+        self.addCleanup(characters_changed.disconnect, receiver)
+        rows = self.import_rows('--diff')
+        dataset = UnihanDataset.objects.latest('pk')
+        self._log(f'Diffed {dataset}: {dataset.inserted} inserted, '
+                  f'{dataset.updated} updated, {dataset.deleted} deleted')
+        self.assertEqual(
+            (dataset.unicode_version, dataset.characters, dataset.inserted,
+             dataset.updated, dataset.deleted),
+            ('99.0.0', 550, 0, 1, 50),
+        )
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(sent[0][0], deleted | {0x4E01})
+        self.assertEqual(search('amended'), [0x4E01])
+        self.assertNotIn(0x4E01, search('definition', per_page=1000))
+        self.assertEqual(self.import_rows('--stream'), rows)
+
+        version = get_version()
+        self.assertEqual(self.import_rows('--diff', '--stream'), rows)
+        self.assertEqual(get_version(), version)
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(UnihanDataset.objects.latest('pk').updated, 0)
+
+    def peak(self, count, stream):
+        """ Return the peak traced allocations of parsing count
+        characters. """
+        write_unihan_data(self.data_dir, count)
+        radicals_file, data_files = get_data_files(self.data_dir)
+        radical_data = _get_radical_data(radicals_file)
+        tracemalloc.start()
+        try:
+            if stream:
+                for _ in _stream_records(data_files, radical_data):
+                    pass
+            else:
+                with redirect_stdout(io.StringIO()):
+                    for data_file in data_files:
+                        _get_char_data(data_file)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_stream_memory(self):
+        """ Assert streaming peak memory is within budget whatever the
+        character count, unlike reading dicts. """
+        small = self.peak(2000, True)
+        large = self.peak(20000, True)
+        self._log(f'Streamed peak {small} bytes for 2000, {large} for 20000')
+        self.assertLess(large, STREAM_BUDGET)
+        self.assertLess(large, small * 2)
+        dicts = self.peak(20000, False)
+        self._log(f'Dict peak {dicts} bytes for 20000')
+        self.assertGreater(dicts, large * 10)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+})
+class SwapTestCase(ImportMixin, TransactionTestCase):
+    """ Verify imports built in a fresh database file, which must be
+    attached outside a transaction. """
+
+    def test_swap(self):
+        """ Assert swapped in tables match tables loaded in place. """
+        write_unihan_data(self.data_dir, 600)
+        rows = self.import_rows('--stream')
+        self.assertEqual(self.import_rows('--swap'), rows)
+        self.assertEqual(
+            self.import_rows('--stream', '--swap'), rows
+        )
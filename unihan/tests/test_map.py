@@ -0,0 +1,33 @@
+""" Unihan map test module. """
+from unihan.tests.base import UnihanTestCase
+from unihan.views import unihan_map
+
+
+class UnihanMapTestCase(UnihanTestCase):
+    """ Verify character map lookups. """
+
+    def test_map_order(self):
+        """ Assert the map keeps first-appearance order and skips
+        non-unihan and missing characters. """
+        text = 'a 丁 一\n丁 龥 七'
+        with self.assertLogs('django.server', 'INFO') as logs:
+            objects = unihan_map(text, False)
+        self.assertEqual(list(objects), ['丁', '一', '七'])
+        self.assertIn('龥', logs.output[0])
+        self.assertEqual(objects['丁'].radical.utf8, '一')
+
+    def test_map_max_lookups(self):
+        """ Assert max_lookups counts distinct unihan characters. """
+        objects = unihan_map('a' + self.chars(20) * 2, 10)
+        self.assertEqual(len(objects), 10)
+
+    def test_map_query_count(self):
+        """ Assert the number of queries doesn't grow with the text,
+        including radical lookups in the character template. """
+        for count in (1, 50, self.char_count):
+            text = self.chars(count) * 3
+            with self.assertNumQueries(1):
+                objects = unihan_map(text, False)
+                for obj in objects.values():
+                    self.assertEqual(obj.radical.radical_number, 1)
+            self.assertEqual(len(objects), count)
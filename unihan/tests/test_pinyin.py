@@ -0,0 +1,124 @@
+""" Unihan pinyin reading test module. """
+import time
+from django.conf import settings
+from django.test import Client
+from unihan.models import UnihanCharacter, UnihanReading
+from unihan.pinyin import numbered, query_key, readings
+from unihan.tests.base import UnihanTestCase
+from unihan.views import find_readings
+
+
+SYLLABLES = ('dào dǎo', 'dé', 'zhōng', 'zhī', 'nǚ', 'rén', 'ê̄')
+
+
+class PinyinTestCase(UnihanTestCase):
+    """ Verify reading normalization and lookups from the readings
+    table and the snapshot. """
+    char_count = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        """ Create the readings table. """
+        super().setUpTestData()
+        UnihanReading.objects.bulk_create([
+            UnihanReading(
+                character_id=codepoint,
+                numbered=reading,
+                sort_order=sort_order,
+            )
+            for codepoint, pinyin, sort_order in (
+                UnihanCharacter.objects.values_list(
+                    'codepoint', 'pinyin', 'sort_order'
+                )
+            )
+            for reading in readings(pinyin)
+        ])
+
+    @classmethod
+    def character_fields(cls, codepoint):
+        """ Return pinyin cycled through SYLLABLES. """
+        return {
+            'definition': f'definition {codepoint}',
+            'pinyin': SYLLABLES[codepoint % len(SYLLABLES)],
+        }
+
+    def test_normalize(self):
+        """ Assert toned, numbered and ü spellings share a key. """
+        self.assertEqual(numbered('Dào'), 'dao4')
+        self.assertEqual(numbered('lǘ'), 'lv2')
+        self.assertEqual(numbered('ma'), 'ma5')
+        self.assertEqual(readings('dào dǎo dào ê̄'), ['dao4', 'dao3'])
+        for text in ('nǚ', 'nü3', 'nu:3', 'NV3'):
+            self.assertEqual(query_key(text), 'nv3')
+        self.assertEqual(query_key(' zh '), 'zh')
+        self.assertIsNone(query_key('dao dao'))
+        self.assertIsNone(query_key(''))
+
+    def test_lookup(self):
+        """ Assert prefix, toneless and numbered lookups in sort order
+        match between the readings table and the snapshot. """
+        queries = ('zh', 'dao', 'dao3', 'dǎo', 'nv', 'd', 'e', 'x')
+        found = {query: find_readings(query, 1, 10000) for query in queries}
+        self.use_snapshot()
+        with self.assertNumQueries(0):
+            for query in queries:
+                self.assertEqual(find_readings(query, 1, 10000), found[query])
+                self.assertEqual(
+                    find_readings(query, 2, 7), found[query][7:14]
+                )
+        self.assertEqual(len(found['dao']), len(set(found['dao'])))
+        self.assertEqual(found['dao'], found['dao3'])
+        self.assertEqual(found['dao'], found['dǎo'])
+        self.assertEqual(
+            len(found['zh']),
+            UnihanCharacter.objects.filter(pinyin__startswith='zh').count()
+        )
+        self.assertEqual(found['d'], sorted(
+            found['dao'] + find_readings('de', 1, 10000),
+            key=lambda cp: cp - self.first_codepoint,
+        ))
+        self.assertEqual(found['e'], [])
+        self.assertEqual(found['x'], [])
+
+    def test_pinyin_view(self):
+        """ Assert the endpoint returns character data. """
+        client = Client(HTTP_X_FORWARDED_HOST=settings.ALLOWED_HOSTS[0])
+        response = client.get('/unihan/pinyin', {'q': 'nü'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 50)
+        self.assertEqual(results[0]['pinyin'], 'nǚ')
+
+    def test_benchmark(self):
+        """ Log per query LIKE scan, readings table and snapshot
+        times. """
+        queries = ('zh', 'dao', 'nv3')
+        timings = {}
+        for query in queries:
+            start = time.perf_counter()
+            list(UnihanCharacter.objects.filter(
+                pinyin__contains=query[:2]
+            ).order_by('sort_order').values_list('codepoint', flat=True)[:50])
+            timings.setdefault('like', []).append(
+                time.perf_counter() - start
+            )
+            start = time.perf_counter()
+            find_readings(query)
+            timings.setdefault('table', []).append(
+                time.perf_counter() - start
+            )
+        self.use_snapshot()
+        for query in queries:
+            find_readings(query)
+            start = time.perf_counter()
+            find_readings(query)
+            timings.setdefault('snapshot', []).append(
+                time.perf_counter() - start
+            )
+        self._log(
+            f'Pinyin benchmark, {self.char_count} characters, per query: '
+            + ', '.join(
+                f'{name} {sum(times) / len(times) * 1000:.3f}ms'
+                for name, times in timings.items()
+            )
+        )
@@ -0,0 +1,92 @@
+""" Unihan full-text search test module. """
+from functools import reduce
+import operator
+import random
+import time
+from django.conf import settings
+from django.db.models import Q
+from django.test import Client
+from unihan.admin import CharacterAdmin
+from unihan.models import UnihanCharacter
+from unihan.search import rebuild_index, search
+from unihan.tests.base import UnihanTestCase
+
+
+WORDS = (
+    'water fire mountain way virtue heaven earth person name mind hand '
+    'tree river sun moon walk speak see nail seven'
+).split()
+
+
+class SearchTestCase(UnihanTestCase):
+    """ Verify ranked search and the admin search backend. """
+    char_count = 20000
+
+    @classmethod
+    def setUpTestData(cls):
+        """ Index the test characters. """
+        super().setUpTestData()
+        rebuild_index()
+
+    @classmethod
+    def character_fields(cls, codepoint):
+        """ Return varied definitions and pinyin, and one seven. """
+        if codepoint == cls.first_codepoint + 7:
+            return {'definition': 'seven', 'pinyin': 'qī'}
+        rand = random.Random(codepoint)
+        return {
+            'definition': ', '.join(rand.sample(WORDS[:-1], 3)),
+            'pinyin': rand.choice(('dào', 'dé', 'zhōng', 'zhī', 'rén')),
+        }
+
+    def test_search(self):
+        """ Assert ranked, paged and tone-insensitive matches. """
+        self.assertEqual(search('seven')[0], self.first_codepoint + 7)
+        self.assertEqual(search('qi'), [self.first_codepoint + 7])
+        self.assertEqual(search('"('), [])
+        codepoints = search('zhong')
+        self.assertEqual(len(codepoints), 50)
+        self.assertEqual(set(codepoints) & set(search('zhong', 2)), set())
+        self.assertEqual(len(search('zh', per_page=100000)), len(
+            UnihanCharacter.objects.filter(pinyin__startswith='zh')
+        ))
+
+    def test_search_view(self):
+        """ Assert the endpoint returns character data. """
+        client = Client(HTTP_X_FORWARDED_HOST=settings.ALLOWED_HOSTS[0])
+        response = client.get('/unihan/search', {'q': 'Seven'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['pinyin'], 'qī')
+        for page in ('x', '1001', '9' * 20):
+            response = client.get(
+                '/unihan/search', {'q': 'Seven', 'page': page}
+            )
+            self.assertEqual(response.status_code, 400, page)
+
+    def test_benchmark(self):
+        """ Log admin icontains and full-text search times. """
+        timings = {}
+        admin_fields = CharacterAdmin.search_fields
+        for query in ('water', 'heaven mind', 'zhong'):
+            start = time.perf_counter()
+            slow = UnihanCharacter.objects.all()
+            for word in query.split():
+                slow = slow.filter(reduce(operator.or_, [
+                    Q(**{f'{field}__icontains': word})
+                    for field in admin_fields
+                ]))
+            list(slow.order_by('sort_order')[:50])
+            timings.setdefault('icontains', []).append(
+                time.perf_counter() - start
+            )
+            start = time.perf_counter()
+            fast = search(query)
+            timings.setdefault('fts', []).append(time.perf_counter() - start)
+            self.assertTrue(fast)
+        self._log(
+            f'Search benchmark, {self.char_count} characters, per query: '
+            + ', '.join(
+                f'{name} {sum(times) / len(times) * 1000:.2f}ms'
+                for name, times in timings.items()
+            )
+        )
@@ -0,0 +1,91 @@
+""" Unihan dictionary shards test module. """
+import json
+import os
+from unihan.models import UnihanCharacter
+from unihan.shards import (
+    MANIFEST,
+    SHARD_SIZE,
+    get_manifest,
+    get_shard_urls,
+    shard_name,
+    write_shards,
+)
+from unihan.tests.base import UnihanTestCase
+
+
+class ShardsTestCase(UnihanTestCase):
+    """ Verify shards hold the characters and are content-hashed. """
+
+    def setUp(self):
+        """ Use shards of the test characters. """
+        super().setUp()
+        self.path = self.use_shards()
+
+    def characters(self):
+        """ Return the test characters in codepoint order. """
+        return list(UnihanCharacter.objects.select_related(
+            'radical'
+        ).order_by('codepoint'))
+
+    def test_shards(self):
+        """ Assert each character is in its shard and the manifest
+        lists only the written shards. """
+        manifest = get_manifest()
+        self.assertEqual(
+            sorted(manifest.values()),
+            sorted(set(os.listdir(self.path)) - {MANIFEST})
+        )
+        self.assertEqual(
+            len(manifest),
+            len({cp // SHARD_SIZE for cp in range(
+                self.first_codepoint, self.first_codepoint + self.char_count
+            )})
+        )
+        shards = {}
+        for name, file_name in manifest.items():
+            with open(os.path.join(self.path, file_name), 'rb') as shard_fd:
+                shards[name] = json.load(shard_fd)
+        for obj in self.characters():
+            self.assertEqual(shards[shard_name(obj.codepoint)][obj.utf8], [
+                obj.pinyin,
+                obj.definition,
+                obj.radical.utf8,
+                obj.radical.radical_number,
+                obj.residual_strokes,
+            ])
+
+    def test_rewrite(self):
+        """ Assert a rewrite keeps unchanged shard names, and replaced
+        shards until the next rewrite. """
+        old_manifest = get_manifest()
+        characters = self.characters()
+        characters[-1].definition = 'changed'
+        manifest = write_shards(self.path, characters)
+        self.assertEqual(get_manifest(), manifest)
+        changed = shard_name(characters[-1].codepoint)
+        for name, file_name in manifest.items():
+            if name == changed:
+                self.assertNotEqual(file_name, old_manifest[name])
+            else:
+                self.assertEqual(file_name, old_manifest[name])
+        old_path = os.path.join(self.path, old_manifest[changed])
+        self.assertTrue(os.path.exists(old_path))
+        self.assertEqual(
+            len(os.listdir(self.path)), len(manifest) + 2
+        )
+        self.assertEqual(write_shards(self.path, characters), manifest)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertEqual(
+            len(os.listdir(self.path)), len(manifest) + 1
+        )
+
+    def test_shard_urls(self):
+        """ Assert page shard URLs are static URLs of the needed
+        shards. """
+        first = self.first_codepoint
+        urls = get_shard_urls([first, first + 1, first + 0x2FF, 0x3400])
+        self.assertEqual(list(urls), ['04e00', '05000'])
+        self.assertTrue(urls['04e00'].startswith('/static/unihan/dict/'))
+        self.assertTrue(
+            urls['04e00'].endswith(get_manifest()['04e00'])
+        )
@@ -0,0 +1,65 @@
+""" Unihan snapshot test module. """
+import os
+import shutil
+from django.conf import settings
+from unihan.models import UnihanCharacter
+from unihan.snapshot import MAGIC, get_snapshot
+from unihan.tests.base import UnihanTestCase
+from unihan.views import unihan_map
+
+
+class SnapshotTestCase(UnihanTestCase):
+    """ Verify snapshot round trips and lookups. """
+
+    def setUp(self):
+        """ Use a snapshot of the test characters. """
+        super().setUp()
+        self.use_snapshot()
+
+    def test_snapshot_fields(self):
+        """ Assert snapshot characters match their db rows. """
+        snapshot = get_snapshot()
+        self.assertEqual(len(snapshot), self.char_count)
+        for obj in UnihanCharacter.objects.select_related('radical'):
+            char = snapshot.get(obj.codepoint)
+            for field in (
+                    'utf8',
+                    'pinyin',
+                    'definition',
+                    'residual_strokes',
+                    'simplified_variants',
+                    'traditional_variants',
+                    'semantic_variants',
+                    'sort_order'):
+                self.assertEqual(getattr(char, field), getattr(obj, field))
+            self.assertEqual(char.radical.utf8, obj.radical.utf8)
+            self.assertEqual(
+                char.radical.radical_number, obj.radical.radical_number
+            )
+        self.assertIsNone(snapshot.get(self.first_codepoint - 1))
+        self.assertIs(get_snapshot(), snapshot)
+
+    def test_snapshot_map(self):
+        """ Assert unihan_map reads the snapshot without queries and
+        reuses character objects. """
+        with self.assertNumQueries(0):
+            objects = unihan_map(self.chars(100), False)
+        self.assertEqual(len(objects), 100)
+        self.assertIs(unihan_map(self.chars(1))['一'], objects['一'])
+
+    def test_old_snapshot(self):
+        """ Assert a snapshot in an old format is ignored, so lookups
+        fall back to the db, until it is replaced. """
+        path = settings.UNIHAN_SNAPSHOT
+        shutil.copy(path, f'{path}.new')
+        with open(f'{path}.old', 'wb') as old_fd:
+            with open(path, 'rb') as snapshot_fd:
+                old_fd.write(b'UNIHAN01' + snapshot_fd.read()[len(MAGIC):])
+        os.replace(f'{path}.old', path)
+        with self.assertLogs('django.server', 'ERROR'):
+            self.assertIsNone(get_snapshot())
+        self.assertIsNone(get_snapshot())
+        with self.assertNumQueries(1):
+            self.assertEqual(len(unihan_map(self.chars(10), False)), 10)
+        os.replace(f'{path}.new', path)
+        self.assertEqual(len(get_snapshot()), self.char_count)
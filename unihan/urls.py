@@ -4,5 +4,20 @@ from unihan import views
 
 
 urlpatterns = [
-    path('', views.UnihanFormView.as_view(), name='unihan-lookup'),
+    path('unihan', views.UnihanFormView.as_view(), name='unihan-lookup'),
+    path(
+        'unihan/characters',
+        views.CharacterView.as_view(),
+        name='unihan-characters'
+    ),
+    path(
+        'unihan/search',
+        views.SearchView.as_view(),
+        name='unihan-search'
+    ),
+    path(
+        'unihan/pinyin',
+        views.PinyinView.as_view(),
+        name='unihan-pinyin'
+    ),
 ]
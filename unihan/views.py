@@ -1,95 +1,113 @@
 """ Unihan app views module. """
+import hashlib
+import json
 import logging
-import string
+from urllib.parse import urlencode
 from django import forms
+from django.core.cache import cache
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    JsonResponse,
+)
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.generic import View
 from django.views.generic.edit import FormView
-from unihan.models import UnihanCharacter
-
-
-def get_block(char):
-    """ Return the character's tr38 block number or -1. """
-    block = -1
-
-    try:
-        codepoint = ord(char)
-    except TypeError:
-        return block
-
-    # A slightly cheaper test up front.
-    if char in string.printable:
-        return block
-
-    # https://www.unicode.org/reports/tr38/#BlockListing
-    # https://www.unicode.org/reports/tr38/#SortingAlgorithm
-
-    match codepoint:
-        # CJK Unified Ideographs
-        case codepoint if 0x4E00 <= codepoint <= 0x9FFF:
-            block = 0
-        # CJK Unified Ideographs Extension A
-        case codepoint if 0x3400 <= codepoint <= 0x4DBF:
-            block = 1
-        # CJK Unified Ideographs Extension B
-        case codepoint if 0x20000 <= codepoint <= 0x2A6DF:
-            block = 2
-        # CJK Unified Ideographs Extension C
-        case codepoint if 0x2A700 <= codepoint <= 0x2B739:
-            block = 3
-        # CJK Unified Ideographs Extension D
-        case codepoint if 0x2B740 <= codepoint <= 0x2B81D:
-            block = 4
-        # CJK Unified Ideographs Extension E
-        case codepoint if 0x2B820 <= codepoint <= 0x2CEA1:
-            block = 5
-        # CJK Unified Ideographs Extension F
-        case codepoint if 0x2CEB0 <= codepoint <= 0x2EBE0:
-            block = 6
-        # CJK Unified Ideographs Extension G
-        case codepoint if 0x30000 <= codepoint <= 0x3134A:
-            block = 7
-        # CJK Unified Ideographs Extension H
-        case codepoint if 0x31350 <= codepoint <= 0x323AF:
-            block = 8
-        # CJK Unified Ideographs Extension I
-        case codepoint if 0x2EBF0 <= codepoint <= 0x2EE5D:
-            block = 9
-        # CJK Compatibility Ideographs
-        case codepoint if 0xF900 <= codepoint <= 0xFAD9:
-            block = 254
-        # CJK Compatibility Supplement
-        case codepoint if 0x2F800 <= codepoint <= 0x2FA1D:
-            block = 255
-    return block
-
-
-def is_unihan(char):
-    """ Return True if the character's codepoint is in a Unihan block. """
-    return get_block(char) >= 0
-
-
-def unihan_map(text, max_lookups=250, ctext_target='dictionary'):
-    """ Return a map of unihan characters to db objects. """
+from unihan.blocks import UNIHAN_RE
+from unihan.cache import get_records, get_version
+from unihan.cards import get_cards
+from unihan.models import UnihanCharacter, UnihanReading
+from unihan.pinyin import key_range, query_key
+from unihan.search import search
+from unihan.snapshot import Character, get_snapshot
+
+
+def _unihan_chars(text, max_lookups):
+    """ Return a list of the text's distinct unihan characters in order
+    of first appearance, up to max_lookups. """
+    chars = list(dict.fromkeys(UNIHAN_RE.findall(text)))
+    if max_lookups:
+        return chars[:max_lookups]
+    return chars
+
+
+def _load_characters(codepoints):
+    """ Return a dict mapping codepoints to Characters from the db. """
+    # in_bulk chunks the pk__in queries under the db's variable limit.
+    objs = UnihanCharacter.objects.select_related('radical').in_bulk(
+        codepoints
+    )
+    return {cp: Character.from_model(obj) for cp, obj in objs.items()}
+
+
+def get_characters(codepoints):
+    """ Return a dict mapping codepoints to snapshot or cached
+    objects. """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.in_bulk(codepoints)
+    return get_records(codepoints, _load_characters)
+
+
+def find_readings(text, page=1, per_page=50):
+    """ Return a list of codepoints with a pinyin reading starting with
+    the typed syllable, in sort order, from the snapshot or the readings
+    table. """
+    key = query_key(text)
+    if not key:
+        return []
+    start = (page - 1) * per_page
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.find_readings(key, start, start + per_page)
+    first, last = key_range(key)
+    return list(UnihanReading.objects.filter(
+        numbered__gte=first, numbered__lt=last
+    ).order_by('sort_order').values_list(
+        'character_id', flat=True
+    ).distinct()[start:start + per_page])
+
+
+def unihan_map(text, max_lookups=250):
+    """ Return a map of unihan characters to snapshot or cached
+    objects. """
+    chars = _unihan_chars(text, max_lookups)
+    found = get_characters([ord(char) for char in chars])
     objects = {}
-    lookups = 0
     lookup_failures = []
-    for char in text:
-        if max_lookups and lookups >= max_lookups:
-            break
-        if char in objects:
-            continue
-        if is_unihan(char) and char not in lookup_failures:
-            try:
-                lookups += 1
-                objects[char] = UnihanCharacter.objects.get(pk=ord(char))
-                objects[char].ctext_target = ctext_target
-            except UnihanCharacter.DoesNotExist:
-                lookup_failures.append(char)
-    # logging.getLogger('django.server').info(lookups)
+    for char in chars:
+        obj = found.get(ord(char))
+        if obj:
+            objects[char] = obj
+        else:
+            lookup_failures.append(char)
     if lookup_failures:
         logging.getLogger('django.server').info(lookup_failures)
     return objects
 
 
+def character_data(obj):
+    """ Return a JSON-ready dict of character data. """
+    radical = None
+    if obj.radical:
+        radical = {
+            'utf8': obj.radical.utf8,
+            'radical_number': obj.radical.radical_number,
+        }
+    return {
+        'utf8': obj.utf8,
+        'pinyin': obj.pinyin,
+        'definition': obj.definition,
+        'radical': radical,
+        'residual_strokes': obj.residual_strokes,
+        'simplified_variants': obj.simplified_variants,
+        'traditional_variants': obj.traditional_variants,
+        'semantic_variants': obj.semantic_variants,
+    }
+
+
 class UnihanForm(forms.Form):
     """ Unihan lookup form. """
     field = forms.CharField(
@@ -111,15 +129,114 @@ class UnihanFormView(FormView):
         """ Insert template context data. """
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'Unihan Lookup'
+        context['ctext_target'] = 'dictionary'
         if context['form'].is_valid():
             context['form_data'] = context['form'].cleaned_data['field']
             if self.request.user.is_authenticated:
+                context['ctext_target'] = 'search'
                 context['unihan_map'] = unihan_map(
-                    context['form_data'], False, 'search'
+                    context['form_data'], False
                 )
             else:
                 context['unihan_map'] = unihan_map(context['form_data'])
+            context['vocabulary'] = get_cards(
+                context['unihan_map'], context['ctext_target']
+            )
         else:
             context['form_data'] = ''
             context['unihan_map'] = {}
         return context
+
+
+class CharacterView(View):
+    """ Read-only JSON character lookup. Requests are redirected to a
+    canonical URL, with distinct characters in codepoint order and the
+    dataset version, which is cached for a year. """
+    max_lookups = 250
+
+    def get(self, request):
+        """ Return character data for the q query parameter. """
+        chars = ''.join(sorted(set(UNIHAN_RE.findall(
+            request.GET.get('q', '')
+        ))))
+        if not chars:
+            return HttpResponseBadRequest('No unihan characters')
+        if len(chars) > self.max_lookups:
+            return HttpResponseBadRequest('Too many characters')
+        version = str(get_version())
+        if request.GET.get('q') != chars or request.GET.get('v') != version:
+            response = HttpResponseRedirect('%s?%s' % (
+                reverse('unihan-characters'),
+                urlencode({'q': chars, 'v': version}),
+            ))
+            patch_cache_control(response, public=True, max_age=300)
+            return response
+
+        etag = '"%s"' % hashlib.sha1(
+            f'{version}:{chars}'.encode('utf-8')
+        ).hexdigest()
+        response = get_conditional_response(request, etag=etag)
+        if not response:
+            key = f'unihan-json:{etag}'
+            content = cache.get(key)
+            if content is None:
+                objects = unihan_map(chars, False)
+                content = json.dumps({
+                    'version': int(version),
+                    'characters': [
+                        character_data(obj) for obj in objects.values()
+                    ],
+                    'missing': [char for char in chars if char not in objects],
+                }, ensure_ascii=False)
+                cache.set(key, content, None)
+            response = HttpResponse(
+                content, content_type='application/json'
+            )
+        response['ETag'] = etag
+        patch_cache_control(
+            response, public=True, max_age=60 * 60 * 24 * 365, immutable=True
+        )
+        return response
+
+
+class ResultsView(View):
+    """ Parent class for read-only JSON pages of characters found by a
+    query. The finder is called with the query, page and page size, and
+    returns a list of codepoints. """
+    finder = None
+    per_page = 50
+    max_page = 1000
+
+    def get(self, request):
+        """ Return a page of characters for the q query parameter. """
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            return HttpResponseBadRequest('Bad page')
+        if page > self.max_page:
+            return HttpResponseBadRequest('Bad page')
+        query = request.GET.get('q', '')
+        codepoints = self.finder(query, page, self.per_page)
+        objects = get_characters(codepoints)
+        response = JsonResponse({
+            'query': query,
+            'page': page,
+            'results': [
+                character_data(objects[cp])
+                for cp in codepoints if cp in objects
+            ],
+        }, json_dumps_params={'ensure_ascii': False})
+        patch_cache_control(response, public=True, max_age=60 * 60)
+        return response
+
+
+class SearchView(ResultsView):
+    """ Full-text search of definitions and pinyin, best match
+    first. """
+    finder = staticmethod(search)
+
+
+class PinyinView(ResultsView):
+    """ Lookup by pinyin syllable prefix, with or without tones, in sort
+    order. """
+    finder = staticmethod(find_readings)